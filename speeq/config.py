@@ -11,7 +11,7 @@ Classes:
 """
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 
 from speeq.constants import FileKeys
 
@@ -111,7 +111,19 @@ class ASRDataConfig:
 
         tokenizer_path (Union[str, Path]): The path to load or save the tokenizer.
 
-        tokenizer_type (str): The tokenizer type to be used. Default `char_tokenizer`
+        tokenizer_type (str): The tokenizer type to be used, `char_tokenizer`,
+        `word_tokenizer` or `bpe_tokenizer`. Default `char_tokenizer`
+
+        tokenizer_args (dict): The arguments of the tokenizer, such as the
+        `max_vocab_size` of the `bpe_tokenizer`. Default {}.
+
+        vocab_min_freq (int): The minimum number of occurrences of a token in
+        the training data to be added to the vocabulary, if the tokenizer is
+        trained, where it is the minimum count of a merge for the BPE
+        tokenizer. Default 1.
+
+        vocab_n_workers (int): The number of processes used to count the tokens
+        of the training data, if the tokenizer is trained. Default 1.
 
         sep (str): The separator used in the CSV file.  Default ','.
 
@@ -151,6 +163,77 @@ class ASRDataConfig:
         shuffle (bool): A flag indicating whether the dataset should be shuffled
         at each iteration. Default False.
 
+        n_workers (int): The number of workers used by the data loaders to
+        prepare the batches ahead of the trainer, if set to 0 the batches
+        will be prepared by the training process itself. Default 0.
+
+        prefetch_size (int): The maximum number of batches to be prepared
+        ahead of the trainer when workers are used. Default 2.
+
+        worker_type (str): The type of the data loaders workers, either `thread`
+        or `process`. Default `thread`.
+
+        n_buckets (int): The number of duration buckets used to batch the
+        training examples of similar durations together, if set to 0
+        bucketing will not be used. Default 0.
+
+        duration_key (str): The name of the column that holds the duration
+        of the audio files, used by the bucketing. Default 'duration'.
+
+        max_frames (float): The maximum padded speech size of each training
+        batch, measured in the unit of the `duration_key` column, if set to
+        a positive value, the training batches will be packed dynamically
+        up to this budget instead of using a fixed batch size. Default 0.
+
+        max_tokens (int): The maximum padded text size of each training batch,
+        which requires `max_frames` to be set, where the text lengths are
+        read from the `n_tokens` column of the manifest if it exists, if set
+        to 0 no text budget will be used. Default 0.
+
+        shard_type (str): The way the training batches are distributed across
+        the ranks in distributed data-parallel settings, either `stride` or
+        `balanced`, where the latter balances the padded frames of each rank
+        and each step using the durations in `duration_key`, and batches the
+        examples through the bucketing sampler even if `n_buckets` is 0.
+        Default `stride`.
+
+        seed (int): The seed used to shuffle the training examples or the
+        buckets, which is saved along with the checkpoints to resume the
+        training from the exact next batch. Default 0.
+
+        train_feat_cache_dir (Union[str, Path]): The directory of a feature
+        cache built by `speeq.data.stores.build_feature_cache` for the training
+        data using `train_speech_processor`, if empty no cache will be used.
+        Default ''.
+
+        test_feat_cache_dir (Union[str, Path]): The directory of a feature
+        cache built for the testing data using `test_speech_processor`, if
+        empty no cache will be used. Default ''.
+
+        manifest_type (str): The way the CSV files are held, either `memory`,
+        where all the rows are loaded at once, `lazy`, where the rows are
+        read on demand using an index of byte offsets saved next to each CSV
+        file, or `columnar`, where the rows are held in compact memory-mapped
+        columns shared by all the ranks and workers on the machine. In the
+        `lazy` and `columnar` modes, `sort_key` has to be a numerical column.
+        Default `memory`.
+
+        max_duration (float): The maximum duration in seconds of each training
+        example, where only a random window of that duration is decoded from
+        the longer audio files, which requires `train_speech_processor` to
+        start with an `AudioLoader`. As the text is not cropped, it is meant
+        for the targets that do not depend on the window. If set to 0 the
+        whole files are loaded. Default 0.
+
+        train_batch_processor (Optional[IProcessor]): The processor applied
+        on each collated training speech batch through `execute_batch`, such
+        as an `OrderedProcessor` of a `FeatExtractor` to extract the features
+        of the whole batch at once, in which case `train_speech_processor`
+        returns the waveforms. Default None.
+
+        test_batch_processor (Optional[IProcessor]): The processor
+        applied on each collated testing speech batch. Default None.
+
     """
 
     training_path: Union[str, Path]
@@ -160,6 +243,9 @@ class ASRDataConfig:
     text_processor: IProcessor
     tokenizer_path: Union[str, Path]
     tokenizer_type: str = "char_tokenizer"
+    tokenizer_args: dict = field(default_factory=dict)
+    vocab_min_freq: int = 1
+    vocab_n_workers: int = 1
     sep: str = ","
     type: str = "csv"
     text_key: str = FileKeys.text_key.value
@@ -173,6 +259,21 @@ class ASRDataConfig:
     sort_key: str = ""
     reverse: bool = False
     shuffle: bool = False
+    n_workers: int = 0
+    prefetch_size: int = 2
+    worker_type: str = "thread"
+    n_buckets: int = 0
+    duration_key: str = FileKeys.duration_key.value
+    max_frames: float = 0
+    max_tokens: int = 0
+    shard_type: str = "stride"
+    seed: int = 0
+    train_feat_cache_dir: Union[str, Path] = ""
+    test_feat_cache_dir: Union[str, Path] = ""
+    manifest_type: str = "memory"
+    max_duration: float = 0
+    train_batch_processor: Optional[IProcessor] = None
+    test_batch_processor: Optional[IProcessor] = None
 
 
 @dataclass
@@ -184,7 +285,9 @@ class ModelConfig:
         template (ITemplate): The model template.
 
         model_path (Union[str, Path]): The pre-trained checkpoint to load the
-        weights from. Default ''.
+        weights from, where the training continues from the step, the epoch
+        and the batch it was saved at, such as the `last_checkpoint.pt` that
+        is overwritten in the output directory at every evaluation. Default ''.
 
     """
 
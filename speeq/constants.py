@@ -25,6 +25,7 @@ PREV_HIDDEN_STATE_KEY = "prev_h"
 TOKENIZER_TYPE_KEY = "type"
 CHAR_TOKENIZER_TYPE = "char_tokenizer"
 WORD_TOKENIZER_TYPE = "word_tokenizer"
+BPE_TOKENIZER_TYPE = "bpe_tokenizer"
 # %%
 
 
@@ -32,6 +33,11 @@ class FileKeys(Enum):
     text_key = "text"
     speech_key = "file_path"
     duration_key = "duration"
+    n_samples_key = "n_samples"
+    sample_rate_key = "sample_rate"
+    n_channels_key = "n_channels"
+    n_frames_key = "n_frames"
+    n_tokens_key = "n_tokens"
 
 
 class StateKeys(Enum):
@@ -40,12 +46,17 @@ class StateKeys(Enum):
     model = "model"
     step = "step"
     optimizer = "optimizer"
+    loader = "loader"
+    front_end = "front_end"
 
 
 class HistoryKeys(Enum):
     train_loss = "train_loss"
     test_loss = "test_loss"
     min_loss = "min_loss"
+    shard_imbalance = "shard_imbalance"
+    step_imbalance = "step_imbalance"
+    data_time = "data_time"
 
 
 class LogCategories(Enum):
@@ -11,10 +11,12 @@ on the domain they operate on.
 The time domain augmenters include:
 
 - WhiteNoiseInjector: Adds white noise to the input signal.
+- NoiseInjector: Adds background noise from a noise bank to the input signal at a random SNR.
 - VolumeChanger: Changes the volume of the input signal by applying a random gain.
 - ConsistentAttenuator: Attenuates the amplitude of the input signal by a random single value.
 - VariableAttenuator: Attenuates the amplitude of the input signal by applying a random gain, where the gain varies across time steps.
 - Reverberation: Adds a reverberation effect to the input signal.
+- SpeedPerturbation: Changes the speed of the input signal by a random factor out of a given set.
 
 The frequency domain augmenters are:
 
@@ -38,13 +40,34 @@ The frequency domain augmenters are:
     # Apply the augmentation to the signal
     augmented_signal = noise_injector.run(signal)
 
+    # Apply the augmentation to a right-padded batch of signals of shape
+    # [B, M], where each example gets its own random parameters, and the
+    # padding is left as is
+    signals = torch.randn(4, 100)
+    lengths = torch.LongTensor([100, 80, 60, 40])
+    augmented_signals, lengths = noise_injector.run_batch(signals, lengths)
+
 """
+import functools
+import math
 import random
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
 
+import numpy as np
 import torch
 from torch import Tensor
+from torchaudio import transforms
+
+from speeq.utils.utils import get_mask_from_lens
+
+from .processes import SAMPLER_CACHE_SIZE, StochasticProcess
+from .stores import INT16_SCALE, ShardedStore
 
-from .processes import StochasticProcess
+
+def _get_batch_rand(x: Tensor) -> Tensor:
+    # a uniform random value per example, broadcastable over the example
+    return torch.rand((x.shape[0],) + (1,) * (x.dim() - 1), device=x.device)
 
 
 class WhiteNoiseInjector(StochasticProcess):
@@ -75,6 +98,88 @@ class WhiteNoiseInjector(StochasticProcess):
         gain = random.random() * self.gain_mul
         return x + gain * torch.randn_like(x).to(x.device)
 
+    def func_batch(self, x: Tensor, lengths: Tensor) -> Tensor:
+        gain = _get_batch_rand(x) * self.gain_mul
+        return x + gain * torch.randn_like(x)
+
+
+class NoiseInjector(StochasticProcess):
+    r"""Mixes a random segment of a real background noise recording into the
+    input signal at a random signal-to-noise ratio, where the noise is drawn
+    from a memory-mapped bank built by `speeq.data.stores.build_noise_bank`,
+    such that the segments are sliced from the bank without opening or
+    decoding any file. The noise is scaled as the below equation shows:
+
+        .. math::
+
+            x_{augmented} = x + noise \cdot \sqrt{P_x / (P_{noise} \cdot 10^{snr / 10})}
+
+    where `P` is the average power, and `snr` is drawn uniformly between
+    `min_snr` and `max_snr`.
+
+    Args:
+        noise_bank_dir (Union[str, Path]): The directory of the noise bank,
+        built at the sample rate of the input signals.
+
+        min_snr (float): The minimum signal-to-noise ratio in dB. Default 0.
+
+        max_snr (float): The maximum signal-to-noise ratio in dB. Default 20.
+
+        ratio (float): The ratio/rate that the augmentation will be applied to
+        the data. Default 1.0
+
+        eps (float): smoothing value, to prevent devision by 0. Default to 1e-8.
+    """
+
+    def __init__(
+        self,
+        noise_bank_dir: Union[str, Path],
+        min_snr: float = 0.0,
+        max_snr: float = 20.0,
+        ratio=1.0,
+        eps=1e-8,
+    ) -> None:
+        super().__init__(ratio)
+        self.noise_bank_dir = str(noise_bank_dir)
+        self.min_snr = min_snr
+        self.max_snr = max_snr
+        self.eps = eps
+        self._noise_bank = ShardedStore(noise_bank_dir)
+        self._noise_keys = sorted(self._noise_bank.entries)
+
+    def _get_noise(self, length: int) -> Tensor:
+        noise, _ = self._noise_bank.get(random.choice(self._noise_keys))
+        if noise.shape[-1] >= length:
+            start = random.randint(0, noise.shape[-1] - length)
+            noise = noise[start : start + length]
+        else:
+            noise = np.resize(noise, length)
+        return torch.from_numpy(noise).float() / INT16_SCALE
+
+    def _get_scale(self, x: Tensor, noise: Tensor, snr: Tensor, n: Tensor) -> Tensor:
+        signal_power = x.pow(2).sum(dim=-1, keepdim=True) / n
+        noise_power = noise.pow(2).sum(dim=-1, keepdim=True) / n
+        return torch.sqrt(signal_power / (noise_power * 10 ** (snr / 10) + self.eps))
+
+    def func(self, x: Tensor) -> Tensor:
+        noise = self._get_noise(x.shape[-1]).to(x.device)
+        snr = torch.tensor(random.uniform(self.min_snr, self.max_snr))
+        n = torch.tensor(max(1, x.shape[-1]))
+        return x + self._get_scale(x, noise, snr, n) * noise
+
+    def func_batch(self, x: Tensor, lengths: Tensor) -> Tensor:
+        """
+        x (Tensor): the padded signals to be augmented of shape [B, M].
+        """
+        lengths = lengths.to(x.device)
+        noise = torch.stack([self._get_noise(x.shape[-1]) for _ in range(x.shape[0])])
+        mask = get_mask_from_lens(lengths, x.shape[-1])
+        noise = noise.to(x.device) * mask
+        snr = torch.empty(x.shape[0], 1, device=x.device)
+        snr = snr.uniform_(self.min_snr, self.max_snr)
+        n = lengths.clamp(min=1).unsqueeze(dim=-1)
+        return x + self._get_scale(x * mask, noise, snr, n) * noise
+
 
 class VolumeChanger(StochasticProcess):
     """Amplifies the input signal by a random gain.
@@ -116,6 +221,10 @@ class VolumeChanger(StochasticProcess):
     def func(self, x: Tensor) -> Tensor:
         return self._gain * x
 
+    def func_batch(self, x: Tensor, lengths: Tensor) -> Tensor:
+        gain = self._diff * _get_batch_rand(x) + self.min_gain
+        return gain * x
+
 
 class ConsistentAttenuator(VolumeChanger):
     """applies amplitude attenuation to the input signal by multiplying it by a
@@ -167,10 +276,44 @@ class VariableAttenuator(StochasticProcess):
     def func(self, x: Tensor):
         return x + x * self.noise_mul * torch.randn_like(x).to(x.device)
 
+    def func_batch(self, x: Tensor, lengths: Tensor) -> Tensor:
+        return x + x * self.noise_mul * torch.randn_like(x)
+
+
+def _fft_convolve(x: Tensor, h: Tensor) -> Tensor:
+    # the full linear convolution of x [..., N] and h [..., K] through FFT
+    size = x.shape[-1] + h.shape[-1] - 1
+    n_fft = 1 << (size - 1).bit_length()
+    result = torch.fft.irfft(
+        torch.fft.rfft(x, n=n_fft) * torch.fft.rfft(h, n=n_fft), n=n_fft
+    )
+    return result[..., :size]
+
+
+def _direct_convolve(x: Tensor, h: Tensor) -> Tensor:
+    # the full linear convolution of x [..., N] and h [K] through conv1d, or
+    # of each row of x [B, N] with its own row of h [B, K] as grouped conv1d
+    shape = x.shape
+    if h.dim() == 1:
+        x = x.reshape(-1, 1, shape[-1])
+        weight = h.flip(dims=[-1]).view(1, 1, -1)
+        groups = 1
+    else:
+        x = x.reshape(1, -1, shape[-1])
+        weight = h.flip(dims=[-1]).unsqueeze(dim=1)
+        groups = x.shape[1]
+    x = torch.nn.functional.pad(x, [h.shape[-1] - 1, h.shape[-1] - 1])
+    x = torch.nn.functional.conv1d(x, weight, groups=groups)
+    return x.view(*shape[:-1], -1)
+
 
 class Reverberation(StochasticProcess):
-    """Reverberates the input signal by generating an impulse response
-    and convolve it with the speech signal.
+    """Reverberates the input signal by convolving it with an impulse response,
+    which is either generated, or drawn from a bank of real room impulse
+    responses built by `speeq.data.stores.build_rir_bank`. The output is
+    aligned with the center of the impulse response, and has the same length
+    as the input, where the responses shorter than `fft_threshold` are
+    convolved directly, and the longer ones through FFT.
 
     Args:
         ratio (float): The ratio/rate that the augmentation will be applied to
@@ -187,10 +330,26 @@ class Reverberation(StochasticProcess):
         function. Default 10.
 
         eps (float): smoothing value, to prevent devision by 0. Default to 1e-3.
+
+        rir_bank_dir (Union[str, Path]): The directory of a bank of room
+        impulse responses, built at the sample rate of the input signals, if
+        provided, the impulse responses are drawn from the memory-mapped bank
+        instead of being generated. Default ''.
+
+        fft_threshold (int): The impulse response length starting from which
+        the convolution is done through FFT. Default 64.
     """
 
     def __init__(
-        self, ratio=1.0, min_len=1000, max_len=4000, start_val=-10, end_val=10, eps=1e-3
+        self,
+        ratio=1.0,
+        min_len=1000,
+        max_len=4000,
+        start_val=-10,
+        end_val=10,
+        eps=1e-3,
+        rir_bank_dir: Union[str, Path] = "",
+        fft_threshold: int = 64,
     ) -> None:
         super().__init__(ratio)
         self.min_len = min_len
@@ -198,8 +357,15 @@ class Reverberation(StochasticProcess):
         self.start_val = start_val
         self.end_val = end_val
         self.eps = eps
-
-    def _get_impulse_response(self) -> Tensor:
+        self.rir_bank_dir = str(rir_bank_dir)
+        self.fft_threshold = fft_threshold
+        self._rir_bank = None
+        self._rir_keys = []
+        if rir_bank_dir:
+            self._rir_bank = ShardedStore(rir_bank_dir)
+            self._rir_keys = sorted(self._rir_bank.entries)
+
+    def _generate_impulse_response(self) -> Tensor:
         length = random.randint(self.min_len, self.max_len)
         x = torch.linspace(self.start_val, self.end_val, length)
         alpha = self.eps + random.random()
@@ -208,44 +374,208 @@ class Reverberation(StochasticProcess):
         numerator = torch.exp(x) - torch.exp(-x)
         envelope = 1 - (numerator / denominator) ** 2
         envelope = envelope.nan_to_num()
-        h = torch.randn_like(envelope) * envelope
-        return h.view(1, 1, length)
+        return torch.randn_like(envelope) * envelope
+
+    def _get_impulse_response(self) -> Tensor:
+        if self._rir_bank is None:
+            return self._generate_impulse_response()
+        h, _ = self._rir_bank.get(random.choice(self._rir_keys))
+        return torch.from_numpy(h)
+
+    def _convolve(self, x: Tensor, h: Tensor) -> Tensor:
+        # the part of the full convolution that is aligned with the center
+        # of the impulse response, of the same length as x, where h is either
+        # shared [K] or one impulse response per row of x [B, K]
+        if h.shape[-1] < self.fft_threshold:
+            result = _direct_convolve(x, h)
+        else:
+            result = _fft_convolve(x, h)
+        start = (h.shape[-1] - 1) // 2
+        return result[..., start : start + x.shape[-1]]
 
     def func(self, x: Tensor):
-        if x.dim() == 2:
-            x = x.unsqueeze(dim=0)
-        ir = self._get_impulse_response()
-        ir = ir.to(x.device)
-        ir = ir.flip(dims=[-1])
-        ir_length = ir.shape[-1]
-        is_odd = int(ir_length % 2 != 0)
-        x = torch.cat(
-            [
-                torch.zeros(1, 1, ir_length // 2).to(x.device),
-                x,
-                torch.zeros(1, 1, ir_length // 2 + is_odd).to(x.device),
-            ],
-            dim=-1,
+        ir = self._get_impulse_response().to(x.device, x.dtype)
+        return self._convolve(x, ir)
+
+    def func_batch(self, x: Tensor, lengths: Tensor) -> Tensor:
+        """
+        x (Tensor): the padded signals to be augmented of shape [B, M].
+        """
+        irs = [self._get_impulse_response() for _ in range(x.shape[0])]
+        max_len = max(ir.shape[-1] for ir in irs)
+        # each impulse response is shifted such that all of them share the
+        # same center, hence a single convolution serves the batch
+        h = torch.zeros(x.shape[0], max_len, dtype=x.dtype)
+        center = (max_len - 1) // 2
+        for item, ir in zip(h, irs):
+            offset = center - (ir.shape[-1] - 1) // 2
+            item[offset : offset + ir.shape[-1]] = ir
+        mask = get_mask_from_lens(lengths.to(x.device), x.shape[1])
+        return self._convolve(x * mask, h.to(x.device))
+
+
+class SpeedPerturbation(StochasticProcess):
+    """Changes the speed of the input signal, along with its pitch, by a
+    factor drawn randomly from the given factors, where the signal is
+    resampled from `sample_rate * factor` to `sample_rate`, such that a
+    factor larger than 1 speeds the signal up and shortens it. The resampling
+    kernels are built once per factor and cached.
+
+    As the lengths of the signals change, the durations the samplers use to
+    plan the batches are scaled by `length_ratio`, see `get_length_ratio`.
+
+    Args:
+        sample_rate (int): The sample rate of the input signals.
+
+        factors (List[float]): The speed factors to draw from. Default
+        [0.9, 1.0, 1.1].
+
+        ratio (float): The ratio/rate that the augmentation will be applied to
+        the data. Default 1.0
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        factors: Optional[List[float]] = None,
+        ratio=1.0,
+    ) -> None:
+        super().__init__(ratio)
+        self.sample_rate = sample_rate
+        self.factors = factors if factors is not None else [0.9, 1.0, 1.1]
+
+    @property
+    def length_ratio(self) -> float:
+        """The largest ratio of the output length to the input length."""
+        return 1 / min(self.factors)
+
+    @functools.lru_cache(SAMPLER_CACHE_SIZE)
+    def _get_resampler(self, factor: float, sample_rate: int) -> transforms.Resample:
+        return transforms.Resample(
+            orig_freq=round(sample_rate * factor), new_freq=sample_rate
         )
-        return torch.nn.functional.conv1d(x, ir).squeeze(dim=0)
+
+    def _perturb(self, x: Tensor, factor: float) -> Tensor:
+        if factor == 1:
+            return x
+        resampler = self._get_resampler(factor, self.sample_rate)
+        return resampler.to(x.device)(x)
+
+    def _get_length(self, length: Union[int, Tensor], factor: float):
+        # the same rounding as `torchaudio.transforms.Resample`
+        orig_freq = round(self.sample_rate * factor)
+        if isinstance(length, Tensor):
+            return torch.ceil(self.sample_rate * length / orig_freq).long()
+        return math.ceil(self.sample_rate * length / orig_freq)
+
+    def func(self, x: Tensor) -> Tensor:
+        return self._perturb(x, random.choice(self.factors))
+
+    def run_batch(self, x: Tensor, lengths: Tensor) -> Tuple[Tensor, Tensor]:
+        """Changes the speed of each example of a right-padded batch of
+        signals, where the examples that share a factor are resampled
+        together, and the lengths are updated accordingly.
+
+        Args:
+            x (Tensor): The padded signals of shape [B, M].
+
+            lengths (Tensor): The length of each example of shape [B].
+
+        Returns:
+            Tuple[Tensor, Tensor]: The perturbed signals, padded with zeros,
+            and their lengths.
+        """
+        factors = [
+            random.choice(self.factors) if self._shall_do else 1
+            for _ in range(x.shape[0])
+        ]
+        new_lengths = lengths.clone()
+        results = {}
+        for factor in set(factors):
+            indices = [i for i, item in enumerate(factors) if item == factor]
+            results[factor] = (indices, self._perturb(x[indices], factor))
+            new_lengths[indices] = self._get_length(lengths[indices], factor)
+        result = torch.zeros(x.shape[0], int(new_lengths.max()), dtype=x.dtype)
+        result = result.to(x.device)
+        for indices, perturbed in results.values():
+            for i, item in zip(indices, perturbed):
+                length = int(new_lengths[i])
+                result[i, :length] = item[:length]
+        return result, new_lengths
 
 
 class _BaseMasking(StochasticProcess):
-    def __init__(self, n: int, max_length: int, ratio=1.0) -> None:
+    # the masked axis, -1 for the frequency and -2 for the time
+    _dim = -1
+
+    def __init__(
+        self,
+        n: int,
+        max_length: int,
+        ratio=1.0,
+        max_ratio: Optional[float] = None,
+        inplace: bool = False,
+    ) -> None:
         super().__init__(ratio)
         self.n = n
         self.max_length = max_length
+        self.max_ratio = max_ratio
+        self.inplace = inplace
+
+    def _get_masked(self, lengths: Tensor, max_len: int) -> Tensor:
+        # the masked positions of shape [B, max_len], where the n segments of
+        # each example are drawn within its own length, as start/width
+        # tensors compared against the positions at once
+        lengths = lengths.view(-1, 1, 1)
+        max_width = torch.full_like(lengths, self.max_length)
+        if self.max_ratio is not None:
+            max_width = torch.minimum(max_width, (lengths * self.max_ratio).long())
+        shape = (lengths.shape[0], self.n, 1)
+        start = (torch.rand(shape, device=lengths.device) * (lengths + 1)).long()
+        width = (torch.rand(shape, device=lengths.device) * (max_width + 1)).long()
+        end = torch.minimum(start + width, lengths)
+        indices = torch.arange(max_len, device=lengths.device)
+        return ((indices >= start) & (indices < end)).any(dim=1)
+
+    def _apply(self, x: Tensor, masked: Tensor) -> Tensor:
+        if self.inplace is True:
+            return x.masked_fill_(masked, 0)
+        return x.masked_fill(masked, 0)
+
+    def _get_example_masked(self, x: Tensor, lengths: Tensor) -> Tensor:
+        # the masked positions of a padded batch, broadcastable to [B, T, F]
+        if self._dim == -1:
+            lengths = torch.full_like(lengths, x.shape[-1])
+            return self._get_masked(lengths, x.shape[-1]).unsqueeze(dim=1)
+        return self._get_masked(lengths, x.shape[-2]).unsqueeze(dim=-1)
 
-    def _get_mask(self, x: Tensor, dim=-1):
-        mask = torch.ones_like(x, device=x.device)
-        length = x.shape[dim]
-        for _ in range(self.n):
-            start = random.randint(0, length)
-            end = random.randint(start, start + self.max_length)
-            end = min(length, end)
-            indices = torch.arange(start, end, device=x.device)
-            mask = mask.index_fill(dim=dim, index=indices, value=0)
-        return mask
+    def func(self, x: Tensor) -> Tensor:
+        """
+        x (Tensor): the input spectrogram to be augmented of
+        shape [..., time, freq].
+        """
+        length = x.shape[self._dim]
+        lengths = torch.full((1,), length, device=x.device)
+        masked = self._get_masked(lengths, length)[0]
+        if self._dim == -2:
+            masked = masked.unsqueeze(dim=-1)
+        return self._apply(x, masked)
+
+    def func_batch(self, x: Tensor, lengths: Tensor) -> Tensor:
+        """
+        x (Tensor): the padded spectrograms to be augmented of
+        shape [B, time, freq].
+        """
+        return self._apply(x, self._get_example_masked(x, lengths.to(x.device)))
+
+    def run_batch(self, x: Tensor, lengths: Tensor) -> Tuple[Tensor, Tensor]:
+        lengths = lengths.to(x.device)
+        selected = torch.rand(x.shape[0], 1, 1, device=x.device) <= self.ratio
+        valid = get_mask_from_lens(lengths, x.shape[1]).unsqueeze(dim=-1)
+        # a single masked fill over the batch, covering the selection of the
+        # examples and keeping the padding as is
+        masked = self._get_example_masked(x, lengths) & selected & valid
+        return self._apply(x, masked), lengths
 
 
 class FrequencyMasking(_BaseMasking):
@@ -258,17 +588,31 @@ class FrequencyMasking(_BaseMasking):
 
         ratio (float): The ratio/rate that the augmentation will be applied to
         the data. Default 1.0
+
+        max_ratio (Optional[float]): The maximum masking length relative to
+        the number of frequency bins, the smaller of it and `max_length` is
+        used. Default None.
+
+        inplace (bool): Whether to mask the input in place. Default False.
     """
 
-    def __init__(self, n: int, max_length: int, ratio=1.0) -> None:
-        super().__init__(ratio=ratio, n=n, max_length=max_length)
+    _dim = -1
 
-    def func(self, x: Tensor) -> Tensor:
-        """
-        x (Tensor): the input spectrogram to be augmented of
-        shape [..., time, freq].
-        """
-        return x * self._get_mask(x, dim=-1)
+    def __init__(
+        self,
+        n: int,
+        max_length: int,
+        ratio=1.0,
+        max_ratio: Optional[float] = None,
+        inplace: bool = False,
+    ) -> None:
+        super().__init__(
+            ratio=ratio,
+            n=n,
+            max_length=max_length,
+            max_ratio=max_ratio,
+            inplace=inplace,
+        )
 
 
 class TimeMasking(_BaseMasking):
@@ -281,14 +625,28 @@ class TimeMasking(_BaseMasking):
 
         ratio (float): The ratio/rate that the augmentation will be applied to
         the data. Default 1.0
+
+        max_ratio (Optional[float]): The maximum masking length relative to
+        the length of each utterance, the smaller of it and `max_length` is
+        used, as in the adaptive SpecAugment policies. Default None.
+
+        inplace (bool): Whether to mask the input in place. Default False.
     """
 
-    def __init__(self, n: int, max_length: int, ratio=1.0) -> None:
-        super().__init__(ratio=ratio, n=n, max_length=max_length)
+    _dim = -2
 
-    def func(self, x: Tensor) -> Tensor:
-        """
-        x (Tensor): the input spectrogram to be augmented of
-        shape [..., time, freq].
-        """
-        return x * self._get_mask(x, dim=-2)
+    def __init__(
+        self,
+        n: int,
+        max_length: int,
+        ratio=1.0,
+        max_ratio: Optional[float] = None,
+        inplace: bool = False,
+    ) -> None:
+        super().__init__(
+            ratio=ratio,
+            n=n,
+            max_length=max_length,
+            max_ratio=max_ratio,
+            inplace=inplace,
+        )
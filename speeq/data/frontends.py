@@ -0,0 +1,271 @@
+"""
+This module contains a scriptable speech front end, which fuses the audio
+and spectrogram stages of a `SpeechProcessor`, without the augmenters, into a
+single `nn.Module`, such that the features are computed in one graph that can be
+exported with TorchScript and shipped along with the model.
+
+Classes:
+
+- SpeechFrontEnd: Runs the resampling, the feature extraction, the feature stacking and the frame contextualization on a waveform.
+
+Functions:
+
+- get_front_end: Builds a `SpeechFrontEnd` from the audio and spectrogram stages of a speech processor, leaving out the augmenters.
+- export_front_end: Scripts a front end with TorchScript and saves it.
+- load_front_end: Loads a front end exported by `export_front_end`.
+- bundle_front_end: Scripts a front end and stores it inside a model checkpoint.
+- get_bundled_front_end: Loads the front end stored inside a loaded model checkpoint, if any.
+
+Example usage:
+
+    .. code-block:: python
+
+        import torchaudio
+        from speeq.data.frontends import export_front_end, get_front_end, load_front_end
+        from speeq.data.processes import AudioLoader, FeatExtractor, FeatStacker
+        from speeq.data.processors import OrderedProcessor, SpeechProcessor
+
+        speech_processor = SpeechProcessor(
+            audio_processor=OrderedProcessor([AudioLoader(sample_rate=16000)]),
+            spec_processor=OrderedProcessor(
+                [
+                    FeatExtractor(feat_ext_name='melspec', feat_ext_args={}),
+                    FeatStacker(feat_stack_factor=2),
+                ]
+            ),
+        )
+        front_end = get_front_end(speech_processor)
+        export_front_end(front_end, 'path/to/front_end.pt')
+
+        # the exported front end runs without the speeq processors
+        front_end = load_front_end('path/to/front_end.pt')
+        x, sr = torchaudio.load('path/to/audio.wav')
+        feats = front_end(x, sr)  # [1, T, F]
+
+        # or shipping the front end inside the model checkpoint, which the
+        # predictors use when no speech processor is given
+        bundle_front_end(front_end, 'path/to/checkpoint.pt')
+"""
+import io
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import torch
+from torch import Tensor, nn
+from torchaudio import transforms
+
+from speeq.constants import StateKeys
+
+from .processes import (
+    AudioLoader,
+    FeatExtractor,
+    FeatStacker,
+    FrameContextualizer,
+    add_context,
+    stack_feats,
+)
+from .processors import SpeechProcessor
+
+RESAMPLE_RATES = [8000, 16000, 22050, 44100, 48000]
+
+
+class _FeatExtraction(nn.Module):
+    def __init__(self, feat_extractor: nn.Module) -> None:
+        super().__init__()
+        self.feat_extractor = feat_extractor
+
+    def forward(self, x: Tensor) -> Tensor:
+        return self.feat_extractor(x).transpose(-1, -2)
+
+
+class _FeatStacking(nn.Module):
+    def __init__(self, factor: int) -> None:
+        super().__init__()
+        self.factor = factor
+
+    def forward(self, x: Tensor) -> Tensor:
+        return stack_feats(x, self.factor)
+
+
+class _FrameContext(nn.Module):
+    def __init__(self, context_size: int) -> None:
+        super().__init__()
+        self.context_size = context_size
+
+    def forward(self, x: Tensor) -> Tensor:
+        return add_context(x, self.context_size)
+
+
+class SpeechFrontEnd(nn.Module):
+    """Turns a waveform into the model input features in a single module,
+    where the input is resampled to the target sample rate first, and the
+    given modules are applied in order.
+
+    Args:
+        sample_rate (int): The sample rate the modules expect.
+
+        modules (List[nn.Module]): The modules to be applied on the resampled
+        waveform.
+
+        resample_rates (Optional[List[int]]): The input sample rates to
+        pre-build the resamplers for, where the inputs at any other rate than
+        these and `sample_rate` raise an error. If None, `RESAMPLE_RATES` is
+        used. Default None.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        modules: List[nn.Module],
+        resample_rates: Optional[List[int]] = None,
+    ) -> None:
+        super().__init__()
+        if resample_rates is None:
+            resample_rates = RESAMPLE_RATES
+        self.sample_rate = sample_rate
+        # TorchScript modules need their sub-modules ahead of time, hence
+        # the resamplers are built for a fixed set of rates
+        self.resamplers = nn.ModuleDict(
+            {
+                str(sr): transforms.Resample(orig_freq=sr, new_freq=sample_rate)
+                for sr in resample_rates
+                if sr != sample_rate
+            }
+        )
+        self.layers = nn.Sequential(*modules)
+
+    def forward(self, x: Tensor, sample_rate: int) -> Tensor:
+        """Computes the features of the given waveform.
+
+        Args:
+            x (Tensor): The waveform of shape [C, M].
+
+            sample_rate (int): The sample rate of the waveform.
+
+        Returns:
+            Tensor: The features of shape [C, T, F].
+        """
+        if sample_rate != self.sample_rate:
+            key = str(sample_rate)
+            found = False
+            for name, resampler in self.resamplers.items():
+                if name == key:
+                    x = resampler(x)
+                    found = True
+            if not found:
+                raise ValueError(f"unsupported sample rate {sample_rate}")
+        return self.layers(x)
+
+
+def _to_module(process: Any) -> Union[nn.Module, None]:
+    if isinstance(process, AudioLoader):
+        return None
+    if isinstance(process, FeatExtractor):
+        return _FeatExtraction(process.feat_extractor)
+    if isinstance(process, FeatStacker):
+        return _FeatStacking(process.feat_stack_factor)
+    if isinstance(process, FrameContextualizer):
+        return _FrameContext(process.contex_size)
+    raise ValueError(
+        f"{process.__class__.__name__} is not supported by the speech front end!"
+    )
+
+
+def get_front_end(
+    speech_processor: SpeechProcessor, **kwargs: Dict[str, Any]
+) -> SpeechFrontEnd:
+    """Builds a `SpeechFrontEnd` from the processes of the audio processor
+    and the spectrogram processor of the speech processor, where the
+    augmenters are left out, and the sample rate is taken from its `AudioLoader`.
+
+    Args:
+        speech_processor (SpeechProcessor): The speech processor, where the
+        audio processor starts with an `AudioLoader`, and the rest of the
+        processes are `FeatExtractor`, `FeatStacker` or `FrameContextualizer`.
+
+        kwargs: The additional arguments of `SpeechFrontEnd`.
+
+    Returns:
+        SpeechFrontEnd: The front end.
+    """
+    processes = [
+        process
+        for stage in ["audio_processor", "spec_processor"]
+        if speech_processor.get_processor(stage) is not None
+        for process in speech_processor.get_processor(stage).processes
+    ]
+    if len(processes) == 0 or not isinstance(processes[0], AudioLoader):
+        raise ValueError("The audio processor has to start with an AudioLoader!")
+    modules = [module for module in map(_to_module, processes) if module is not None]
+    return SpeechFrontEnd(processes[0].sample_rate, modules, **kwargs).eval()
+
+
+def export_front_end(front_end: SpeechFrontEnd, file_path: Union[str, Path]) -> None:
+    """Scripts the front end with TorchScript and saves it.
+
+    Args:
+        front_end (SpeechFrontEnd): The front end to export.
+
+        file_path (Union[str, Path]): The path to save the scripted module to.
+    """
+    torch.jit.save(torch.jit.script(front_end), str(file_path))
+
+
+def load_front_end(file_path: Union[str, Path], device: str = "cpu") -> nn.Module:
+    """Loads a front end exported by `export_front_end`.
+
+    Args:
+        file_path (Union[str, Path]): The path of the scripted module.
+
+        device (str): The device to map the module to. Default 'cpu'.
+
+    Returns:
+        nn.Module: The scripted front end.
+    """
+    return torch.jit.load(str(file_path), map_location=device)
+
+
+def bundle_front_end(
+    front_end: SpeechFrontEnd,
+    ckpt_path: Union[str, Path],
+    save_path: Optional[Union[str, Path]] = None,
+) -> None:
+    """Scripts the front end with TorchScript and stores it inside a model
+    checkpoint, such that the front end ships along with the model weights.
+
+    Args:
+        front_end (SpeechFrontEnd): The front end to bundle.
+
+        ckpt_path (Union[str, Path]): The model checkpoint.
+
+        save_path (Optional[Union[str, Path]]): The path to save the bundled
+        checkpoint to. If None, the checkpoint is overwritten. Default None.
+    """
+    if save_path is None:
+        save_path = ckpt_path
+    state = torch.load(ckpt_path)
+    buffer = io.BytesIO()
+    torch.jit.save(torch.jit.script(front_end), buffer)
+    state[StateKeys.front_end.value] = buffer.getvalue()
+    tmp_path = str(save_path) + ".tmp"
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, save_path)
+
+
+def get_bundled_front_end(state: dict, device: str = "cpu") -> Optional[nn.Module]:
+    """Loads the front end stored inside a model checkpoint by `bundle_front_end`.
+
+    Args:
+        state (dict): The loaded model checkpoint.
+
+        device (str): The device to map the module to. Default 'cpu'.
+
+    Returns:
+        Optional[nn.Module]: The scripted front end, or None if the checkpoint
+        has no front end.
+    """
+    data = state.get(StateKeys.front_end.value)
+    if data is None:
+        return None
+    return torch.jit.load(io.BytesIO(data), map_location=device)
@@ -14,21 +14,65 @@ Data loader classes
 The `CSVDataset` class provides a generic base class for handling CSV datasets,
 while the `SpeechTextDataset` class is specifically designed for speech-text pairs.
 The `SpeechTextLoader` class builds an iterable data loader for speech-text pairs,
-which can be used for training speech recognition models.
+which can be used for training speech recognition models. The loader can
+optionally prepare the batches ahead of the training loop using a pool of
+worker threads or processes.
 """
 
+import math
 import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Tuple, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import torch
 from torch import Tensor
 
 from speeq.constants import FileKeys
-from speeq.interfaces import IDataLoader, IDataset, IPadder, ITokenizer
-from speeq.utils.utils import get_pad_mask, load_csv
+from speeq.interfaces import IDataLoader, IDataset, IPadder, ISampler, ITokenizer
+from speeq.utils.utils import get_mask_from_lens, get_pad_mask, load_csv
 
-from .processors import IProcessor
+from .manifests import ColumnarCSVManifest, LazyCSVManifest
+from .processes import AudioWindow
+from .processors import IProcessor, OrderedProcessor, ProcessorProfile
+from .stores import FeatureCache
+
+MANIFEST_TYPES = {
+    "memory": None,
+    "lazy": LazyCSVManifest,
+    "columnar": ColumnarCSVManifest,
+}
+
+LOADER_EPOCH_KEY = "epoch"
+LOADER_COUNTER_KEY = "counter"
+LOADER_SEED_KEY = "seed"
+
+WORKER_TYPES = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+
+# The loader copy owned by the current worker process, set by `_init_worker`.
+_worker_loader = None
+
+
+def _init_worker(loader: object) -> None:
+    global _worker_loader
+    _worker_loader = loader
+    # forked workers inherit the parent's records as well, which are dropped
+    # so that only the worker's own records are shipped back
+    for profile in loader._get_profiles():
+        profile.reset()
+    # forked workers inherit the parent's RNG states, re-seeding them
+    # prevents all the workers from producing the same augmentations.
+    random.seed()
+    torch.manual_seed(random.getrandbits(63))
+    torch.set_num_threads(1)
+
+
+def _load_batch_in_worker(indices: List[int]) -> Tuple[Any, List[dict]]:
+    batch = _worker_loader._load_batch(indices)
+    # the profiles live in the worker's copy, hence the records are shipped
+    # back along with the batch and merged by the parent
+    return batch, [profile.pop() for profile in _worker_loader._get_profiles()]
 
 
 class CSVDataset(IDataset):
@@ -46,6 +90,20 @@ class CSVDataset(IDataset):
         reverse (bool): Used to specify the sorting order. If set to False, data
         will be sorted in ascending order. If set to True, data will be sorted
         in descending order. Default is False.
+
+        manifest_type (str): The way the CSV file is held, either `memory`,
+        where all the rows are loaded into a list, `lazy`, where the rows
+        are parsed on demand using a persistent index of byte offsets, see
+        `speeq.data.manifests.LazyCSVManifest`, or `columnar`, where the rows
+        are held in compact columns shared across processes, see
+        `speeq.data.manifests.ColumnarCSVManifest`. In the `lazy` and
+        `columnar` modes, the sort key has to be a numerical column.
+        Default is `memory`.
+
+        key_columns (Optional[List[str]]): The numerical columns to be
+        pre-computed in the `lazy` and `columnar` modes, such that they can be
+        retrieved without parsing the rows, the sort key is always included.
+        Default is None.
     """
 
     def __init__(
@@ -55,10 +113,29 @@ class CSVDataset(IDataset):
         encoding="utf-8",
         sort_key: Optional[str] = "",
         reverse: bool = False,
+        manifest_type: str = "memory",
+        key_columns: Optional[List[str]] = None,
     ) -> None:
         super().__init__()
+        if manifest_type not in MANIFEST_TYPES:
+            raise KeyError(
+                f"invalid manifest type, please use one of {list(MANIFEST_TYPES.keys())}"
+            )
         self.data_path = data_path
         self.sep = sep
+        if MANIFEST_TYPES[manifest_type] is not None:
+            key_columns = list(key_columns) if key_columns is not None else []
+            if sort_key != "" and sort_key not in key_columns:
+                key_columns.append(sort_key)
+            self.data = MANIFEST_TYPES[manifest_type](
+                data_path=data_path,
+                encoding=encoding,
+                sep=sep,
+                key_columns=key_columns,
+            )
+            if sort_key != "":
+                self.data.sort(sort_key, reverse=reverse)
+            return
         self.data = load_csv(file_path=data_path, encoding=encoding, sep=sep)
         if sort_key != "":
             self.data = list(
@@ -71,6 +148,32 @@ class CSVDataset(IDataset):
     def __len__(self) -> int:
         return len(self.data)
 
+    def has_column(self, key: str) -> bool:
+        """Checks whether the dataset has the given column.
+
+        Args:
+            key (str): The column name.
+
+        Returns:
+            bool: True if the column exists, otherwise False.
+        """
+        if isinstance(self.data, list):
+            return len(self.data) > 0 and key in self.data[0]
+        return key in self.data.header
+
+    def get_column(self, key: str) -> list:
+        """Returns the values of the given column for all the examples.
+
+        Args:
+            key (str): The column name.
+
+        Returns:
+            list: The column's values, ordered as the dataset.
+        """
+        if isinstance(self.data, list):
+            return [item[key] for item in self.data]
+        return self.data.get_column(key)
+
 
 class SpeechTextDataset(CSVDataset):
     """Implements a basic dataset for speech-text pairs to be used in
@@ -110,6 +213,25 @@ class SpeechTextDataset(CSVDataset):
         data will be sorted in ascending order. If set to True, data will be
         sorted in descending order. Default is False.
 
+        manifest_type (str): The way the CSV file is held, either `memory`,
+        `lazy` or `columnar`, see `CSVDataset`. Default is `memory`.
+
+        key_columns (Optional[List[str]]): The numerical columns to be
+        pre-computed in the `lazy` and `columnar` modes. Default is None.
+
+        feature_cache (Optional[FeatureCache]): The cache of the deterministic
+        speech processing results, if provided, only the stochastic processors
+        of the speech processor will be applied on the cached features of the
+        files in the cache. Default None.
+
+        max_duration (Optional[float]): The maximum duration in seconds of
+        each example, where only a random window of that duration is decoded
+        from the longer audio files, see `AudioWindow`. The speech processor
+        has to start with an `AudioLoader`, and the cropping does not apply
+        to the cached features. As the text is not cropped, it is meant for
+        the targets that do not depend on the window. If None the whole files
+        are loaded. Default None.
+
         Example:
 
         .. code-block:: python
@@ -168,6 +290,10 @@ class SpeechTextDataset(CSVDataset):
         speech_key: Optional[str] = FileKeys.speech_key.value,
         sort_key: Optional[str] = "",
         reverse: bool = False,
+        manifest_type: str = "memory",
+        key_columns: Optional[List[str]] = None,
+        feature_cache: Optional[FeatureCache] = None,
+        max_duration: Optional[float] = None,
     ) -> None:
         super().__init__(
             data_path=data_path,
@@ -175,7 +301,11 @@ class SpeechTextDataset(CSVDataset):
             encoding=encoding,
             sort_key=sort_key,
             reverse=reverse,
+            manifest_type=manifest_type,
+            key_columns=key_columns,
         )
+        self.feature_cache = feature_cache
+        self.max_duration = max_duration
         self.tokenizer = tokenizer
         self.speech_processor = speech_processor
         self.text_processor = text_processor
@@ -192,7 +322,14 @@ class SpeechTextDataset(CSVDataset):
         return torch.LongTensor(tokens), len(tokens)
 
     def _process_speech(self, file_path: Union[Path, str]) -> Tuple[Tensor, int]:
-        speech = self.speech_processor.execute(file_path)
+        if self.feature_cache is not None and file_path in self.feature_cache:
+            speech = self.feature_cache.get(file_path)
+            speech = self.speech_processor.execute_stochastic(speech)
+        elif self.max_duration is not None:
+            window = AudioWindow(file_path, self.max_duration)
+            speech = self.speech_processor.execute(window)
+        else:
+            speech = self.speech_processor.execute(file_path)
         if speech.dim() == 1:
             # [M]
             speech_len = speech.shape[0]
@@ -203,6 +340,22 @@ class SpeechTextDataset(CSVDataset):
             speech_len = speech.shape[-2]
         return speech, speech_len
 
+    def get_text_lengths(self) -> List[int]:
+        """Returns the tokenized text lengths of all the examples, which are
+        read from the `n_tokens` column added by
+        `speeq.data.preparation.enrich_manifest` if it exists, otherwise all
+        the texts are tokenized.
+
+        Returns:
+            List[int]: The text lengths, ordered as the dataset.
+        """
+        if self.has_column(FileKeys.n_tokens_key.value):
+            return [
+                int(float(length))
+                for length in self.get_column(FileKeys.n_tokens_key.value)
+            ]
+        return [self._process_text(text)[1] for text in self.get_column(self.text_key)]
+
     def __getitem__(self, idx: int) -> dict:
         item = super().__getitem__(idx)
         text, text_len = self._process_text(item[self.text_key])
@@ -227,6 +380,27 @@ class _DataLoader(IDataLoader):
 
         shuffle (bool): A flag indicating whether the dataset should be
         shuffled at each iteration. Default is False.
+
+        n_workers (int): The number of workers used to prepare the batches
+        ahead of the consumer, if set to 0 the batches will be prepared in
+        the calling process once requested. Default is 0.
+
+        prefetch_size (int): The maximum number of batches to be prepared
+        ahead of the consumer when workers are used. Default is 2.
+
+        worker_type (str): The type of the workers, either `thread` or
+        `process`. Default is `thread`.
+
+        sampler (Optional[ISampler]): The batch sampler that decides the
+        examples of each batch, if provided, the sharding and the shuffling
+        are delegated to the sampler. Default None.
+
+        seed (Optional[int]): The seed used to shuffle the examples at each
+        epoch, such that the order of any epoch can be reproduced when
+        resuming, if None a random seed is drawn. Default None.
+
+        drop_last (bool): A flag to drop the last batch if it is smaller than
+        `batch_size`. Default True.
     """
 
     def __init__(
@@ -236,7 +410,20 @@ class _DataLoader(IDataLoader):
         rank: int = 0,
         world_size: int = 1,
         shuffle: bool = False,
+        n_workers: int = 0,
+        prefetch_size: int = 2,
+        worker_type: str = "thread",
+        sampler: Optional[ISampler] = None,
+        seed: Optional[int] = None,
+        drop_last: bool = True,
     ) -> None:
+        self._pool = None
+        self._queue = deque()
+        if worker_type not in WORKER_TYPES:
+            raise KeyError(
+                f"invalid worker type, please use one of {list(WORKER_TYPES.keys())}"
+            )
+        assert prefetch_size > 0
         self.rank = rank
         self.world_size = world_size
         self.data = dataset
@@ -244,8 +431,26 @@ class _DataLoader(IDataLoader):
         self.length = len(self.indices)
         self._counter = 0
         self.batch_size = batch_size
+        self.drop_last = drop_last
         self.n_batches = self.length // self.batch_size
+        if drop_last is False:
+            self.n_batches = math.ceil(self.length / self.batch_size)
         self.shuffle = shuffle
+        self.n_workers = n_workers
+        self.prefetch_size = prefetch_size
+        self.worker_type = worker_type
+        self._submit_counter = 0
+        self.sampler = sampler
+        self.epoch = 0
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self._resumed = False
+        self.batches = []
+        self._plan_batches()
+
+    @property
+    def n_completed_epochs(self) -> int:
+        """The number of epochs that were fully consumed."""
+        return self.epoch + int(0 < self.n_batches <= self._counter)
 
     @property
     def start_idx(self):
@@ -255,6 +460,139 @@ class _DataLoader(IDataLoader):
     def end_idx(self):
         return min(self.length, (1 + self._counter) * self.batch_size)
 
+    def _plan_batches(self) -> None:
+        if self.sampler is not None:
+            self.batches = self.sampler.get_batches(epoch=self.epoch)
+            self.n_batches = len(self.batches)
+
+    def _shuffle(self) -> None:
+        # the order depends only on the seed and the epoch, which makes
+        # any epoch reproducible from the loader's state
+        self.indices = [*range(self.rank, len(self.data), self.world_size)]
+        random.Random(self.seed + self.epoch).shuffle(self.indices)
+
+    def _start_epoch(self) -> None:
+        if self.sampler is not None:
+            self._plan_batches()
+        elif self.shuffle is True:
+            self._shuffle()
+
+    def state_dict(self) -> dict:
+        """Returns the state of the loader, which is the epoch, the number
+        of the consumed batches in the current epoch, and the shuffling seed.
+
+        Returns:
+            dict: The loader's state.
+        """
+        return {
+            LOADER_EPOCH_KEY: self.epoch,
+            LOADER_COUNTER_KEY: self._counter,
+            LOADER_SEED_KEY: self.seed,
+        }
+
+    def load_state_dict(self, state_dict: dict) -> None:
+        """Restores the loader's state, where the order of the epoch is
+        re-created, and the next iteration over the loader continues from
+        the next batch after the last consumed one.
+
+        Args:
+            state_dict (dict): The loader's state as returned by `state_dict`.
+        """
+        self.close()
+        self.epoch = state_dict[LOADER_EPOCH_KEY]
+        self.seed = state_dict[LOADER_SEED_KEY]
+        self._start_epoch()
+        self._counter = min(state_dict[LOADER_COUNTER_KEY], self.n_batches)
+        # if the epoch was completed the next iteration starts a new one
+        self._resumed = 0 < self._counter < self.n_batches
+
+    def _get_batch_indices(self, counter: int) -> List[int]:
+        if self.sampler is not None:
+            return self.batches[counter]
+        start_idx = counter * self.batch_size
+        end_idx = min(self.length, (1 + counter) * self.batch_size)
+        return self.indices[start_idx:end_idx]
+
+    def _load_batch(self, indices: List[int]) -> Any:
+        raise NotImplementedError
+
+    def _get_profiles(self) -> List[ProcessorProfile]:
+        return []
+
+    def get_profile_stats(self) -> Dict[str, Dict[str, float]]:
+        """Returns the statistics of the profiled processors used by the
+        loader, aggregated across the workers, see `ProcessorProfile.get_stats`.
+
+        Returns:
+            Dict[str, Dict[str, float]]: The statistics of each process, which
+            is empty if the profiling is not enabled.
+        """
+        merged = ProcessorProfile()
+        for profile in self._get_profiles():
+            merged.update(profile.get_records())
+        return merged.get_stats()
+
+    def reset_profile(self) -> None:
+        """Drops the records of the profiled processors used by the loader."""
+        for profile in self._get_profiles():
+            profile.reset()
+
+    def _start_workers(self) -> None:
+        self.close()
+        if self.worker_type == "process":
+            self._pool = ProcessPoolExecutor(
+                self.n_workers, initializer=_init_worker, initargs=(self,)
+            )
+        else:
+            self._pool = ThreadPoolExecutor(self.n_workers)
+        self._submit_counter = self._counter
+
+    def _prefetch(self) -> None:
+        func = (
+            _load_batch_in_worker if self.worker_type == "process" else self._load_batch
+        )
+        while (
+            len(self._queue) < self.prefetch_size
+            and self._submit_counter < self.n_batches
+        ):
+            indices = self._get_batch_indices(self._submit_counter)
+            self._queue.append(self._pool.submit(func, indices))
+            self._submit_counter += 1
+
+    def _next_prefetched(self) -> Any:
+        if self._pool is None:
+            self._start_workers()
+        self._prefetch()
+        try:
+            batch = self._queue.popleft().result()
+        except BaseException:
+            self.close()
+            raise
+        if self.worker_type == "process":
+            batch, records = batch
+            for profile, stats in zip(self._get_profiles(), records):
+                profile.update(stats)
+        return batch
+
+    def close(self) -> None:
+        """Cancels any pending batches and shuts the workers down, if any."""
+        for future in self._queue:
+            future.cancel()
+        self._queue.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def __getstate__(self) -> dict:
+        # the workers and the pending batches are owned by the parent process
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        state["_queue"] = deque()
+        return state
+
+    def __del__(self) -> None:
+        self.close()
+
     def __len__(self):
         return self.n_batches
 
@@ -286,6 +624,34 @@ class SpeechTextLoader(_DataLoader):
         shuffle (bool): A flag indicating whether the dataset should be
         shuffled at each iteration. Default is False.
 
+        n_workers (int): The number of workers used to load and collate the
+        batches ahead of the consumer, if set to 0 the batches will be
+        prepared in the calling process once requested. Default is 0.
+
+        prefetch_size (int): The maximum number of batches to be prepared
+        ahead of the consumer when workers are used. Default is 2.
+
+        worker_type (str): The type of the workers, either `thread` or
+        `process`. Default is `thread`.
+
+        sampler (Optional[ISampler]): The batch sampler that decides the
+        examples of each batch such as `BucketSampler`, if provided, the
+        sharding and the shuffling are delegated to the sampler. Default None.
+
+        seed (Optional[int]): The seed used to shuffle the examples at each
+        epoch, if None a random seed is drawn. Default None.
+
+        drop_last (bool): A flag to drop the last batch if it is smaller than
+        `batch_size`, which has to be False for evaluation, such that all the
+        examples are covered. Default True.
+
+        batch_processor (Optional[OrderedProcessor]): The processor applied
+        on each collated speech batch through `execute_batch`, such that the
+        features can be extracted for the whole batch at once, where the
+        dataset returns the waveforms of shape [1, M], and the speech padder
+        pads on the right. The speech mask is re-computed from the lengths
+        it returns. Default None.
+
         Example:
 
         .. code-block:: python
@@ -350,6 +716,13 @@ class SpeechTextLoader(_DataLoader):
         rank: int = 0,
         world_size: int = 1,
         shuffle: bool = False,
+        n_workers: int = 0,
+        prefetch_size: int = 2,
+        worker_type: str = "thread",
+        sampler: Optional[ISampler] = None,
+        seed: Optional[int] = None,
+        batch_processor: Optional[OrderedProcessor] = None,
+        drop_last: bool = True,
     ) -> None:
         super().__init__(
             dataset=dataset,
@@ -357,9 +730,33 @@ class SpeechTextLoader(_DataLoader):
             world_size=world_size,
             batch_size=batch_size,
             shuffle=shuffle,
+            n_workers=n_workers,
+            prefetch_size=prefetch_size,
+            worker_type=worker_type,
+            sampler=sampler,
+            seed=seed,
+            drop_last=drop_last,
         )
+        if batch_processor is not None:
+            for process in batch_processor.processes:
+                if not hasattr(process, "run_batch"):
+                    raise ValueError(
+                        f"{type(process).__name__} does not support batch processing!"
+                    )
         self.text_padder = text_padder
         self.speech_padder = speech_padder
+        self.batch_processor = batch_processor
+
+    def _get_profiles(self) -> List[ProcessorProfile]:
+        profiles = []
+        for processor in [
+            getattr(self.data, "speech_processor", None),
+            self.batch_processor,
+        ]:
+            profile = getattr(processor, "profile", None)
+            if profile is not None and profile not in profiles:
+                profiles.append(profile)
+        return profiles
 
     def _stack_padded(self, batch: List[Tuple[Tensor, int]]) -> Tensor:
         return torch.vstack(list(map(lambda x: x[0], batch)))
@@ -373,46 +770,70 @@ class SpeechTextLoader(_DataLoader):
         masks = list(map(get_mask, batch))
         return torch.vstack(masks)
 
-    def get_batch(self) -> Tuple[Tensor, Tensor, Tensor, Tensor]:
-        """Prepares and returns a batch of examples
-
-        Returns:
-            Tuple[Tensor, Tensor, Tensor, Tensor]: A tuple containing the following tensors
-            in order: speech tensor of shape [B, M, d], speech mask tensor of shape [B, M],
-            text tensor of shape [B, M], and text mask tensor of shape [B, M].
-        """
-
-        # TODO: Add multi-threading here
+    def _collate(
+        self, padder: IPadder, batch: List[Tensor], max_len: int, max_len_dim: int
+    ) -> Tuple[Tensor, Tensor]:
+        if hasattr(padder, "pad_batch"):
+            return padder.pad_batch(batch, max_len=max_len)
+        # falling back to padding each example on its own
+        batch = [padder.pad(x, max_len) for x in batch]
+        mask = self._get_mask(batch, max_len_dim=max_len_dim)
+        return self._stack_padded(batch), mask
+
+    def _load_batch(self, indices: List[int]) -> Tuple[Tensor, Tensor, Tensor, Tensor]:
         max_speech_len = 0
         max_text_len = 0
         speeches = []
         texts = []
-        for idx in self.indices[self.start_idx : self.end_idx]:
+        for idx in indices:
             speech, speech_len, text, text_len = self.data[idx]
             max_speech_len = max(max_speech_len, speech_len)
             max_text_len = max(max_text_len, text_len)
             speeches.append(speech)
             texts.append(text)
-        speech = [
-            self.speech_padder.pad(speech, max_len=max_speech_len)
-            for speech in speeches
-        ]
-        text = [self.text_padder.pad(text, max_text_len) for text in texts]
-        speech_mask = self._get_mask(speech, max_len_dim=-2)
-        speech = self._stack_padded(speech)
-        text_mask = self._get_mask(text, max_len_dim=0)
-        text = self._stack_padded(text)
+        speech, speech_mask = self._collate(
+            self.speech_padder, speeches, max_speech_len, max_len_dim=-2
+        )
+        text, text_mask = self._collate(
+            self.text_padder, texts, max_text_len, max_len_dim=0
+        )
+        if self.batch_processor is not None:
+            speech, lengths = self.batch_processor.execute_batch(
+                speech, speech_mask.sum(dim=-1)
+            )
+            speech_mask = get_mask_from_lens(lengths, speech.shape[1])
         return speech, speech_mask, text, text_mask
 
+    def get_batch(self) -> Tuple[Tensor, Tensor, Tensor, Tensor]:
+        """Prepares and returns a batch of examples
+
+        Returns:
+            Tuple[Tensor, Tensor, Tensor, Tensor]: A tuple containing the following tensors
+            in order: speech tensor of shape [B, M, d], speech mask tensor of shape [B, M],
+            text tensor of shape [B, M], and text mask tensor of shape [B, M].
+        """
+        return self._load_batch(self._get_batch_indices(self._counter))
+
     def __iter__(self):
+        self.close()
+        if self._resumed is True:
+            # continuing the restored epoch from where it stopped
+            self._resumed = False
+            return self
+        if self._counter > 0:
+            # a previous pass over the data took place
+            self.epoch += 1
         self._counter = 0
-        if self.shuffle is True:
-            random.shuffle(self.indices)
+        self._start_epoch()
         return self
 
     def __next__(self):
         if self._counter >= self.n_batches:
+            self.close()
             raise StopIteration
-        batch = self.get_batch()
+        if self.n_workers > 0:
+            batch = self._next_prefetched()
+        else:
+            batch = self.get_batch()
         self._counter += 1
         return batch
@@ -0,0 +1,449 @@
+"""
+This module contains manifest classes, which provide a memory efficient
+access to the rows of large CSV manifests, as an alternative to loading
+the whole manifest into a list of dictionaries.
+
+Classes:
+
+- LazyCSVManifest: Reads the rows of a CSV manifest on demand using a persistent index of byte offsets.
+- ColumnarCSVManifest: Holds a CSV manifest in memory-mapped, compact columns shared across processes.
+
+Example usage:
+
+    .. code-block:: python
+
+        from speeq.data.manifests import ColumnarCSVManifest, LazyCSVManifest
+
+        # The index is built once and saved next to the manifest,
+        # the next runs will load the saved index directly.
+        manifest = LazyCSVManifest(
+            data_path='path/to/train.csv', sep=',', key_columns=['duration']
+        )
+
+        # sorting by a pre-computed key column, without parsing any row
+        manifest.sort('duration')
+
+        # the first row is parsed only once requested
+        row = manifest[0]
+
+        # or holding the whole manifest in compact columns, which are
+        # memory-mapped and shared by all the processes on the machine
+        manifest = ColumnarCSVManifest(
+            data_path='path/to/train.csv', sep=',', key_columns=['duration']
+        )
+"""
+import csv
+import os
+from array import array
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+
+from speeq.utils.utils import load_json, save_json
+
+INDEX_DIR_SUFFIX = ".index"
+COLUMNAR_DIR_SUFFIX = ".columnar"
+INDEX_META_FILE = "meta.json"
+OFFSETS_FILE = "offsets.npy"
+ENDS_FILE = "ends.npy"
+KEY_FILE = "key_{}.npy"
+POOL_FILE = "pool_{}.npy"
+POOL_OFFSETS_FILE = "pool_offsets_{}.npy"
+# bumped whenever the layout of the index changes, to rebuild the old ones
+INDEX_VERSION = 2
+
+
+def _get_file_stats(file_path: Union[str, Path]) -> dict:
+    stats = os.stat(file_path)
+    return {"size": stats.st_size, "mtime": stats.st_mtime_ns}
+
+
+class _BaseManifest:
+    """Implements the shared logic of the manifests that build an index of
+    a CSV file once, save it to disk, and memory-map it on the next runs as
+    long as the CSV file is not modified.
+
+    Args:
+        data_path (Union[str, Path]): The file path of the CSV manifest.
+
+        encoding (str): The encoding of the CSV file.
+
+        sep (str): The separator used in the CSV file.
+
+        key_columns (Optional[List[str]]): The names of the numerical columns
+        to be pre-computed and stored in the index.
+
+        index_dir (Optional[Union[str, Path]]): The directory to save/load
+        the index to/from, if None the manifest path suffixed with
+        `index_suffix` is used.
+    """
+
+    index_suffix = INDEX_DIR_SUFFIX
+
+    # the attributes that are re-created by `_load_index` after unpickling
+    _transient_attrs = ["keys"]
+
+    def __init__(
+        self,
+        data_path: Union[str, Path],
+        encoding: str,
+        sep: str,
+        key_columns: Optional[List[str]],
+        index_dir: Optional[Union[str, Path]],
+    ) -> None:
+        self.data_path = data_path
+        self.encoding = encoding
+        self.sep = sep
+        self.key_columns = list(key_columns) if key_columns is not None else []
+        if index_dir is None:
+            index_dir = str(data_path) + self.index_suffix
+        self.index_dir = index_dir
+        if self._is_index_valid() is False:
+            self._build_index()
+        self._load_index()
+        self.order = None
+
+    def _get_meta(self) -> dict:
+        return {
+            **_get_file_stats(self.data_path),
+            "version": INDEX_VERSION,
+            "sep": self.sep,
+            "encoding": self.encoding,
+        }
+
+    def _is_index_valid(self) -> bool:
+        meta_path = os.path.join(self.index_dir, INDEX_META_FILE)
+        if os.path.exists(meta_path) is False:
+            return False
+        meta = load_json(meta_path)
+        keys = meta.pop("key_columns")
+        if meta != self._get_meta():
+            return False
+        return all(key in keys for key in self.key_columns)
+
+    def _get_tmp_path(self, file_name: str) -> str:
+        # unique per process, as several ranks may build the same index at once
+        return os.path.join(self.index_dir, f"{file_name}.{os.getpid()}.tmp")
+
+    def _save_meta(self) -> None:
+        # the meta file is written last, as it marks the index as complete
+        meta = {**self._get_meta(), "key_columns": self.key_columns}
+        tmp_path = self._get_tmp_path(INDEX_META_FILE)
+        save_json(tmp_path, meta)
+        os.replace(tmp_path, os.path.join(self.index_dir, INDEX_META_FILE))
+
+    def _check_key_columns(self) -> None:
+        for key in self.key_columns:
+            if key not in self.header:
+                raise KeyError(f"{key} is not a column in {self.data_path}!")
+
+    def _parse_line(self, line: bytes) -> List[str]:
+        return next(csv.reader([line.decode(self.encoding)], delimiter=self.sep))
+
+    def _read_header(self) -> None:
+        with open(self.data_path, "rb") as f:
+            self.header = self._parse_line(f.readline())
+
+    def _save_array(self, file_name: str, x: np.ndarray) -> None:
+        # written to a temporary file and renamed, such that another process
+        # never maps a partially written array
+        tmp_path = self._get_tmp_path(file_name)
+        with open(tmp_path, "wb") as f:
+            np.save(f, x)
+        os.replace(tmp_path, os.path.join(self.index_dir, file_name))
+
+    def _load_array(self, file_name: str) -> np.ndarray:
+        return np.load(os.path.join(self.index_dir, file_name), mmap_mode="r")
+
+    def _save_keys(self, keys: List[array]) -> None:
+        for key, values in zip(self.key_columns, keys):
+            self._save_array(KEY_FILE.format(key), np.array(values, dtype=np.float64))
+
+    def _load_keys(self) -> None:
+        self.keys = {
+            key: self._load_array(KEY_FILE.format(key)) for key in self.key_columns
+        }
+
+    def _get_row_idx(self, idx: int) -> int:
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError("manifest index out of range")
+        if self.order is not None:
+            return int(self.order[idx])
+        return idx
+
+    def _build_index(self) -> None:
+        raise NotImplementedError
+
+    def _load_index(self) -> None:
+        raise NotImplementedError
+
+    def sort(self, key: str, reverse: bool = False) -> None:
+        """Sorts the rows by one of the pre-computed key columns.
+
+        Args:
+            key (str): The column to sort the rows by.
+
+            reverse (bool): If set to False, the rows will be sorted in
+            ascending order. If set to True, the rows will be sorted in
+            descending order. Default is False.
+        """
+        values = self.keys[key]
+        if reverse is True:
+            values = -values
+        self.order = np.argsort(values, kind="stable")
+
+    def get_column(self, key: str) -> list:
+        """Returns the values of the given column for all the rows, where
+        the pre-computed key columns are returned without parsing the rows.
+
+        Args:
+            key (str): The column name.
+
+        Returns:
+            list: The column's values, ordered as the manifest.
+        """
+        if key in self.keys:
+            values = self.keys[key]
+            if self.order is not None:
+                values = values[self.order]
+            return values.tolist()
+        return [row[key] for row in self]
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def __getstate__(self) -> dict:
+        # the memory-mapped index is re-mapped instead of being copied
+        state = self.__dict__.copy()
+        for key in self._transient_attrs:
+            state[key] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._load_index()
+
+
+class LazyCSVManifest(_BaseManifest):
+    """Provides a read-only, list-like access to the rows of a CSV manifest,
+    where each row is parsed only when requested. This is done by building a
+    persistent index of the byte offsets of the rows, which is saved to disk
+    and re-used on the next runs as long as the manifest is not modified.
+    The index is loaded through memory mapping, so the processes on the same
+    machine share the same pages.
+
+    .. note::
+
+        Each row of the manifest has to be in a single line.
+
+    Args:
+        data_path (Union[str, Path]): The file path of the CSV manifest.
+
+        encoding (str): The encoding of the CSV file. Default "utf-8".
+
+        sep (str): The separator used in the CSV file. Default ','.
+
+        key_columns (Optional[List[str]]): The names of the numerical columns
+        to be pre-computed and stored in the index, which can be used for
+        sorting or retrieved without parsing the rows. Default None.
+
+        index_dir (Optional[Union[str, Path]]): The directory to save/load
+        the index to/from. Default is the manifest path suffixed with `.index`.
+    """
+
+    _transient_attrs = ["_fd", "_pid", "offsets", "ends", "keys"]
+
+    def __init__(
+        self,
+        data_path: Union[str, Path],
+        encoding: str = "utf-8",
+        sep: str = ",",
+        key_columns: Optional[List[str]] = None,
+        index_dir: Optional[Union[str, Path]] = None,
+    ) -> None:
+        super().__init__(
+            data_path=data_path,
+            encoding=encoding,
+            sep=sep,
+            key_columns=key_columns,
+            index_dir=index_dir,
+        )
+        self._fd = None
+        self._pid = None
+
+    def _build_index(self) -> None:
+        offsets = array("q")
+        ends = array("q")
+        keys = [array("d") for _ in self.key_columns]
+        with open(self.data_path, "rb") as f:
+            header = f.readline()
+            self.header = self._parse_line(header)
+            self._check_key_columns()
+            key_indices = [self.header.index(key) for key in self.key_columns]
+            offset = len(header)
+            for line in f:
+                if line.strip():
+                    offsets.append(offset)
+                    ends.append(offset + len(line))
+                    if len(key_indices) > 0:
+                        row = self._parse_line(line)
+                        for values, idx in zip(keys, key_indices):
+                            values.append(float(row[idx]))
+                offset += len(line)
+        os.makedirs(self.index_dir, exist_ok=True)
+        self._save_array(OFFSETS_FILE, np.array(offsets, dtype=np.int64))
+        self._save_array(ENDS_FILE, np.array(ends, dtype=np.int64))
+        self._save_keys(keys)
+        self._save_meta()
+
+    def _load_index(self) -> None:
+        self._read_header()
+        self.offsets = self._load_array(OFFSETS_FILE)
+        self.ends = self._load_array(ENDS_FILE)
+        self._load_keys()
+
+    def _get_fd(self) -> int:
+        # the rows are read with `os.pread`, which does not move any shared
+        # reading position, hence the descriptor can be used by many threads
+        # at once, and a descriptor is opened per process.
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.data_path, os.O_RDONLY)
+            self._pid = os.getpid()
+        return self._fd
+
+    def __getitem__(self, idx: int) -> dict:
+        row_idx = self._get_row_idx(idx)
+        start = int(self.offsets[row_idx])
+        line = os.pread(self._get_fd(), int(self.ends[row_idx]) - start, start)
+        return dict(zip(self.header, self._parse_line(line)))
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __del__(self) -> None:
+        if getattr(self, "_fd", None) is not None and self._pid == os.getpid():
+            os.close(self._fd)
+
+
+class ColumnarCSVManifest(_BaseManifest):
+    """Holds a CSV manifest in a compact columnar layout, where the values
+    of each column are encoded into a single contiguous pool of bytes along
+    with the offsets of each value, and the numerical key columns are stored
+    as typed arrays. The columns are saved to disk once, and memory-mapped
+    on the next runs, so all the ranks and the loader workers on the same
+    machine map the same pages instead of each holding a private copy of
+    the manifest.
+
+    Args:
+        data_path (Union[str, Path]): The file path of the CSV manifest.
+
+        encoding (str): The encoding of the CSV file. Default "utf-8".
+
+        sep (str): The separator used in the CSV file. Default ','.
+
+        key_columns (Optional[List[str]]): The names of the numerical columns
+        to be stored as typed arrays, which can be used for sorting or
+        retrieved without decoding the rows. Default None.
+
+        index_dir (Optional[Union[str, Path]]): The directory to save/load
+        the columns to/from. Default is the manifest path suffixed with
+        `.columnar`.
+    """
+
+    index_suffix = COLUMNAR_DIR_SUFFIX
+    _transient_attrs = ["pools", "offsets", "keys"]
+
+    def __init__(
+        self,
+        data_path: Union[str, Path],
+        encoding: str = "utf-8",
+        sep: str = ",",
+        key_columns: Optional[List[str]] = None,
+        index_dir: Optional[Union[str, Path]] = None,
+    ) -> None:
+        super().__init__(
+            data_path=data_path,
+            encoding=encoding,
+            sep=sep,
+            key_columns=key_columns,
+            index_dir=index_dir,
+        )
+
+    def _build_index(self) -> None:
+        with open(self.data_path, "r", encoding=self.encoding, newline="") as f:
+            reader = csv.reader(f, delimiter=self.sep)
+            self.header = next(reader)
+            self._check_key_columns()
+            key_indices = [self.header.index(key) for key in self.key_columns]
+            pools = [bytearray() for _ in self.header]
+            offsets = [array("q", [0]) for _ in self.header]
+            keys = [array("d") for _ in self.key_columns]
+            for row in reader:
+                if len(row) == 0:
+                    continue
+                if len(row) != len(self.header):
+                    raise ValueError(
+                        f"line {reader.line_num} of {self.data_path} has "
+                        f"{len(row)} fields while the header has {len(self.header)}!"
+                    )
+                for pool, pool_offsets, value in zip(pools, offsets, row):
+                    pool += value.encode(self.encoding)
+                    pool_offsets.append(len(pool))
+                for values, idx in zip(keys, key_indices):
+                    values.append(float(row[idx]))
+        os.makedirs(self.index_dir, exist_ok=True)
+        for i, (pool, pool_offsets) in enumerate(zip(pools, offsets)):
+            self._save_array(POOL_FILE.format(i), np.frombuffer(pool, dtype=np.uint8))
+            self._save_array(
+                POOL_OFFSETS_FILE.format(i), np.array(pool_offsets, dtype=np.int64)
+            )
+        self._save_keys(keys)
+        self._save_meta()
+
+    def _load_index(self) -> None:
+        self._read_header()
+        self.pools = [
+            self._load_array(POOL_FILE.format(i)) for i in range(len(self.header))
+        ]
+        self.offsets = [
+            self._load_array(POOL_OFFSETS_FILE.format(i))
+            for i in range(len(self.header))
+        ]
+        self._load_keys()
+
+    def _get_value(self, col_idx: int, row_idx: int) -> str:
+        offsets = self.offsets[col_idx]
+        start, end = offsets[row_idx], offsets[row_idx + 1]
+        return self.pools[col_idx][start:end].tobytes().decode(self.encoding)
+
+    def get_column(self, key: str) -> list:
+        """Returns the values of the given column for all the rows, where
+        the key columns are returned as floats, and the other columns are
+        decoded directly from their pools.
+
+        Args:
+            key (str): The column name.
+
+        Returns:
+            list: The column's values, ordered as the manifest.
+        """
+        if key in self.keys:
+            return super().get_column(key)
+        col_idx = self.header.index(key)
+        return [
+            self._get_value(col_idx, self._get_row_idx(idx)) for idx in range(len(self))
+        ]
+
+    def __getitem__(self, idx: int) -> dict:
+        row_idx = self._get_row_idx(idx)
+        return {
+            key: self._get_value(col_idx, row_idx)
+            for col_idx, key in enumerate(self.header)
+        }
+
+    def __len__(self) -> int:
+        return len(self.offsets[0]) - 1
@@ -7,7 +7,9 @@ the maximum sequence length, while `StaticPadder` is a subclass of
 of the sequence to pad to.
 
 Both classes have a `pad` method that accepts an input tensor and the maximum
-length to pad to, and returns the padded tensor and the length of the padding added.
+length to pad to, and returns the padded tensor and the length of the padding added,
+and a `pad_batch` method that pads and stacks a list of tensors at once, and returns
+the padded batch along with its mask.
 
 
 Usage:
@@ -29,13 +31,19 @@ Usage:
     static_padder = StaticPadder(dim=1, pad_val=0, max_len=10)
     padded_tensor, padding_length = static_padder.pad(input_tensor)
 
+    # Padding and stacking a batch into a single tensor
+    batch = [torch.randn(1, 3, 7), torch.randn(1, 5, 7)]
+    padded_batch, mask = dynamic_padder.pad_batch(batch, max_len=5)
+
+
 """
-from typing import Tuple, Union
+from typing import List, Tuple, Union
 
 import torch
 from torch import Tensor
 
 from speeq.interfaces import IPadder
+from speeq.utils.utils import get_mask_from_lens
 
 
 class DynamicPadder(IPadder):
@@ -91,6 +99,42 @@ class DynamicPadder(IPadder):
             x = torch.cat([x, pad], dim=self.dim)
         return x, pad_len
 
+    def pad_batch(self, batch: List[Tensor], max_len: int) -> Tuple[Tensor, Tensor]:
+        """Pads a batch of tensors to the specified maximum length along the
+        pre-defined dimension, and stacks them along the first dimension,
+        where the output is allocated once and each tensor is copied into it.
+
+        Args:
+            batch (List[Tensor]): The tensors to be padded, where all the
+            dimensions other than the padding dimension have to match.
+
+            max_len (int): The maximum length to pad the tensors to.
+
+        Returns:
+            Tuple[Tensor, Tensor]: A tuple containing the stacked padded tensors,
+            and the mask of shape [B, max_len], where it is True whenever the
+            index is within the sequence length.
+        """
+        lengths = torch.LongTensor([x.shape[self.dim] for x in batch])
+        assert lengths.max().item() <= max_len
+        shape = list(batch[0].shape)
+        shape[self.dim] = max_len
+        result = torch.full(
+            (len(batch), *shape),
+            self.pad_val,
+            dtype=batch[0].dtype,
+            device=batch[0].device,
+        )
+        for item, x in zip(result, batch):
+            seq_len = x.shape[self.dim]
+            start = max_len - seq_len if self.left_pad else 0
+            item.narrow(self.dim, start, seq_len).copy_(x)
+        mask = get_mask_from_lens(lengths, max_len)
+        if result.dim() > 2:
+            # stacking along the first dimension of the tensors
+            result = result.flatten(0, 1)
+        return result, mask
+
 
 class StaticPadder(DynamicPadder):
     """A subclass of `DynamicPadder` that pads an input sequence to match
@@ -132,3 +176,16 @@ class StaticPadder(DynamicPadder):
             length of the padding added.
         """
         return super().pad(x, self.max_len)
+
+    def pad_batch(self, batch: List[Tensor], *args, **kwargs) -> Tuple[Tensor, Tensor]:
+        """Pads a batch of tensors to the pre-defined maximum length, and
+        stacks them along the first dimension.
+
+        Args:
+            batch (List[Tensor]): The tensors to be padded.
+
+        Returns:
+            Tuple[Tensor, Tensor]: A tuple containing the stacked padded tensors,
+            and the mask of shape [B, max_len].
+        """
+        return super().pad_batch(batch, self.max_len)
@@ -0,0 +1,505 @@
+"""
+This module contains utilities for preparing the data manifests ahead of the
+training, such as enriching the manifests with the durations and the lengths
+needed for sorting, bucketing and dynamic batching.
+
+Functions:
+
+- get_audio_info: Reads the meta data of an audio file from its header, without decoding the audio.
+- get_resampled_length: Calculates the length of a signal after resampling.
+- enrich_manifest: Adds the duration, sample rate, channels, feature frames and token length columns to a CSV manifest.
+- resample_manifest: Converts the audio files of a CSV manifest to mono at a target sample rate, and writes a manifest pointing to the converted files.
+- count_tokens: Counts the tokens of the text column of a CSV manifest in parallel, streaming the manifest in chunks.
+- build_vocab: Trains a tokenizer on the token counts of a CSV manifest without loading the whole manifest.
+
+Example usage:
+
+    .. code-block:: python
+
+        from speeq.data.preparation import (
+            build_vocab,
+            enrich_manifest,
+            resample_manifest,
+        )
+        from speeq.data.tokenizers import CharTokenizer
+        from speeq.data.processes import FeatExtractor
+        from speeq.data.registry import load_tokenizer
+
+        tokenizer = load_tokenizer('path/to/tokenizer.json')
+        feat_extractor = FeatExtractor(
+            feat_ext_name='melspec', feat_ext_args={'hop_length': 160}
+        )
+
+        # probing the audio headers in 8 processes, where running it again
+        # probes the new rows and the audio files modified since only
+        enrich_manifest(
+            data_path='path/to/train.csv',
+            save_path='path/to/train_enriched.csv',
+            sample_rate=16000,
+            feat_extractor=feat_extractor,
+            tokenizer=tokenizer,
+            n_workers=8,
+        )
+
+        # converting all the files to 16kHz mono wav files once, such that
+        # loading them during the training requires no resampling
+        resample_manifest(
+            data_path='path/to/train.csv',
+            save_path='path/to/train_16k.csv',
+            out_dir='path/to/16k',
+            sample_rate=16000,
+            n_workers=8,
+        )
+
+        # training a tokenizer on a large manifest in 8 processes, where the
+        # tokens that occur less than twice are left out
+        tokenizer = build_vocab(
+            data_path='path/to/train.csv',
+            tokenizer=CharTokenizer(),
+            min_freq=2,
+            n_workers=8,
+        )
+"""
+import functools
+import hashlib
+import math
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from csv import DictReader
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+import torchaudio
+from torchaudio import transforms
+
+from speeq.constants import FileKeys
+from speeq.interfaces import IProcessor, ITokenizer
+from speeq.utils.utils import load_csv, save_csv
+
+from .processes import SAMPLER_CACHE_SIZE, FeatExtractor
+
+_PROBED_KEYS = [
+    FileKeys.duration_key.value,
+    FileKeys.n_samples_key.value,
+    FileKeys.sample_rate_key.value,
+    FileKeys.n_channels_key.value,
+]
+
+
+def get_audio_info(file_path: Union[str, Path]) -> dict:
+    """Reads the meta data of an audio file from its header, without decoding
+    the audio.
+
+    Args:
+        file_path (Union[str, Path]): The audio file path.
+
+    Returns:
+        dict: The duration in seconds, the number of samples, the sample rate
+        and the number of channels of the audio.
+    """
+    info = torchaudio.info(file_path)
+    return {
+        FileKeys.duration_key.value: info.num_frames / info.sample_rate,
+        FileKeys.n_samples_key.value: info.num_frames,
+        FileKeys.sample_rate_key.value: info.sample_rate,
+        FileKeys.n_channels_key.value: info.num_channels,
+    }
+
+
+def get_resampled_length(length: int, orig_sr: int, new_sr: int) -> int:
+    """Calculates the length of a signal after being resampled by
+    `torchaudio.transforms.Resample`.
+
+    Args:
+        length (int): The length of the signal.
+
+        orig_sr (int): The original sample rate.
+
+        new_sr (int): The target sample rate.
+
+    Returns:
+        int: The length of the resampled signal.
+    """
+    if orig_sr == new_sr:
+        return length
+    return math.ceil(new_sr * length / orig_sr)
+
+
+def _is_probed(row: dict) -> bool:
+    return all(row.get(key, "") != "" for key in _PROBED_KEYS)
+
+
+def _is_modified_after(file_path: Union[str, Path], mtime_ns: int) -> bool:
+    # the missing files are left to the caller, which reports them
+    try:
+        return os.stat(file_path).st_mtime_ns > mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def _probe(file_paths: List[str], n_workers: int, chunk_size: int) -> List[dict]:
+    if n_workers <= 1:
+        return list(map(get_audio_info, file_paths))
+    with ProcessPoolExecutor(n_workers) as executor:
+        return list(executor.map(get_audio_info, file_paths, chunksize=chunk_size))
+
+
+def enrich_manifest(
+    data_path: Union[str, Path],
+    save_path: Optional[Union[str, Path]] = None,
+    speech_key: str = FileKeys.speech_key.value,
+    text_key: str = FileKeys.text_key.value,
+    sample_rate: Optional[int] = None,
+    feat_extractor: Optional[FeatExtractor] = None,
+    tokenizer: Optional[ITokenizer] = None,
+    text_processor: Optional[IProcessor] = None,
+    add_sos: bool = False,
+    add_eos: bool = False,
+    n_workers: int = 1,
+    chunk_size: int = 64,
+    sep: str = ",",
+    encoding: str = "utf-8",
+) -> List[dict]:
+    """Enriches a CSV manifest with the duration, the number of samples, the
+    sample rate and the number of channels of each audio file, which are read
+    from the audio headers in parallel without decoding. Optionally, the
+    number of feature frames and the number of tokens of each example are
+    added as well.
+
+    The run is incremental, if the output manifest exists, the rows already
+    probed in it are re-used, and only the new audio files and the ones
+    modified after the output manifest was saved are probed. The
+    frames and the tokens are cheap to derive, and they are re-computed for
+    all the rows, so they always match the given extractor and tokenizer.
+
+    Args:
+        data_path (Union[str, Path]): The CSV manifest to be enriched.
+
+        save_path (Optional[Union[str, Path]]): The path to save the enriched
+        manifest to, if None the input manifest is overwritten. Default None.
+
+        speech_key (str): The name of the column that holds the audio file
+        path. Default 'file_path'.
+
+        text_key (str): The name of the column that holds the text. Default 'text'.
+
+        sample_rate (Optional[int]): The sample rate the audio is resampled
+        to before the feature extraction, if None the original sample rate
+        of each file is used. Default None.
+
+        feat_extractor (Optional[FeatExtractor]): The feature extractor used
+        to calculate the `n_frames` column, if None the column is not added.
+        Default None.
+
+        tokenizer (Optional[ITokenizer]): The tokenizer used to calculate the
+        `n_tokens` column, if None the column is not added. Default None.
+
+        text_processor (Optional[IProcessor]): The text processor applied
+        before the tokenization. Default None.
+
+        add_sos (bool): Whether to count the SOS token. Default False.
+
+        add_eos (bool): Whether to count the EOS token. Default False.
+
+        n_workers (int): The number of processes used to probe the audio
+        files. Default 1.
+
+        chunk_size (int): The number of files sent to a process at once. Default 64.
+
+        sep (str): The separator used in the CSV files. Default ','.
+
+        encoding (str): The encoding of the CSV files. Default "utf-8".
+
+    Returns:
+        List[dict]: The rows of the enriched manifest.
+    """
+    if save_path is None:
+        save_path = data_path
+    data = load_csv(data_path, encoding=encoding, sep=sep)
+    probed = {}
+    if os.path.exists(save_path):
+        saved_at = os.stat(save_path).st_mtime_ns
+        for row in load_csv(save_path, encoding=encoding, sep=sep):
+            # the audio files modified after the manifest was saved are probed again
+            if _is_probed(row) and not _is_modified_after(row[speech_key], saved_at):
+                probed[row[speech_key]] = {key: row[key] for key in _PROBED_KEYS}
+    file_paths = sorted({row[speech_key] for row in data} - set(probed.keys()))
+    results = _probe(file_paths, n_workers=n_workers, chunk_size=chunk_size)
+    probed.update(zip(file_paths, results))
+    for row in data:
+        row.update(probed[row[speech_key]])
+        if feat_extractor is not None:
+            n_samples = get_resampled_length(
+                int(row[FileKeys.n_samples_key.value]),
+                orig_sr=int(row[FileKeys.sample_rate_key.value]),
+                new_sr=sample_rate or int(row[FileKeys.sample_rate_key.value]),
+            )
+            row[FileKeys.n_frames_key.value] = feat_extractor.get_n_frames(n_samples)
+        if tokenizer is not None:
+            text = row[text_key]
+            if text_processor is not None:
+                text = text_processor.execute(text)
+            tokens = tokenizer.tokenize(text, add_sos=add_sos, add_eos=add_eos)
+            row[FileKeys.n_tokens_key.value] = len(tokens)
+    if len(data) > 0:
+        save_csv(save_path, data, encoding=encoding, sep=sep)
+    return data
+
+
+@functools.lru_cache(SAMPLER_CACHE_SIZE)
+def _get_resampler(orig_sr: int, new_sr: int) -> transforms.Resample:
+    return transforms.Resample(orig_freq=orig_sr, new_freq=new_sr)
+
+
+def get_resampled_path(file_path: Union[str, Path], out_dir: Union[str, Path]) -> str:
+    """Returns the path the converted version of an audio file is saved to,
+    which is unique for each source path.
+
+    Args:
+        file_path (Union[str, Path]): The source audio file path.
+
+        out_dir (Union[str, Path]): The directory of the converted files.
+
+    Returns:
+        str: The path of the converted file.
+    """
+    digest = hashlib.sha1(str(file_path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(out_dir, f"{Path(file_path).stem}_{digest}.wav")
+
+
+def _resample_file(args: Tuple[str, str, int]) -> int:
+    file_path, out_path, sample_rate = args
+    if os.path.exists(out_path) and not _is_modified_after(
+        file_path, os.stat(out_path).st_mtime_ns
+    ):
+        # converted by a previous run, after the last change of the source
+        return torchaudio.info(out_path).num_frames
+    x, sr = torchaudio.load(file_path)
+    x = x.mean(dim=0, keepdim=True)
+    if sr != sample_rate:
+        x = _get_resampler(sr, sample_rate)(x)
+    # the file is renamed once written, so an interrupted run never leaves
+    # a partially written file under the final name
+    tmp_path = out_path + ".tmp"
+    torchaudio.save(
+        tmp_path,
+        x,
+        sample_rate,
+        format="wav",
+        encoding="PCM_S",
+        bits_per_sample=16,
+    )
+    os.replace(tmp_path, out_path)
+    return x.shape[-1]
+
+
+def resample_manifest(
+    data_path: Union[str, Path],
+    save_path: Union[str, Path],
+    out_dir: Union[str, Path],
+    sample_rate: int,
+    speech_key: str = FileKeys.speech_key.value,
+    n_workers: int = 1,
+    chunk_size: int = 16,
+    sep: str = ",",
+    encoding: str = "utf-8",
+) -> List[dict]:
+    """Converts the audio files of a CSV manifest to 16-bit mono wav files at
+    the target sample rate in parallel, and saves a copy of the manifest that
+    points to the converted files, such that loading them during the training
+    requires decoding only.
+
+    The run is resumable, the files converted by a previous run are skipped,
+    unless the source file was modified after its conversion.
+    If the manifest was enriched by `enrich_manifest`, the samples, the sample
+    rate and the channels columns are updated to match the converted files.
+
+    Args:
+        data_path (Union[str, Path]): The CSV manifest to be converted.
+
+        save_path (Union[str, Path]): The path to save the new manifest to.
+
+        out_dir (Union[str, Path]): The directory to save the converted files to.
+
+        sample_rate (int): The target sample rate.
+
+        speech_key (str): The name of the column that holds the audio file
+        path. Default 'file_path'.
+
+        n_workers (int): The number of processes used to convert the files.
+        Default 1.
+
+        chunk_size (int): The number of files sent to a process at once. Default 16.
+
+        sep (str): The separator used in the CSV files. Default ','.
+
+        encoding (str): The encoding of the CSV files. Default "utf-8".
+
+    Returns:
+        List[dict]: The rows of the new manifest.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    data = load_csv(data_path, encoding=encoding, sep=sep)
+    file_paths = sorted({row[speech_key] for row in data})
+    jobs = [
+        (file_path, get_resampled_path(file_path, out_dir), sample_rate)
+        for file_path in file_paths
+    ]
+    if n_workers <= 1:
+        lengths = list(map(_resample_file, jobs))
+    else:
+        with ProcessPoolExecutor(n_workers) as executor:
+            lengths = list(executor.map(_resample_file, jobs, chunksize=chunk_size))
+    converted = {
+        file_path: (out_path, length)
+        for (file_path, out_path, _), length in zip(jobs, lengths)
+    }
+    for row in data:
+        out_path, length = converted[row[speech_key]]
+        row[speech_key] = out_path
+        updates = {
+            FileKeys.n_samples_key.value: length,
+            FileKeys.sample_rate_key.value: sample_rate,
+            FileKeys.n_channels_key.value: 1,
+        }
+        row.update({key: value for key, value in updates.items() if key in row})
+    if len(data) > 0:
+        save_csv(save_path, data, encoding=encoding, sep=sep)
+    return data
+
+
+def _iter_text_chunks(
+    data_path: Union[str, Path],
+    text_key: str,
+    chunk_size: int,
+    sep: str,
+    encoding: str,
+) -> Iterator[List[str]]:
+    # the quoted fields may hold line breaks
+    with open(data_path, "r", encoding=encoding, newline="") as f:
+        chunk = []
+        for row in DictReader(f, delimiter=sep):
+            chunk.append(row[text_key])
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if len(chunk) > 0:
+            yield chunk
+
+
+def _count_chunk(tokenizer: ITokenizer, data: List[str]) -> Counter:
+    return tokenizer.count_tokens(data)
+
+
+def count_tokens(
+    data_path: Union[str, Path],
+    tokenizer: ITokenizer,
+    text_key: str = FileKeys.text_key.value,
+    min_freq: int = 1,
+    n_workers: int = 1,
+    chunk_size: int = 10000,
+    sep: str = ",",
+    encoding: str = "utf-8",
+) -> Counter:
+    """Counts the tokens of the text column of a CSV manifest using the
+    `count_tokens` method of the tokenizer, where the manifest is read in
+    chunks that are counted in parallel and merged, such that only a few
+    chunks and the counts are held in memory at a time.
+
+    Args:
+        data_path (Union[str, Path]): The CSV manifest.
+
+        tokenizer (ITokenizer): The tokenizer that defines the tokens.
+
+        text_key (str): The name of the column that holds the text. Default 'text'.
+
+        min_freq (int): The minimum number of occurrences of a token to be
+        kept. Default 1.
+
+        n_workers (int): The number of processes used to count the chunks.
+        Default 1.
+
+        chunk_size (int): The number of rows sent to a process at once. Default 10000.
+
+        sep (str): The separator used in the CSV file. Default ','.
+
+        encoding (str): The encoding of the CSV file. Default "utf-8".
+
+    Returns:
+        Counter: The number of occurrences of each kept token.
+    """
+    chunks = _iter_text_chunks(
+        data_path, text_key=text_key, chunk_size=chunk_size, sep=sep, encoding=encoding
+    )
+    counts = Counter()
+    if n_workers <= 1:
+        for chunk in chunks:
+            counts.update(_count_chunk(tokenizer, chunk))
+    else:
+        with ProcessPoolExecutor(n_workers) as executor:
+            # bounding the number of pending chunks, instead of submitting
+            # the whole manifest at once as `executor.map` does
+            pending = deque()
+            for chunk in chunks:
+                if len(pending) == 2 * n_workers:
+                    counts.update(pending.popleft().result())
+                pending.append(executor.submit(_count_chunk, tokenizer, chunk))
+            while len(pending) > 0:
+                counts.update(pending.popleft().result())
+    if min_freq > 1:
+        counts = Counter(
+            {token: count for token, count in counts.items() if count >= min_freq}
+        )
+    return counts
+
+
+def build_vocab(
+    data_path: Union[str, Path],
+    tokenizer: ITokenizer,
+    text_key: str = FileKeys.text_key.value,
+    min_freq: int = 1,
+    n_workers: int = 1,
+    chunk_size: int = 10000,
+    sep: str = ",",
+    encoding: str = "utf-8",
+) -> ITokenizer:
+    """Trains the tokenizer on the token counts of the text column of a CSV
+    manifest, see `count_tokens`, without loading the whole manifest.
+
+    Args:
+        data_path (Union[str, Path]): The CSV manifest.
+
+        tokenizer (ITokenizer): The tokenizer to be trained, which implements
+        `count_tokens` and `set_tokenizer_from_counts`.
+
+        text_key (str): The name of the column that holds the text. Default 'text'.
+
+        min_freq (int): The minimum number of occurrences of a token to be
+        added to the vocabulary, which is passed to `set_tokenizer_from_counts`,
+        such as the minimum count of a merge for the BPE tokenizer. Default 1.
+
+        n_workers (int): The number of processes used to count the tokens.
+        Default 1.
+
+        chunk_size (int): The number of rows sent to a process at once. Default 10000.
+
+        sep (str): The separator used in the CSV file. Default ','.
+
+        encoding (str): The encoding of the CSV file. Default "utf-8".
+
+    Returns:
+        ITokenizer: The trained tokenizer.
+    """
+    counts = count_tokens(
+        data_path,
+        tokenizer=tokenizer,
+        text_key=text_key,
+        n_workers=n_workers,
+        chunk_size=chunk_size,
+        sep=sep,
+        encoding=encoding,
+    )
+    # the tokenizer applies the threshold, as the counted units are not
+    # always the tokens, such as the words of the BPE tokenizer
+    return tokenizer.set_tokenizer_from_counts(counts, min_freq=min_freq)
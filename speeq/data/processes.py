@@ -3,6 +3,7 @@ This module contains classes for speech processing that implement the IProcess i
 
 Classes:
 
+- AudioWindow: A request to load a window of an audio file instead of the whole file.
 - AudioLoader: Loads and resamples an audio file to the targeted sample rate.
 - FeatExtractor: Extracts frequency features from a given time domain signal, supporting mfcc and mel spectrogram.
 - FeatStacker: Implements feature stacking operation by stacking consecutive time stamps along the feature space.
@@ -48,10 +49,13 @@ Example usage:
 """
 
 import functools
+import os
 import random
+import threading
 from abc import abstractmethod
+from collections import OrderedDict
 from pathlib import Path
-from typing import Union
+from typing import NamedTuple, Optional, Tuple, Union
 
 import torch
 import torchaudio
@@ -59,10 +63,59 @@ from torch import Tensor, nn
 from torchaudio import transforms
 
 from speeq.interfaces import IProcess
+from speeq.utils.utils import get_mask_from_lens
 
 SAMPLER_CACHE_SIZE = 5
 
 
+def stack_feats(x: Tensor, factor: int) -> Tensor:
+    """Stacks every `factor` consecutive frames along the feature space,
+    where the last frames are zero padded to fill the last stack.
+
+    Args:
+        x (Tensor): The input tensor of shape [..., T, F].
+
+        factor (int): The number of frames to stack.
+
+    Returns:
+        Tensor: The stacked tensor of shape [..., ceil(T / factor), F * factor].
+    """
+    residual = x.shape[-2] % factor
+    if residual != 0:
+        x = nn.functional.pad(x, [0, 0, 0, factor - residual])
+    shape = list(x.shape[:-2])
+    return x.reshape(shape + [x.shape[-2] // factor, x.shape[-1] * factor])
+
+
+def add_context(x: Tensor, context_size: int) -> Tensor:
+    """Concatenates each frame with its `context_size` left and right frames
+    along the feature space, where the edges are zero padded. The windows are
+    taken as strided views of the padded input, which are copied once.
+
+    Args:
+        x (Tensor): The input tensor of shape [..., T, F].
+
+        context_size (int): The number of frames on each side.
+
+    Returns:
+        Tensor: The output tensor of shape [..., T, F * (2 * context_size + 1)].
+    """
+    win_size = 2 * context_size + 1
+    shape = list(x.shape[:-1])
+    x = nn.functional.pad(x, [0, 0, context_size, context_size])
+    x = x.unfold(-2, win_size, 1)  # [..., T, F, W]
+    x = x.transpose(-1, -2)  # [..., T, W, F]
+    return x.reshape(shape + [win_size * x.shape[-1]])
+
+
+def _zero_padding(x: Tensor, lengths: Tensor) -> Tensor:
+    # zeroes the frames past each length of a right-padded batch of shape
+    # [B, ..., T, F], such that they match the zero padding of a single example
+    mask = torch.arange(x.shape[-2], device=x.device) >= lengths[:, None]
+    mask = mask.view(mask.shape[:1] + (1,) * (x.dim() - 3) + mask.shape[1:] + (1,))
+    return x.masked_fill(mask, 0.0)
+
+
 class StochasticProcess(IProcess):
     """An inteerface that applies the process functionality based on the ratio provided
 
@@ -87,6 +140,113 @@ class StochasticProcess(IProcess):
             return self.func(x)
         return x
 
+    def func_batch(self, x: Tensor, lengths: Tensor) -> Tensor:
+        """Applies the process on all the examples of a right-padded batch,
+        where the second dimension is the time axis. By default, `func` is
+        applied on each example separately, and the subclasses override it
+        with a vectorized implementation.
+
+        Args:
+            x (Tensor): The padded batch of shape [B, M] or [B, M, F].
+
+            lengths (Tensor): The length of each example of shape [B].
+
+        Returns:
+            Tensor: The processed batch of the same shape.
+        """
+        result = x.clone()
+        for i, length in enumerate(lengths.tolist()):
+            result[i : i + 1, :length] = self.func(x[i : i + 1, :length])
+        return result
+
+    def run_batch(self, x: Tensor, lengths: Tensor) -> Tuple[Tensor, Tensor]:
+        """Applies the process on a right-padded batch, where each example is
+        processed with probability `ratio`, and the padding is left as is.
+
+        Args:
+            x (Tensor): The padded batch of shape [B, M] or [B, M, F].
+
+            lengths (Tensor): The length of each example of shape [B].
+
+        Returns:
+            Tuple[Tensor, Tensor]: The processed batch and the lengths.
+        """
+        shape = (x.shape[0], x.shape[1]) + (1,) * (x.dim() - 2)
+        selected = torch.rand(x.shape[0], 1, device=x.device) <= self.ratio
+        selected = selected & get_mask_from_lens(lengths.to(x.device), x.shape[1])
+        result = self.func_batch(x, lengths)
+        return torch.where(selected.view(shape), result, x), lengths
+
+
+class _ByteLRUCache:
+    """A thread-safe least recently used cache of tensors, bounded by the
+    total size of the cached tensors in bytes.
+
+    Args:
+        max_bytes (int): The maximum total size of the cached tensors.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[Tensor]:
+        with self._lock:
+            x = self._items.get(key)
+            if x is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return x
+
+    def put(self, key: tuple, x: Tensor) -> None:
+        size = x.element_size() * x.nelement()
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = x
+            self.n_bytes += size
+            while self.n_bytes > self.max_bytes:
+                _, item = self._items.popitem(last=False)
+                self.n_bytes -= item.element_size() * item.nelement()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getstate__(self) -> dict:
+        # each process starts with an empty cache of the same budget
+        return {"max_bytes": self.max_bytes}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+
+
+class AudioWindow(NamedTuple):
+    """A request to load a window of an audio file, such that only the window
+    is decoded, which can be passed to `AudioLoader.run` in place of the file
+    path.
+
+    Args:
+        file_path (Union[Path, str]): The path to the audio file.
+
+        duration (float): The maximum duration of the window in seconds, the
+        whole file is loaded if it is not longer than that.
+
+        offset (Optional[float]): The start of the window in seconds, if None
+        a random start is drawn for every call. Default None.
+    """
+
+    file_path: Union[Path, str]
+    duration: float
+    offset: Optional[float] = None
+
 
 class AudioLoader(IProcess):
     """Loads and resamples audio to the specified sample rate.
@@ -100,27 +260,102 @@ class AudioLoader(IProcess):
 
     Args:
         sample_rate (int): The target sampling rate.
+
+        cache_size (int): The maximum size in bytes of the decoded and
+        resampled audio to be kept in memory, keyed by the file path, its
+        modification time and the target sample rate, such that the files
+        are decoded only once as long as they fit in the budget. Each process
+        holds its own cache, and the threads share it. If set to 0 no caching
+        is used. Default 0.
+
+        max_duration (Optional[float]): The maximum duration in seconds of the
+        loaded audio, where only a random window of that duration is decoded
+        from the longer files, which are never cached. If None the whole files
+        are loaded. Default None.
     """
 
-    def __init__(self, sample_rate: int) -> None:
+    def __init__(
+        self,
+        sample_rate: int,
+        cache_size: int = 0,
+        max_duration: Optional[float] = None,
+    ) -> None:
         super().__init__()
         self.sample_rate = sample_rate
+        self.max_duration = max_duration
+        self._cache = _ByteLRUCache(cache_size) if cache_size > 0 else None
 
     @functools.lru_cache(SAMPLER_CACHE_SIZE)
     def _get_resampler(self, original_sr: int):
         return transforms.Resample(orig_freq=original_sr, new_freq=self.sample_rate)
 
-    def run(self, file_path: Union[Path, str]) -> Tensor:
+    def _load(self, file_path: Union[Path, str], **kwargs) -> Tensor:
+        x, sr = torchaudio.load(file_path, **kwargs)
+        return self._get_resampler(sr)(x)
+
+    def _get_window(
+        self, window: AudioWindow, total_frames: int, sample_rate: int
+    ) -> Optional[Tuple[int, int]]:
+        # the frame offset and the number of frames of the window, or None
+        # if the window covers the whole file
+        num_frames = int(window.duration * sample_rate)
+        if total_frames <= num_frames:
+            return None
+        max_offset = total_frames - num_frames
+        if window.offset is None:
+            return random.randint(0, max_offset), num_frames
+        return min(int(window.offset * sample_rate), max_offset), num_frames
+
+    def _load_window(self, window: AudioWindow) -> Optional[Tensor]:
+        # returns None if the window covers the whole file
+        info = torchaudio.info(window.file_path)
+        frames = self._get_window(window, info.num_frames, info.sample_rate)
+        if frames is None:
+            return None
+        frame_offset, num_frames = frames
+        return self._load(
+            window.file_path, frame_offset=frame_offset, num_frames=num_frames
+        )
+
+    @property
+    def cache_stats(self) -> dict:
+        """The hits, the misses, the number of the cached files and the total
+        size in bytes of the cache."""
+        if self._cache is None:
+            return {"hits": 0, "misses": 0, "items": 0, "bytes": 0}
+        return {
+            "hits": self._cache.hits,
+            "misses": self._cache.misses,
+            "items": len(self._cache),
+            "bytes": self._cache.n_bytes,
+        }
+
+    def run(self, file_path: Union[Path, str, AudioWindow]) -> Tensor:
         """Load and resample an audio file.
 
         Args:
-            file_path (Union[Path, str]): The path to the audio file to be loaded.
+            file_path (Union[Path, str, AudioWindow]): The path to the audio
+            file to be loaded, or a window of it to be loaded.
 
         Returns:
             Tensor: A tensor containing the speech data of shape [C, M].
         """
-        x, sr = torchaudio.load(file_path)
-        return self._get_resampler(sr)(x)
+        if not isinstance(file_path, AudioWindow) and self.max_duration is not None:
+            file_path = AudioWindow(file_path, self.max_duration)
+        if isinstance(file_path, AudioWindow):
+            x = self._load_window(file_path)
+            if x is not None:
+                return x
+            file_path = file_path.file_path
+        if self._cache is None:
+            return self._load(file_path)
+        key = (str(file_path), os.stat(file_path).st_mtime_ns, self.sample_rate)
+        x = self._cache.get(key)
+        if x is None:
+            x = self._load(file_path)
+            self._cache.put(key, x)
+        # the later processes may modify their inputs in place
+        return x.clone()
 
 
 class FeatExtractor(IProcess):
@@ -150,6 +385,8 @@ class FeatExtractor(IProcess):
         feat_ext_args: dict,
     ) -> None:
         super().__init__()
+        self.feat_ext_name = feat_ext_name
+        self.feat_ext_args = feat_ext_args
         self.feat_extractor = self.__feat_extractor[feat_ext_name](**feat_ext_args)
 
     def run(self, x: Tensor) -> Tensor:
@@ -167,6 +404,41 @@ class FeatExtractor(IProcess):
         x = x.swapaxes(-1, -2)  # (..., T, F)
         return x
 
+    def run_batch(self, x: Tensor, lengths: Tensor) -> Tuple[Tensor, Tensor]:
+        """Extracts the features of a right-padded batch of signals at once.
+
+        Args:
+            x (Tensor): The padded time domain signals of shape [B, M].
+
+            lengths (Tensor): The lengths of the signals of shape [B].
+
+        Returns:
+            Tuple[Tensor, Tensor]: The features of shape [B, T, F], and the
+            number of frames of each signal of shape [B], where the frames
+            past each length cover the padding.
+        """
+        return self.run(x), self.get_n_frames(lengths)
+
+    def get_n_frames(self, n_samples: Union[int, Tensor]) -> Union[int, Tensor]:
+        """Calculates the number of feature frames the extractor outputs for
+        a signal of the given length, without running the extraction.
+
+        Args:
+            n_samples (Union[int, Tensor]): The length of the time domain
+            signal, or a tensor of lengths.
+
+        Returns:
+            Union[int, Tensor]: The number of the output frames.
+        """
+        spectrogram = self.feat_extractor
+        if self.feat_ext_name == "mfcc":
+            spectrogram = spectrogram.MelSpectrogram
+        spectrogram = spectrogram.spectrogram
+        n_samples = n_samples + 2 * spectrogram.pad
+        if spectrogram.center is True:
+            return n_samples // spectrogram.hop_length + 1
+        return (n_samples - spectrogram.n_fft) // spectrogram.hop_length + 1
+
 
 class FeatStacker(IProcess):
     """A class that implements feature stacking by stacking `n` consecutive time stamps
@@ -221,14 +493,24 @@ class FeatStacker(IProcess):
         """
         if self.feat_stack_factor == 1:
             return x
-        residual = x.shape[-2] % self.feat_stack_factor
-        if residual != 0:
-            size = list(x.shape)
-            size[-2] = self.feat_stack_factor - residual
-            zeros = torch.zeros(*size).to(x.device)
-            x = torch.cat([x, zeros], dim=-2)
-        x = x.view(*x.shape[:-2], x.shape[-2] // self.feat_stack_factor, -1)
-        return x
+        return stack_feats(x, self.feat_stack_factor)
+
+    def run_batch(self, x: Tensor, lengths: Tensor) -> Tuple[Tensor, Tensor]:
+        """Applies feature stacking on a right-padded batch of features.
+
+        Args:
+            x (Tensor): The padded features of shape [B, T, F].
+
+            lengths (Tensor): The number of frames of each example of shape [B].
+
+        Returns:
+            Tuple[Tensor, Tensor]: The stacked features of shape
+            [B, ceil(T / n), F * n], and the number of stacked frames of each
+            example of shape [B].
+        """
+        x = _zero_padding(x, lengths)
+        factor = self.feat_stack_factor
+        return self.run(x), (lengths + factor - 1) // factor
 
 
 class FrameContextualizer(IProcess):
@@ -272,30 +554,29 @@ class FrameContextualizer(IProcess):
         super().__init__()
         self.contex_size = contex_size
         self.win_size = self.contex_size * 2 + 1
-        self.conv = nn.Conv1d(
-            in_channels=1,
-            out_channels=self.win_size,
-            kernel_size=self.win_size,
-            bias=False,
-        )
-        self.conv.weight.data = torch.eye(self.win_size).view(
-            self.win_size, 1, self.win_size
-        )
-        self.conv.weight.requires_grad = False
 
     def run(self, x: Tensor) -> Tensor:
         """Applies frame contextualization on the input tensor x.
 
         Args:
-            x (Tensor): The input tensor of shape [1, M, F]
+            x (Tensor): The input tensor of shape [..., M, F]
 
         Returns:
-            Tensor: The output tensor of shape [1, M, F * (2 * context_size + 1)]
+            Tensor: The output tensor of shape [..., M, F * (2 * context_size + 1)]
         """
-        x = x.permute(2, 0, 1)  # [F, 1, T]
-        zeros = torch.zeros(x.shape[0], 1, self.contex_size)
-        x = torch.cat([zeros, x, zeros], dim=-1)
-        x = self.conv(x)  # [F, W, T]
-        x = x.permute(2, 1, 0).contiguous()  # [T, W, F]
-        x = x.view(1, x.shape[0], -1)  # [1, T, W * F]
-        return x
+        return add_context(x, self.contex_size)
+
+    def run_batch(self, x: Tensor, lengths: Tensor) -> Tuple[Tensor, Tensor]:
+        """Applies frame contextualization on a right-padded batch of features,
+        where the lengths are unchanged.
+
+        Args:
+            x (Tensor): The padded features of shape [B, M, F].
+
+            lengths (Tensor): The number of frames of each example of shape [B].
+
+        Returns:
+            Tuple[Tensor, Tensor]: The output of shape
+            [B, M, F * (2 * context_size + 1)], and the lengths.
+        """
+        return self.run(_zero_padding(x, lengths)), lengths
@@ -3,6 +3,11 @@
 - OrderedProcessor: applies a series of processes in a specific order.
 - StochasticProcessor: applies a sequence of processes in a randomized order.
 - SpeechProcessor: a higher-level class that wraps a sequence of processors used for speech processing.
+- ProcessorProfile: collects the per-process timing statistics of the processors when the profiling is enabled.
+
+And the following function:
+
+- get_length_ratio: calculates the largest ratio by which the processes of a processor stretch the signals.
 
 Usage:
 
@@ -66,12 +71,149 @@ This class applies a sequence of processes in a randomized order.
 """
 
 import random
+import threading
+import time
 from pathlib import Path
-from typing import Any, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from torch import Tensor
 
 from speeq.interfaces import IProcess, IProcessor
 
 
+class ProcessorProfile:
+    """Collects the number of calls, the wall time and the output size of each
+    named process, where the records of several processors, threads or
+    worker processes can be merged into one profile.
+
+    Example:
+
+        .. code-block:: python
+
+            from speeq.data.processors import OrderedProcessor
+
+            processor = OrderedProcessor(processes, profile=True)
+            for file_path in file_paths:
+                processor.execute(file_path)
+            print(processor.report())
+    """
+
+    def __init__(self) -> None:
+        # name -> [calls, total time in seconds, total output elements]
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, x: Any) -> None:
+        """Records a single call of a process.
+
+        Args:
+            name (str): The name of the process.
+
+            seconds (float): The wall time of the call in seconds.
+
+            x (Any): The output of the process, where the number of elements
+            is counted for tensors and tuples that start with a tensor.
+        """
+        if isinstance(x, tuple) and len(x) > 0:
+            x = x[0]
+        size = x.numel() if isinstance(x, Tensor) else 0
+        with self._lock:
+            stats = self._stats.setdefault(name, [0, 0.0, 0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] += size
+
+    def update(self, stats: Dict[str, list]) -> None:
+        """Merges the raw records returned by `pop` into the profile.
+
+        Args:
+            stats (Dict[str, list]): The records to merge.
+        """
+        with self._lock:
+            for name, (calls, seconds, size) in stats.items():
+                current = self._stats.setdefault(name, [0, 0.0, 0])
+                current[0] += calls
+                current[1] += seconds
+                current[2] += size
+
+    def get_records(self) -> Dict[str, list]:
+        """Returns a copy of the raw records, which can be merged into another
+        profile through `update`.
+
+        Returns:
+            Dict[str, list]: The number of calls, the total time and the total
+            number of output elements of each process.
+        """
+        with self._lock:
+            return {name: list(stats) for name, stats in self._stats.items()}
+
+    def pop(self) -> Dict[str, list]:
+        """Returns the raw records and resets the profile, which is used to
+        ship the records of the loader workers to the main process.
+
+        Returns:
+            Dict[str, list]: The records collected since the last reset.
+        """
+        with self._lock:
+            stats, self._stats = self._stats, {}
+        return stats
+
+    def reset(self) -> None:
+        """Drops all the records."""
+        self.pop()
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """Returns the statistics of each process.
+
+        Returns:
+            Dict[str, Dict[str, float]]: The name of each process mapped to its
+            number of calls, total time, mean time per call in seconds and mean
+            number of output elements per call.
+        """
+        return {
+            name: {
+                "calls": calls,
+                "total_time": seconds,
+                "mean_time": seconds / calls,
+                "mean_size": size / calls,
+            }
+            for name, (calls, seconds, size) in self.get_records().items()
+        }
+
+    def report(self) -> str:
+        """Formats the statistics as a table sorted by the total time.
+
+        Returns:
+            str: The report.
+        """
+        stats = self.get_stats()
+        width = max([len("process")] + list(map(len, stats)))
+        lines = [
+            f"{'process':<{width}} {'calls':>8} {'total (s)':>10} "
+            f"{'mean (ms)':>10} {'mean size':>12}"
+        ]
+        for name, item in sorted(
+            stats.items(), key=lambda item: item[1]["total_time"], reverse=True
+        ):
+            lines.append(
+                f"{name:<{width}} {item['calls']:>8} {item['total_time']:>10.3f} "
+                f"{1000 * item['mean_time']:>10.3f} {item['mean_size']:>12.1f}"
+            )
+        return "\n".join(lines)
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
 class OrderedProcessor(IProcessor):
     """Applies a list of provided processes in a specific order. The order of the
     processes is determined by their position in the list.
@@ -80,6 +222,10 @@ class OrderedProcessor(IProcessor):
         processes (List[IProcess]): A list of IProcess objects representing the processes
         to be applied in order.
 
+        profile (bool): A flag to record the wall time, the number of calls and
+        the output size of each process, see `report`. When disabled, the
+        processes run without any timing. Default False.
+
     Example:
 
         .. code-block:: python
@@ -104,9 +250,47 @@ class OrderedProcessor(IProcessor):
 
     """
 
-    def __init__(self, processes: List[IProcess]) -> None:
+    def __init__(self, processes: List[IProcess], profile: bool = False) -> None:
         super().__init__()
         self.processes = processes
+        self.profile = None
+        self._prefix = ""
+        if profile is True:
+            self.enable_profiling()
+
+    def enable_profiling(
+        self, profile: Optional[ProcessorProfile] = None, prefix: str = ""
+    ) -> ProcessorProfile:
+        """Starts recording the statistics of the processes.
+
+        Args:
+            profile (Optional[ProcessorProfile]): The profile to record to,
+            which allows several processors to share one. If None, a new
+            profile is created. Default None.
+
+            prefix (str): The prefix added to the process names. Default "".
+
+        Returns:
+            ProcessorProfile: The profile in use.
+        """
+        self.profile = ProcessorProfile() if profile is None else profile
+        self._prefix = prefix
+        return self.profile
+
+    def report(self) -> str:
+        """Returns the statistics of the processes as a table, see
+        `ProcessorProfile.report`."""
+        if self.profile is None:
+            return ""
+        return self.profile.report()
+
+    def _record(self, process: IProcess, start: float, x: Any) -> None:
+        self.profile.record(
+            self._prefix + process.__class__.__name__, time.perf_counter() - start, x
+        )
+
+    def _get_processes(self) -> List[IProcess]:
+        return self.processes
 
     def execute(self, x: Any) -> Any:
         """Executes all processes on the input x in the order they were provided.
@@ -118,10 +302,42 @@ class OrderedProcessor(IProcessor):
         Returns:
             Any: The output data after applying all the processes in order.
         """
-        for process in self.processes:
+        processes = self._get_processes()
+        if self.profile is None:
+            for process in processes:
+                x = process.run(x)
+            return x
+        for process in processes:
+            start = time.perf_counter()
             x = process.run(x)
+            self._record(process, start, x)
         return x
 
+    def execute_batch(self, x: Tensor, lengths: Tensor) -> Tuple[Tensor, Tensor]:
+        """Executes all processes on a right-padded batch in the order they
+        were provided, where each process has to implement
+        `run_batch(x, lengths)`, such as `FeatExtractor`, `FeatStacker`,
+        `FrameContextualizer` and the augmenters.
+
+        Args:
+            x (Tensor): The padded batch.
+
+            lengths (Tensor): The length of each example in the batch of shape [B].
+
+        Returns:
+            Tuple[Tensor, Tensor]: The processed batch and the updated lengths.
+        """
+        processes = self._get_processes()
+        if self.profile is None:
+            for process in processes:
+                x, lengths = process.run_batch(x, lengths)
+            return x, lengths
+        for process in processes:
+            start = time.perf_counter()
+            x, lengths = process.run_batch(x, lengths)
+            self._record(process, start, x)
+        return x, lengths
+
 
 class StochasticProcessor(OrderedProcessor):
     """Applies the provided processes in a stochastic order. The order in which
@@ -130,22 +346,17 @@ class StochasticProcessor(OrderedProcessor):
 
     Args:
         processes (List[IProcess]): A list of processes to be applied in a stochastic order.
-    """
-
-    def __init__(self, processes: List[IProcess]) -> None:
-        super().__init__(processes)
 
-    def execute(self, x: Any) -> Any:
-        """Executes all the processes on the input x in a randomly shuffled order.
+        profile (bool): A flag to record the statistics of each process, see
+        `OrderedProcessor`. Default False.
+    """
 
-        Args:
-            x (Any): The input to be processed.
+    def __init__(self, processes: List[IProcess], profile: bool = False) -> None:
+        super().__init__(processes, profile=profile)
 
-        Returns:
-            Any: The output of the processed input.
-        """
-        random.shuffle(self.processes)
-        return super().execute(x)
+    def _get_processes(self) -> List[IProcess]:
+        # a shuffled copy, as the processor is shared by the worker threads
+        return random.sample(self.processes, len(self.processes))
 
 
 class SpeechProcessor(IProcessor):
@@ -171,6 +382,10 @@ class SpeechProcessor(IProcessor):
 
         spec_augmenter (Optional[Union[OrderedProcessor, StochasticProcessor]]): The
         frequency-domain augmentation processor. Defaults to None.
+
+        profile (bool): A flag to record the statistics of the processes of all
+        the stages into one profile, where each process is named after its
+        stage, such as `spec_augmenter/TimeMasking`, see `report`. Defaults to False.
     """
 
     def __init__(
@@ -179,24 +394,131 @@ class SpeechProcessor(IProcessor):
         audio_augmenter: Optional[Union[OrderedProcessor, StochasticProcessor]] = None,
         spec_processor: Optional[OrderedProcessor] = None,
         spec_augmenter: Optional[Union[OrderedProcessor, StochasticProcessor]] = None,
+        profile: bool = False,
     ) -> None:
         super().__init__()
         self.processors = []
-        self.__add(audio_processor)
-        self.__add(audio_augmenter)
-        self.__add(spec_processor)
-        self.__add(spec_augmenter)
+        self._stages = []
+        self.__add("audio_processor", audio_processor)
+        self.__add("audio_augmenter", audio_augmenter)
+        self.__add("spec_processor", spec_processor)
+        self.__add("spec_augmenter", spec_augmenter)
         if spec_augmenter is not None:
             assert spec_processor is not None
+        # the number of leading processors that do not involve augmentation
+        self._n_deterministic = 1
+        if audio_augmenter is None and spec_processor is not None:
+            self._n_deterministic = 2
+        self.profile = None
+        if profile is True:
+            self.enable_profiling()
 
     def __add(
-        self, processor: Union[OrderedProcessor, StochasticProcessor, None]
+        self, stage: str, processor: Union[OrderedProcessor, StochasticProcessor, None]
     ) -> None:
         if processor is not None:
             self.processors.append(processor)
+            self._stages.append(stage)
 
-    def execute(self, file_path: Union[str, Path]):
+    def enable_profiling(
+        self, profile: Optional[ProcessorProfile] = None
+    ) -> ProcessorProfile:
+        """Starts recording the statistics of the processes of all the stages
+        into one profile.
+
+        Args:
+            profile (Optional[ProcessorProfile]): The profile to record to. If
+            None, a new profile is created. Default None.
+
+        Returns:
+            ProcessorProfile: The profile in use.
+        """
+        self.profile = ProcessorProfile() if profile is None else profile
+        for stage, processor in zip(self._stages, self.processors):
+            processor.enable_profiling(self.profile, prefix=f"{stage}/")
+        return self.profile
+
+    def report(self) -> str:
+        """Returns the statistics of the processes as a table, see
+        `ProcessorProfile.report`."""
+        if self.profile is None:
+            return ""
+        return self.profile.report()
+
+    def get_processor(self, stage: str) -> Optional[IProcessor]:
+        """Returns the processor of the given stage.
+
+        Args:
+            stage (str): The name of the stage, `audio_processor`,
+            `audio_augmenter`, `spec_processor` or `spec_augmenter`.
+
+        Returns:
+            Optional[IProcessor]: The processor, or None if the stage is not set.
+        """
+        if stage in self._stages:
+            return self.processors[self._stages.index(stage)]
+        return None
+
+    @property
+    def deterministic_processors(self) -> List[IProcessor]:
+        """The leading processors that do not involve any augmentation, such
+        that their output is the same for a given file across the epochs."""
+        return self.processors[: self._n_deterministic]
+
+    @property
+    def stochastic_processors(self) -> List[IProcessor]:
+        """The processors that follow the deterministic ones, starting from the
+        first augmenter."""
+        return self.processors[self._n_deterministic :]
+
+    def execute_deterministic(self, file_path: Union[str, Path]) -> Any:
+        """Executes the deterministic processors only, which can be cached.
+
+        Args:
+            file_path (Union[str, Path]): The audio file path.
+
+        Returns:
+            Any: The output of the last deterministic processor.
+        """
         x = file_path
-        for processor in self.processors:
+        for processor in self.deterministic_processors:
             x = processor.execute(x)
         return x
+
+    def execute_stochastic(self, x: Any) -> Any:
+        """Executes the processors that follow the deterministic ones on the
+        output of `execute_deterministic`.
+
+        Args:
+            x (Any): The output of the deterministic processors.
+
+        Returns:
+            Any: The final output of the speech processor.
+        """
+        for processor in self.stochastic_processors:
+            x = processor.execute(x)
+        return x
+
+    def execute(self, file_path: Union[str, Path]):
+        x = self.execute_deterministic(file_path)
+        return self.execute_stochastic(x)
+
+
+def get_length_ratio(processor: Optional[IProcessor]) -> float:
+    """Calculates the largest ratio of the output length to the input length
+    of the given processor, which is the product of the `length_ratio` of its
+    processes, such as `SpeedPerturbation`, where the processes that do not
+    have one keep the length.
+
+    Args:
+        processor (Optional[IProcessor]): The processor, `SpeechProcessor`,
+        `OrderedProcessor` or `StochasticProcessor`.
+
+    Returns:
+        float: The length ratio.
+    """
+    ratio = 1.0
+    for processor in getattr(processor, "processors", [processor]):
+        for process in getattr(processor, "processes", []):
+            ratio *= getattr(process, "length_ratio", 1.0)
+    return ratio
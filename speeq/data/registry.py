@@ -9,9 +9,11 @@ Functions:
 
 - get_tokenizer: Returns an instance of a tokenizer object.
 - load_tokenizer: Loads and returns a pre-trained tokenizer instance.
+- get_feature_cache: Returns an instance of a feature cache object, if any.
 - get_asr_datasets: Returns instances of training and testing datasets for ASR tasks.
 - get_text_padder: Returns an instance of a text padder object.
 - get_speech_padder: Returns an instance of a speech padder object.
+- get_sampler: Returns an instance of a batch sampler object.
 - get_asr_loaders: Returns instances of training and testing data loaders for ASR tasks.
 """
 
@@ -19,23 +21,44 @@ import os
 from pathlib import Path
 from typing import List, Optional, Tuple, Union
 
-from speeq.constants import CHAR_TOKENIZER_TYPE, TOKENIZER_TYPE_KEY, WORD_TOKENIZER_TYPE
-from speeq.interfaces import IDataLoader, IDataset, IPadder, ITokenizer
+from speeq.constants import (
+    BPE_TOKENIZER_TYPE,
+    CHAR_TOKENIZER_TYPE,
+    TOKENIZER_TYPE_KEY,
+    WORD_TOKENIZER_TYPE,
+)
+from speeq.interfaces import (
+    IDataLoader,
+    IDataset,
+    IPadder,
+    IProcessor,
+    ISampler,
+    ITokenizer,
+)
 from speeq.utils.utils import load_json
 
 from .loaders import SpeechTextDataset, SpeechTextLoader
 from .padders import DynamicPadder, StaticPadder
-from .tokenizers import CharTokenizer, WordTokenizer
+from .preparation import build_vocab
+from .processors import get_length_ratio
+from .samplers import BucketSampler, DynamicBatchSampler
+from .stores import FeatureCache
+from .tokenizers import BPETokenizer, CharTokenizer, WordTokenizer
 
 PADDING_TYPES = {"static": StaticPadder, "dynamic": DynamicPadder}
 
-TOKENIZERS = {WORD_TOKENIZER_TYPE: WordTokenizer, CHAR_TOKENIZER_TYPE: CharTokenizer}
+TOKENIZERS = {
+    WORD_TOKENIZER_TYPE: WordTokenizer,
+    CHAR_TOKENIZER_TYPE: CharTokenizer,
+    BPE_TOKENIZER_TYPE: BPETokenizer,
+}
 
 
 def get_tokenizer(data_config: object, data: Optional[List[str]] = None) -> ITokenizer:
     """Creates a tokenizer based on the provided data configuration, or loads
     a pre-trained tokenizer from a file. If a pre-trained tokenizer path is not
-    provided, the function trains the tokenizer on the provided data.
+    provided, the function trains the tokenizer on the provided data, or streams
+    the training manifest through `build_vocab` if no data is provided.
 
 
     Args:
@@ -57,11 +80,20 @@ def get_tokenizer(data_config: object, data: Optional[List[str]] = None) -> ITok
         tokenizer = load_tokenizer(tokenizer_path)
         print(f"Tokenizer {tokenizer_path} loadded!")
         return tokenizer
-    assert data is not None
-    tokenizer = TOKENIZERS[data_config.tokenizer_type]()
+    tokenizer = TOKENIZERS[data_config.tokenizer_type](**data_config.tokenizer_args)
     tokenizer.add_pad_token().add_blank_token()
     tokenizer.add_sos_token().add_eos_token()
-    tokenizer.set_tokenizer(data)
+    if data is not None:
+        tokenizer.set_tokenizer(data)
+    else:
+        build_vocab(
+            data_config.training_path,
+            tokenizer=tokenizer,
+            text_key=data_config.text_key,
+            min_freq=data_config.vocab_min_freq,
+            n_workers=data_config.vocab_n_workers,
+            sep=data_config.sep,
+        )
     tokenizer.save_tokenizer(tokenizer_path)
     print(f"Tokenizer saved to {tokenizer_path}!")
     return tokenizer
@@ -81,6 +113,27 @@ def load_tokenizer(tokenizer_path: Union[Path, str]) -> ITokenizer:
     return TOKENIZERS[type]().load_tokenizer_from_dict(data)
 
 
+def get_feature_cache(
+    cache_dir: Union[str, Path], speech_processor: IProcessor
+) -> Optional[FeatureCache]:
+    """Loads a pre-built feature cache for the given speech processor.
+
+    Args:
+        cache_dir (Union[str, Path]): The cache directory, if empty no cache
+        will be used.
+
+        speech_processor (IProcessor): The speech processor that the cache
+        was built with.
+
+    Returns:
+        Optional[FeatureCache]: The feature cache if a directory is given,
+        otherwise None.
+    """
+    if not cache_dir:
+        return None
+    return FeatureCache(cache_dir=cache_dir, speech_processor=speech_processor)
+
+
 def get_asr_datasets(
     data_config: object, tokenizer: ITokenizer
 ) -> Tuple[IDataset, IDataset]:
@@ -97,6 +150,11 @@ def get_asr_datasets(
         Tuple[IDataset, IDataset]: A tuple containing the train and test dataset
         objects.
     """
+    key_columns = []
+    if _uses_sampler(data_config):
+        # pre-computing the durations, such that the samplers do not
+        # parse the whole manifest, where only the training data is sampled
+        key_columns.append(data_config.duration_key)
     train_dataset = SpeechTextDataset(
         data_path=data_config.training_path,
         tokenizer=tokenizer,
@@ -109,6 +167,12 @@ def get_asr_datasets(
         speech_key=data_config.speech_key,
         sort_key=data_config.sort_key,
         reverse=data_config.reverse,
+        manifest_type=data_config.manifest_type,
+        key_columns=key_columns,
+        feature_cache=get_feature_cache(
+            data_config.train_feat_cache_dir, data_config.train_speech_processor
+        ),
+        max_duration=data_config.max_duration or None,
     )
     test_dataset = SpeechTextDataset(
         data_path=data_config.testing_path,
@@ -122,6 +186,10 @@ def get_asr_datasets(
         speech_key=data_config.speech_key,
         sort_key=data_config.sort_key,
         reverse=data_config.reverse,
+        manifest_type=data_config.manifest_type,
+        feature_cache=get_feature_cache(
+            data_config.test_feat_cache_dir, data_config.test_speech_processor
+        ),
     )
     return train_dataset, test_dataset
 
@@ -164,6 +232,81 @@ def get_speech_padder(data_config) -> IPadder:
     )
 
 
+def _uses_sampler(data_config: object) -> bool:
+    return (
+        data_config.n_buckets > 0
+        or data_config.max_frames > 0
+        or data_config.shard_type != "stride"
+    )
+
+
+def get_sampler(
+    data_config: object,
+    dataset: IDataset,
+    batch_size: int,
+    world_size: int,
+    rank: int,
+) -> Optional[ISampler]:
+    """Creates a batch sampler for the training data, if either bucketing,
+    dynamic batching, or a non-default sharding is enabled.
+
+    Args:
+        data_config (object): The data configuration object.
+
+        dataset (IDataset): The dataset to sample the batches from.
+
+        batch_size (int): The batch size.
+
+        world_size (int): The number of nodes/gpus.
+
+        rank (int): the index of the current process/gpu.
+
+    Returns:
+        Optional[ISampler]: The batch sampler if bucketing, dynamic batching
+        or balanced sharding is used, otherwise None.
+    """
+    if data_config.max_tokens > 0 and data_config.max_frames <= 0:
+        raise ValueError("max_tokens can only be used along with max_frames!")
+    if _uses_sampler(data_config) is False:
+        return None
+    # the augmenters that stretch the signals are accounted for, such that
+    # the batches do not exceed the budget
+    ratio = get_length_ratio(data_config.train_speech_processor) * get_length_ratio(
+        data_config.train_batch_processor
+    )
+    lengths = [
+        float(length) * ratio for length in dataset.get_column(data_config.duration_key)
+    ]
+    if data_config.max_frames > 0:
+        max_tokens = None
+        text_lengths = None
+        if data_config.max_tokens > 0:
+            max_tokens = data_config.max_tokens
+            text_lengths = dataset.get_text_lengths()
+        return DynamicBatchSampler(
+            lengths=lengths,
+            max_frames=data_config.max_frames,
+            text_lengths=text_lengths,
+            max_tokens=max_tokens,
+            n_buckets=max(1, data_config.n_buckets),
+            rank=rank,
+            world_size=world_size,
+            shuffle=data_config.shuffle,
+            seed=data_config.seed,
+            shard_type=data_config.shard_type,
+        )
+    return BucketSampler(
+        lengths=lengths,
+        batch_size=batch_size,
+        n_buckets=max(1, data_config.n_buckets),
+        rank=rank,
+        world_size=world_size,
+        shuffle=data_config.shuffle,
+        seed=data_config.seed,
+        shard_type=data_config.shard_type,
+    )
+
+
 def get_asr_loaders(
     data_config: object,
     tokenizer: ITokenizer,
@@ -197,6 +340,13 @@ def get_asr_loaders(
         pad_id = tokenizer.special_tokens.pad_id
     text_padder = get_text_padder(data_config, pad_id)
     speech_padder = get_speech_padder(data_config)
+    sampler = get_sampler(
+        data_config=data_config,
+        dataset=train_dataset,
+        batch_size=batch_size,
+        world_size=world_size,
+        rank=rank,
+    )
     train_loader = SpeechTextLoader(
         dataset=train_dataset,
         rank=rank,
@@ -205,13 +355,26 @@ def get_asr_loaders(
         text_padder=text_padder,
         speech_padder=speech_padder,
         shuffle=data_config.shuffle,
+        n_workers=data_config.n_workers,
+        prefetch_size=data_config.prefetch_size,
+        worker_type=data_config.worker_type,
+        sampler=sampler,
+        seed=data_config.seed,
+        batch_processor=data_config.train_batch_processor,
     )
+    # the testing data is sharded as well, such that all the ranks share the
+    # evaluation, where the last partial batch is kept to cover all the examples
     test_loader = SpeechTextLoader(
         dataset=test_dataset,
-        rank=0,
-        world_size=1,
+        rank=rank,
+        world_size=world_size,
         batch_size=batch_size,
         text_padder=text_padder,
         speech_padder=speech_padder,
+        n_workers=data_config.n_workers,
+        prefetch_size=data_config.prefetch_size,
+        worker_type=data_config.worker_type,
+        batch_processor=data_config.test_batch_processor,
+        drop_last=False,
     )
     return train_loader, test_loader
@@ -0,0 +1,397 @@
+"""
+This module contains batch samplers, which decide the examples that make up
+each batch given the lengths/durations of the examples in the dataset.
+
+Classes:
+
+- BucketSampler: Groups examples of similar duration into buckets, such that
+  each batch contains examples of similar lengths, which reduces the padding.
+- DynamicBatchSampler: Packs examples of similar duration into batches of
+  variable sizes, such that the padded size of each batch does not exceed a
+  given frames/tokens budget.
+
+Functions:
+
+- get_padding_ratio: Calculates the ratio of padding in a set of batches.
+- get_shard_imbalance: Calculates how uneven the padded frames are across the ranks.
+
+Example usage:
+
+    .. code-block:: python
+
+        from speeq.data.samplers import BucketSampler
+
+        # the durations of the examples in the dataset
+        lengths = [3.2, 12.0, 2.5, 7.1, 11.6, 6.8]
+
+        sampler = BucketSampler(lengths=lengths, batch_size=2, n_buckets=3)
+
+        # the batches of the first epoch, as a list of lists of indices
+        batches = sampler.get_batches(epoch=0)
+
+        # the padding ratio the batches have
+        print(sampler.padding_ratio)
+
+        # balancing the padded frames across 4 ranks, instead of striding
+        sampler = BucketSampler(
+            lengths=lengths, batch_size=1, rank=0, world_size=4, shard_type='balanced'
+        )
+        batches = sampler.get_batches(epoch=0)
+
+        # the extra frames the most loaded rank processes compared to the average
+        print(sampler.imbalance)
+"""
+import random
+from typing import List, Optional, Tuple
+
+from speeq.interfaces import ISampler
+
+SHARD_TYPES = ["stride", "balanced"]
+
+
+def get_padding_ratio(lengths: List[float], batches: List[List[int]]) -> float:
+    """Calculates the ratio of the padding to the total size of the padded
+    batches.
+
+    Args:
+        lengths (List[float]): The lengths of all the examples.
+
+        batches (List[List[int]]): The batches, where each batch is a list of
+        indices.
+
+    Returns:
+        float: The padding ratio, a value between 0 and 1.
+    """
+    total = 0
+    padded = 0
+    for batch in batches:
+        batch_lengths = [lengths[idx] for idx in batch]
+        total += sum(batch_lengths)
+        padded += max(batch_lengths) * len(batch_lengths)
+    if padded == 0:
+        return 0.0
+    return 1 - total / padded
+
+
+def _get_padded_size(lengths: List[float], batch: List[int]) -> float:
+    return max(lengths[idx] for idx in batch) * len(batch)
+
+
+def get_shard_imbalance(
+    lengths: List[float], shards: List[List[List[int]]]
+) -> Tuple[float, float]:
+    """Calculates how uneven the padded frames are distributed across the
+    ranks, where the i-th batch of each shard is processed in the same step.
+
+    Args:
+        lengths (List[float]): The lengths of all the examples.
+
+        shards (List[List[List[int]]]): The batches of each rank.
+
+    Returns:
+        Tuple[float, float]: A tuple of the total imbalance, which is the
+        ratio of the frames the most loaded rank processes over the average
+        minus one, and the same ratio averaged over the steps, which
+        approximates the fraction of the time lost waiting for the slowest rank.
+    """
+    sizes = [[_get_padded_size(lengths, batch) for batch in shard] for shard in shards]
+    totals = [sum(shard_sizes) for shard_sizes in sizes]
+    if len(totals) == 0 or sum(totals) == 0:
+        return 0.0, 0.0
+    imbalance = max(totals) * len(totals) / sum(totals) - 1
+    steps = list(zip(*sizes))
+    if len(steps) == 0:
+        return imbalance, 0.0
+    step_imbalance = sum(max(step) * len(step) / sum(step) - 1 for step in steps)
+    return imbalance, step_imbalance / len(steps)
+
+
+class _BaseSampler(ISampler):
+    def __init__(
+        self,
+        lengths: List[float],
+        n_buckets: int = 10,
+        rank: int = 0,
+        world_size: int = 1,
+        shuffle: bool = True,
+        seed: int = 0,
+        shard_type: str = "stride",
+    ) -> None:
+        super().__init__()
+        assert n_buckets > 0
+        if shard_type not in SHARD_TYPES:
+            raise KeyError(f"invalid shard type, please use one of {SHARD_TYPES}")
+        self.lengths = lengths
+        self.n_buckets = n_buckets
+        self.rank = rank
+        self.world_size = world_size
+        self.shuffle = shuffle
+        self.seed = seed
+        self.shard_type = shard_type
+        self.padding_ratio = 0.0
+        self.imbalance = 0.0
+        self.step_imbalance = 0.0
+
+    def _get_buckets(self) -> List[List[int]]:
+        indices = sorted(range(len(self.lengths)), key=lambda i: self.lengths[i])
+        bucket_size, residual = divmod(len(indices), self.n_buckets)
+        buckets = []
+        start = 0
+        for i in range(self.n_buckets):
+            end = start + bucket_size + int(i < residual)
+            buckets.append(indices[start:end])
+            start = end
+        return buckets
+
+    def _get_bucketed_indices(self, rng: random.Random) -> List[int]:
+        indices = []
+        for bucket in self._get_buckets():
+            if self.shuffle is True:
+                rng.shuffle(bucket)
+            indices.extend(bucket)
+        return indices
+
+    def _get_rng(self, epoch: int) -> random.Random:
+        # all ranks has to use the same seed to agree on the same batches
+        return random.Random(self.seed + epoch)
+
+    def _stride_shard(self, batches: List[List[int]]) -> List[List[List[int]]]:
+        n_batches = len(batches) // self.world_size
+        return [
+            batches[rank :: self.world_size][:n_batches]
+            for rank in range(self.world_size)
+        ]
+
+    def _balanced_shard(
+        self, batches: List[List[int]], rng: random.Random
+    ) -> List[List[List[int]]]:
+        # grouping batches of similar padded sizes into the same steps,
+        # such that the ranks wait as little as possible for each other
+        sizes = [_get_padded_size(self.lengths, batch) for batch in batches]
+        order = sorted(range(len(batches)), key=lambda i: sizes[i], reverse=True)
+        n_steps = len(batches) // self.world_size
+        steps = [
+            order[i * self.world_size : (i + 1) * self.world_size]
+            for i in range(n_steps)
+        ]
+        if self.shuffle is True:
+            rng.shuffle(steps)
+        else:
+            steps.reverse()
+        # assigning the largest batch of each step to the least loaded rank
+        shards = [[] for _ in range(self.world_size)]
+        totals = [0.0] * self.world_size
+        for step in steps:
+            ranks = sorted(range(self.world_size), key=lambda r: totals[r])
+            for rank, i in zip(ranks, step):
+                shards[rank].append(batches[i])
+                totals[rank] += sizes[i]
+        return shards
+
+    def _shard(self, batches: List[List[int]], rng: random.Random) -> List[List[int]]:
+        if self.shard_type == "balanced":
+            shards = self._balanced_shard(batches, rng)
+        else:
+            shards = self._stride_shard(batches)
+        self.imbalance, self.step_imbalance = get_shard_imbalance(self.lengths, shards)
+        return shards[self.rank]
+
+    def _make_batches(self, rng: random.Random) -> List[List[int]]:
+        raise NotImplementedError
+
+    def get_batches(self, epoch: int = 0) -> List[List[int]]:
+        """Returns the batches of the current rank for the given epoch.
+
+        Args:
+            epoch (int): The epoch index, used to seed the shuffling, such
+            that each epoch gets a different order. Default 0.
+
+        Returns:
+            List[List[int]]: A list of batches, where each batch is a list of
+            indices.
+        """
+        rng = self._get_rng(epoch)
+        batches = self._make_batches(rng)
+        if self.shuffle is True:
+            rng.shuffle(batches)
+        batches = self._shard(batches, rng)
+        self.padding_ratio = get_padding_ratio(self.lengths, batches)
+        return batches
+
+
+class BucketSampler(_BaseSampler):
+    """Groups the examples of similar duration into buckets, and creates fixed
+    size batches out of the buckets, such that each batch contains examples of
+    similar lengths. The examples are shuffled within each bucket, and the
+    batches are shuffled across the buckets at each epoch.
+
+    In distributed data-parallel settings, the batches are created over the
+    whole dataset and then sharded across the ranks, where all the ranks get
+    the same number of batches, and the resulting imbalance of the padded
+    frames across the ranks is kept in `imbalance` and `step_imbalance`.
+
+    Args:
+        lengths (List[float]): The lengths/durations of all the examples in the
+        dataset.
+
+        batch_size (int): The size of each batch.
+
+        n_buckets (int): The number of buckets to group the examples into.
+        Default 10.
+
+        rank (int): The process rank used in distributed data-parallel
+        setting. Default is 0.
+
+        world_size (int): The number of total processes used in distributed
+        data-parallel settings. Default is 1.
+
+        shuffle (bool): A flag indicating whether the examples should be
+        shuffled within and across the buckets at each epoch. Default True.
+
+        seed (int): The seed used for shuffling, it has to be the same across
+        all the ranks. Default 0.
+
+        shard_type (str): The way the batches are distributed across the
+        ranks, either `stride`, where the batches are assigned in a round
+        robin fashion, or `balanced`, where the batches of similar padded
+        sizes are processed in the same step, and are assigned such that the
+        total padded frames of each rank are balanced. Default `stride`.
+    """
+
+    def __init__(
+        self,
+        lengths: List[float],
+        batch_size: int,
+        n_buckets: int = 10,
+        rank: int = 0,
+        world_size: int = 1,
+        shuffle: bool = True,
+        seed: int = 0,
+        shard_type: str = "stride",
+    ) -> None:
+        super().__init__(
+            lengths=lengths,
+            n_buckets=n_buckets,
+            rank=rank,
+            world_size=world_size,
+            shuffle=shuffle,
+            seed=seed,
+            shard_type=shard_type,
+        )
+        self.batch_size = batch_size
+
+    def _make_batches(self, rng: random.Random) -> List[List[int]]:
+        indices = self._get_bucketed_indices(rng)
+        n_batches = len(indices) // self.batch_size
+        return [
+            indices[i * self.batch_size : (i + 1) * self.batch_size]
+            for i in range(n_batches)
+        ]
+
+
+class DynamicBatchSampler(_BaseSampler):
+    """Packs the examples into batches of variable sizes, such that the padded
+    size of each batch, i.e. the batch size times the longest example in the
+    batch, does not exceed a given budget of speech frames, and optionally a
+    budget of text tokens. The examples are grouped into duration buckets
+    first, so short examples end up in large batches and long examples in
+    small ones, which keeps the memory usage steady across the steps. An
+    example that exceeds the budget on its own is placed in a batch alone.
+
+    In distributed data-parallel settings, the batches are created over the
+    whole dataset and then sharded across the ranks, where all the ranks get
+    the same number of batches, and the resulting imbalance of the padded
+    frames across the ranks is kept in `imbalance` and `step_imbalance`.
+
+    Args:
+        lengths (List[float]): The speech lengths of all the examples in the
+        dataset, in the same unit as `max_frames`.
+
+        max_frames (float): The maximum padded speech size of each batch.
+
+        text_lengths (Optional[List[int]]): The text lengths of all the
+        examples in the dataset, required if `max_tokens` is used. Default None.
+
+        max_tokens (Optional[int]): The maximum padded text size of each
+        batch. Default None.
+
+        n_buckets (int): The number of buckets to group the examples into.
+        Default 10.
+
+        rank (int): The process rank used in distributed data-parallel
+        setting. Default is 0.
+
+        world_size (int): The number of total processes used in distributed
+        data-parallel settings. Default is 1.
+
+        shuffle (bool): A flag indicating whether the examples should be
+        shuffled within the buckets and the batches should be shuffled
+        at each epoch. Default True.
+
+        seed (int): The seed used for shuffling, it has to be the same across
+        all the ranks. Default 0.
+
+        shard_type (str): The way the batches are distributed across the
+        ranks, either `stride`, where the batches are assigned in a round
+        robin fashion, or `balanced`, where the batches of similar padded
+        sizes are processed in the same step, and are assigned such that the
+        total padded frames of each rank are balanced. Default `stride`.
+    """
+
+    def __init__(
+        self,
+        lengths: List[float],
+        max_frames: float,
+        text_lengths: Optional[List[int]] = None,
+        max_tokens: Optional[int] = None,
+        n_buckets: int = 10,
+        rank: int = 0,
+        world_size: int = 1,
+        shuffle: bool = True,
+        seed: int = 0,
+        shard_type: str = "stride",
+    ) -> None:
+        super().__init__(
+            lengths=lengths,
+            n_buckets=n_buckets,
+            rank=rank,
+            world_size=world_size,
+            shuffle=shuffle,
+            seed=seed,
+            shard_type=shard_type,
+        )
+        if max_tokens is not None:
+            assert text_lengths is not None
+        self.max_frames = max_frames
+        self.text_lengths = text_lengths
+        self.max_tokens = max_tokens
+
+    def _fits(self, max_len: float, max_text_len: int, batch_size: int) -> bool:
+        if max_len * batch_size > self.max_frames:
+            return False
+        if self.max_tokens is not None:
+            return max_text_len * batch_size <= self.max_tokens
+        return True
+
+    def _make_batches(self, rng: random.Random) -> List[List[int]]:
+        batches = []
+        batch = []
+        max_len = 0
+        max_text_len = 0
+        for idx in self._get_bucketed_indices(rng):
+            length = max(max_len, self.lengths[idx])
+            text_length = max_text_len
+            if self.text_lengths is not None:
+                text_length = max(max_text_len, self.text_lengths[idx])
+            if len(batch) > 0 and not self._fits(length, text_length, len(batch) + 1):
+                batches.append(batch)
+                batch = []
+                length = self.lengths[idx]
+                if self.text_lengths is not None:
+                    text_length = self.text_lengths[idx]
+            batch.append(idx)
+            max_len = length
+            max_text_len = text_length
+        if len(batch) > 0:
+            batches.append(batch)
+        return batches
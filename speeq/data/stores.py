@@ -0,0 +1,600 @@
+"""
+This module contains classes for storing pre-computed data in large,
+memory-mapped binary shards, which avoids re-computing deterministic results
+and opening many small files on every epoch.
+
+Classes:
+
+- ShardedStoreWriter: Writes arrays into binary shards along with an offset index.
+- ShardedStore: Reads arrays from the shards written by `ShardedStoreWriter` through memory mapping.
+- FeatureCache: Caches the output of the deterministic part of a `SpeechProcessor`.
+- WaveformStore: Reads the decoded and resampled audio stored as 16-bit integers.
+- StoredAudioLoader: An `AudioLoader` that reads the audio from a `WaveformStore`.
+
+Functions:
+
+- get_fingerprint: Calculates a fingerprint of a processor configuration.
+- build_feature_cache: Runs the deterministic part of a `SpeechProcessor` over a set of files and caches the results.
+- build_waveform_store: Decodes and resamples a set of audio files once and stores them as 16-bit integers.
+- build_rir_bank: Stores a set of room impulse responses for the `Reverberation` augmenter.
+- build_noise_bank: Stores a set of background noise recordings for the `NoiseInjector` augmenter.
+
+Example usage:
+
+    .. code-block:: python
+
+        from speeq.data.processes import AudioLoader, FeatExtractor
+        from speeq.data.processors import OrderedProcessor, SpeechProcessor
+        from speeq.data.augmenters import FrequencyMasking
+        from speeq.data.stores import build_feature_cache
+
+        speech_processor = SpeechProcessor(
+            audio_processor=OrderedProcessor([AudioLoader(sample_rate=16000)]),
+            spec_processor=OrderedProcessor(
+                [FeatExtractor(feat_ext_name='melspec', feat_ext_args={})]
+            ),
+            spec_augmenter=OrderedProcessor(
+                [FrequencyMasking(n=2, max_length=10)]
+            ),
+        )
+
+        # caching the mel spectrograms in half precision
+        cache = build_feature_cache(
+            file_paths=['path/to/1.wav', 'path/to/2.wav'],
+            speech_processor=speech_processor,
+            cache_dir='path/to/cache',
+            dtype='float16',
+        )
+
+        # the cached features, where only the augmenters are left to be applied
+        feats = cache.get('path/to/1.wav')
+
+        # storing the waveforms instead, for the pipelines that augment the
+        # audio before the feature extraction
+        build_waveform_store(
+            file_paths=['path/to/1.wav', 'path/to/2.wav'],
+            store_dir='path/to/waveforms',
+            sample_rate=16000,
+        )
+        audio_loader = StoredAudioLoader(
+            sample_rate=16000, store_dir='path/to/waveforms'
+        )
+        x = audio_loader.run('path/to/1.wav')
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import torch
+from torch import Tensor
+
+from speeq.utils.utils import load_json, save_json
+
+from .processes import AudioLoader, AudioWindow
+from .processors import SpeechProcessor
+
+INDEX_FILE = "index.json"
+SHARD_FILE = "shard_{}.bin"
+SHARD_SIZE = 2**30
+INT16_SCALE = 2**15 - 1
+
+_DTYPE_KEY = "dtype"
+_META_KEY = "meta"
+_ENTRIES_KEY = "entries"
+_FINGERPRINT_KEY = "fingerprint"
+_STORAGE_KEY = "storage"
+_SAMPLE_RATE_KEY = "sample_rate"
+
+STORAGE_TYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+
+def _describe(obj: Any) -> Any:
+    if isinstance(obj, (str, int, float, bool)) or obj is None:
+        return obj
+    if isinstance(obj, (list, tuple)):
+        return [_describe(item) for item in obj]
+    if isinstance(obj, dict):
+        return {str(key): _describe(value) for key, value in obj.items()}
+    if hasattr(obj, "__dict__"):
+        return {
+            "class": obj.__class__.__name__,
+            "attrs": {
+                key: _describe(value)
+                for key, value in sorted(vars(obj).items())
+                # the private attributes hold runtime state, not configuration
+                if not key.startswith("_")
+                and (
+                    isinstance(value, (str, int, float, bool, list, tuple, dict))
+                    or hasattr(value, "run")
+                    or hasattr(value, "execute")
+                )
+            },
+        }
+    return obj.__class__.__name__
+
+
+def get_fingerprint(processors: Iterable[Any]) -> str:
+    """Calculates a fingerprint of the configuration of the given processors,
+    which is the class names of the processors/processes along with their
+    primitive attributes.
+
+    Args:
+        processors (Iterable[Any]): The processors to fingerprint.
+
+    Returns:
+        str: The fingerprint as a hex digest.
+    """
+    description = json.dumps(_describe(list(processors)), sort_keys=True)
+    return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+
+class ShardedStoreWriter:
+    """Writes arrays into large binary shards, and keeps an index of the
+    shard, the offset and the shape of each array.
+
+    Args:
+        store_dir (Union[str, Path]): The directory to write the store to.
+
+        dtype (str): The numpy data type the arrays are stored in.
+
+        shard_size (int): The maximum size of each shard in bytes. Default 1GiB.
+
+        meta (Optional[dict]): Any additional meta data to be saved along
+        with the index. Default None.
+    """
+
+    def __init__(
+        self,
+        store_dir: Union[str, Path],
+        dtype: str,
+        shard_size: int = SHARD_SIZE,
+        meta: Optional[dict] = None,
+    ) -> None:
+        os.makedirs(store_dir, exist_ok=True)
+        self.store_dir = store_dir
+        self.dtype = np.dtype(dtype)
+        self.shard_size = shard_size
+        self.meta = meta if meta is not None else {}
+        self.entries = {}
+        self._shard_idx = -1
+        self._shard = None
+        self._offset = 0
+
+    def _next_shard(self) -> None:
+        if self._shard is not None:
+            self._shard.close()
+        self._shard_idx += 1
+        path = os.path.join(self.store_dir, SHARD_FILE.format(self._shard_idx))
+        self._shard = open(path, "wb")
+        self._offset = 0
+
+    def add(self, key: str, array: np.ndarray, params: Optional[list] = None) -> None:
+        """Appends the array to the current shard.
+
+        Args:
+            key (str): The key to retrieve the array with.
+
+            array (np.ndarray): The array to be stored.
+
+            params (Optional[list]): Any per array parameters to be stored
+            in the index, such as quantization parameters. Default None.
+        """
+        array = np.ascontiguousarray(array, dtype=self.dtype)
+        if self._shard is None or (
+            self._offset > 0
+            and (self._offset + array.size) * self.dtype.itemsize > self.shard_size
+        ):
+            self._next_shard()
+        self._shard.write(array.tobytes())
+        self.entries[key] = [
+            self._shard_idx,
+            self._offset,
+            list(array.shape),
+            params if params is not None else [],
+        ]
+        self._offset += array.size
+
+    def close(self) -> None:
+        """Closes the last shard and writes the index."""
+        if self._shard is not None:
+            self._shard.close()
+            self._shard = None
+        index = {
+            _DTYPE_KEY: self.dtype.name,
+            _META_KEY: self.meta,
+            _ENTRIES_KEY: self.entries,
+        }
+        # writing to a temporary file first, such that a partially written
+        # index is never picked up by the readers
+        tmp_path = os.path.join(self.store_dir, INDEX_FILE + ".tmp")
+        save_json(tmp_path, index)
+        os.replace(tmp_path, os.path.join(self.store_dir, INDEX_FILE))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs) -> None:
+        self.close()
+
+
+class ShardedStore:
+    """Reads the arrays written by `ShardedStoreWriter`, where the shards are
+    memory-mapped lazily, and the arrays are returned as views of the mapped
+    shards without copying.
+
+    Args:
+        store_dir (Union[str, Path]): The directory of the store.
+    """
+
+    def __init__(self, store_dir: Union[str, Path]) -> None:
+        index_path = os.path.join(store_dir, INDEX_FILE)
+        if os.path.exists(index_path) is False:
+            raise FileNotFoundError(f"{index_path} not found!")
+        index = load_json(index_path)
+        self.store_dir = store_dir
+        self.dtype = np.dtype(index[_DTYPE_KEY])
+        self.meta = index[_META_KEY]
+        self.entries = index[_ENTRIES_KEY]
+        self._shards = {}
+
+    def _get_shard(self, shard_idx: int) -> np.memmap:
+        if shard_idx not in self._shards:
+            path = os.path.join(self.store_dir, SHARD_FILE.format(shard_idx))
+            # copy-on-write mapping, the pages are shared across the
+            # processes, and the returned views are writable
+            self._shards[shard_idx] = np.memmap(path, dtype=self.dtype, mode="c")
+        return self._shards[shard_idx]
+
+    def get(self, key: str) -> Tuple[np.ndarray, list]:
+        """Returns a view of the array stored under the given key.
+
+        Args:
+            key (str): The key of the array.
+
+        Returns:
+            Tuple[np.ndarray, list]: The array and its stored parameters.
+        """
+        shard_idx, offset, shape, params = self.entries[key]
+        size = int(np.prod(shape))
+        array = self._get_shard(shard_idx)[offset : offset + size]
+        return array.reshape(shape), params
+
+    def __getstate__(self) -> dict:
+        # the memory maps are re-created by each process on demand
+        state = self.__dict__.copy()
+        state["_shards"] = {}
+        return state
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def _quantize(x: np.ndarray) -> Tuple[np.ndarray, list]:
+    min_val = float(x.min()) if x.size > 0 else 0.0
+    max_val = float(x.max()) if x.size > 0 else 0.0
+    scale = (max_val - min_val) / 255 if max_val > min_val else 1.0
+    x = np.round((x - min_val) / scale) - 128
+    return x.astype(np.int8), [min_val, scale]
+
+
+def _dequantize(x: np.ndarray, params: list) -> Tensor:
+    min_val, scale = params
+    return (torch.from_numpy(x).float() + 128) * scale + min_val
+
+
+def _int16_to_float(x: np.ndarray) -> Tensor:
+    return torch.from_numpy(x).float() / INT16_SCALE
+
+
+def _float_to_int16(x: Tensor) -> np.ndarray:
+    return (x.clamp(-1, 1) * INT16_SCALE).round().numpy()
+
+
+class FeatureCache:
+    """Reads the cached output of the deterministic processors of a
+    `SpeechProcessor`, see `build_feature_cache`. The cache is keyed by
+    a fingerprint of the deterministic processors, and using a cache built with
+    a different configuration raises an error.
+
+    Args:
+        cache_dir (Union[str, Path]): The cache directory.
+
+        speech_processor (SpeechProcessor): The speech processor that the
+        cache will be used with.
+    """
+
+    def __init__(
+        self, cache_dir: Union[str, Path], speech_processor: SpeechProcessor
+    ) -> None:
+        self.store = ShardedStore(cache_dir)
+        fingerprint = get_fingerprint(speech_processor.deterministic_processors)
+        if self.store.meta[_FINGERPRINT_KEY] != fingerprint:
+            raise ValueError(
+                f"""The feature cache at {cache_dir} was built with a different
+                processor configuration, please rebuild the cache!"""
+            )
+        self.storage = self.store.meta[_STORAGE_KEY]
+
+    def get(self, file_path: Union[str, Path]) -> Tensor:
+        """Returns the cached features of the given file.
+
+        Args:
+            file_path (Union[str, Path]): The audio file path.
+
+        Returns:
+            Tensor: The cached features.
+        """
+        x, params = self.store.get(str(file_path))
+        if self.storage == "int8":
+            return _dequantize(x, params)
+        x = torch.from_numpy(x)
+        if self.storage == "float16":
+            return x.float()
+        return x
+
+    def __contains__(self, file_path: Union[str, Path]) -> bool:
+        return str(file_path) in self.store
+
+
+def build_feature_cache(
+    file_paths: List[Union[str, Path]],
+    speech_processor: SpeechProcessor,
+    cache_dir: Union[str, Path],
+    dtype: str = "float32",
+    shard_size: int = SHARD_SIZE,
+) -> FeatureCache:
+    """Runs the deterministic processors of the speech processor over the
+    given files, and caches the results into memory-mapped shards.
+
+    Args:
+        file_paths (List[Union[str, Path]]): The audio files to be cached.
+
+        speech_processor (SpeechProcessor): The speech processor.
+
+        cache_dir (Union[str, Path]): The directory to write the cache to.
+
+        dtype (str): The storage type, one of `float32`, `float16`, or `int8`,
+        where `int8` quantizes each example linearly between its minimum and
+        maximum values. Default `float32`.
+
+        shard_size (int): The maximum size of each shard in bytes. Default 1GiB.
+
+    Returns:
+        FeatureCache: The built feature cache.
+    """
+    if dtype not in STORAGE_TYPES:
+        raise KeyError(
+            f"invalid storage type, please use one of {list(STORAGE_TYPES.keys())}"
+        )
+    meta = {
+        _FINGERPRINT_KEY: get_fingerprint(speech_processor.deterministic_processors),
+        _STORAGE_KEY: dtype,
+    }
+    with ShardedStoreWriter(
+        store_dir=cache_dir, dtype=dtype, shard_size=shard_size, meta=meta
+    ) as writer:
+        for file_path in file_paths:
+            x = speech_processor.execute_deterministic(file_path)
+            x = x.detach().cpu().numpy()
+            params = None
+            if dtype == "int8":
+                x, params = _quantize(x)
+            writer.add(str(file_path), x, params)
+    return FeatureCache(cache_dir=cache_dir, speech_processor=speech_processor)
+
+
+class WaveformStore:
+    """Reads the decoded and resampled audio written by
+    `build_waveform_store`, where the audio is memory-mapped as 16-bit
+    integers, and converted to floats only once requested.
+
+    Args:
+        store_dir (Union[str, Path]): The directory of the store.
+    """
+
+    def __init__(self, store_dir: Union[str, Path]) -> None:
+        self.store = ShardedStore(store_dir)
+        self.sample_rate = self.store.meta[_SAMPLE_RATE_KEY]
+
+    def get_view(self, file_path: Union[str, Path]) -> np.ndarray:
+        """Returns a view of the stored audio of the given file without copying.
+
+        Args:
+            file_path (Union[str, Path]): The audio file path.
+
+        Returns:
+            np.ndarray: The 16-bit integer audio of shape [C, M].
+        """
+        x, _ = self.store.get(str(file_path))
+        return x
+
+    def get(self, file_path: Union[str, Path]) -> Tensor:
+        """Returns the stored audio of the given file.
+
+        Args:
+            file_path (Union[str, Path]): The audio file path.
+
+        Returns:
+            Tensor: The audio of shape [C, M], scaled to [-1, 1].
+        """
+        return _int16_to_float(self.get_view(file_path))
+
+    def __contains__(self, file_path: Union[str, Path]) -> bool:
+        return str(file_path) in self.store
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+
+class StoredAudioLoader(AudioLoader):
+    """An `AudioLoader` that reads the audio from a `WaveformStore` through
+    memory mapping, without opening or decoding the audio files, where only
+    the requested window is converted to floats, see `AudioWindow`. The files
+    that are not in the store are loaded from the disk as usual.
+
+    Args:
+        sample_rate (int): The target sampling rate, which has to match the
+        sample rate of the store.
+
+        store_dir (Union[str, Path]): The directory of the waveform store.
+
+        cache_size (int): The cache size used for the files that are not in
+        the store, see `AudioLoader`. Default 0.
+
+        max_duration (Optional[float]): The maximum duration in seconds of the
+        loaded audio, see `AudioLoader`. Default None.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        store_dir: Union[str, Path],
+        cache_size: int = 0,
+        max_duration: Optional[float] = None,
+    ) -> None:
+        super().__init__(
+            sample_rate=sample_rate, cache_size=cache_size, max_duration=max_duration
+        )
+        self.store_dir = str(store_dir)
+        self._store = WaveformStore(store_dir)
+        if self._store.sample_rate != sample_rate:
+            raise ValueError(
+                f"""The waveform store at {store_dir} has a sample rate of
+                {self._store.sample_rate}, but {sample_rate} is required!"""
+            )
+
+    def run(self, file_path: Union[Path, str, AudioWindow]) -> Tensor:
+        """Loads an audio file from the store.
+
+        Args:
+            file_path (Union[Path, str, AudioWindow]): The path to the audio
+            file to be loaded, or a window of it to be loaded.
+
+        Returns:
+            Tensor: A tensor containing the speech data of shape [C, M].
+        """
+        window = file_path if isinstance(file_path, AudioWindow) else None
+        path = file_path.file_path if window is not None else file_path
+        if path not in self._store:
+            return super().run(file_path)
+        if window is None and self.max_duration is not None:
+            window = AudioWindow(path, self.max_duration)
+        x = self._store.get_view(path)
+        if window is not None:
+            frames = self._get_window(window, x.shape[-1], self.sample_rate)
+            if frames is not None:
+                frame_offset, num_frames = frames
+                x = x[..., frame_offset : frame_offset + num_frames]
+        return _int16_to_float(x)
+
+
+def build_waveform_store(
+    file_paths: List[Union[str, Path]],
+    store_dir: Union[str, Path],
+    sample_rate: int,
+    shard_size: int = SHARD_SIZE,
+) -> WaveformStore:
+    """Decodes and resamples the given audio files once, and stores them as
+    16-bit integers into memory-mapped shards, to be read by
+    `StoredAudioLoader`.
+
+    Args:
+        file_paths (List[Union[str, Path]]): The audio files to be stored.
+
+        store_dir (Union[str, Path]): The directory to write the store to.
+
+        sample_rate (int): The target sample rate.
+
+        shard_size (int): The maximum size of each shard in bytes. Default 1GiB.
+
+    Returns:
+        WaveformStore: The built waveform store.
+    """
+    audio_loader = AudioLoader(sample_rate=sample_rate)
+    with ShardedStoreWriter(
+        store_dir=store_dir,
+        dtype="int16",
+        shard_size=shard_size,
+        meta={_SAMPLE_RATE_KEY: sample_rate},
+    ) as writer:
+        for file_path in file_paths:
+            x = audio_loader.run(file_path)
+            writer.add(str(file_path), _float_to_int16(x))
+    return WaveformStore(store_dir)
+
+
+def build_rir_bank(
+    file_paths: List[Union[str, Path]],
+    store_dir: Union[str, Path],
+    sample_rate: int,
+    shard_size: int = SHARD_SIZE,
+) -> ShardedStore:
+    """Stores a set of room impulse responses into memory-mapped shards, to
+    be drawn from by the `Reverberation` augmenter, where each response is
+    resampled, averaged across its channels and normalized to a unit norm.
+
+    Args:
+        file_paths (List[Union[str, Path]]): The impulse response audio files.
+
+        store_dir (Union[str, Path]): The directory to write the bank to.
+
+        sample_rate (int): The sample rate of the signals to be augmented.
+
+        shard_size (int): The maximum size of each shard in bytes. Default 1GiB.
+
+    Returns:
+        ShardedStore: The bank of the impulse responses.
+    """
+    audio_loader = AudioLoader(sample_rate=sample_rate)
+    with ShardedStoreWriter(
+        store_dir=store_dir,
+        dtype="float32",
+        shard_size=shard_size,
+        meta={_SAMPLE_RATE_KEY: sample_rate},
+    ) as writer:
+        for file_path in file_paths:
+            h = audio_loader.run(file_path).mean(dim=0)
+            h = h / h.norm().clamp(min=1e-8)
+            writer.add(str(file_path), h.numpy())
+    return ShardedStore(store_dir)
+
+
+def build_noise_bank(
+    file_paths: List[Union[str, Path]],
+    store_dir: Union[str, Path],
+    sample_rate: int,
+    shard_size: int = SHARD_SIZE,
+) -> ShardedStore:
+    """Stores a set of background noise recordings as 16-bit integers into
+    memory-mapped shards, to be mixed in by the `NoiseInjector` augmenter,
+    where each recording is resampled and averaged across its channels.
+
+    Args:
+        file_paths (List[Union[str, Path]]): The noise audio files.
+
+        store_dir (Union[str, Path]): The directory to write the bank to.
+
+        sample_rate (int): The sample rate of the signals to be augmented.
+
+        shard_size (int): The maximum size of each shard in bytes. Default 1GiB.
+
+    Returns:
+        ShardedStore: The bank of the noise recordings.
+    """
+    audio_loader = AudioLoader(sample_rate=sample_rate)
+    with ShardedStoreWriter(
+        store_dir=store_dir,
+        dtype="int16",
+        shard_size=shard_size,
+        meta={_SAMPLE_RATE_KEY: sample_rate},
+    ) as writer:
+        for file_path in file_paths:
+            x = audio_loader.run(file_path).mean(dim=0)
+            writer.add(str(file_path), _float_to_int16(x))
+    return ShardedStore(store_dir)
@@ -1,11 +1,20 @@
 from __future__ import annotations
 
+import heapq
 import os
+import re
+import threading
+from collections import Counter
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Tuple, Union
-
-from speeq.constants import CHAR_TOKENIZER_TYPE, TOKENIZER_TYPE_KEY, WORD_TOKENIZER_TYPE
+from typing import Dict, List, Set, Tuple, Union
+
+from speeq.constants import (
+    BPE_TOKENIZER_TYPE,
+    CHAR_TOKENIZER_TYPE,
+    TOKENIZER_TYPE_KEY,
+    WORD_TOKENIZER_TYPE,
+)
 from speeq.interfaces import ITokenizer
 from speeq.utils.utils import load_json, save_json
 
@@ -223,24 +232,64 @@ class BaseTokenizer(ITokenizer):
         Returns:
             ITokenizer: The trained tokenizer.
         """
-        all_tokens = self.get_tokens(data)
-        for token in all_tokens:
+        # sorted, such that the ids do not depend on the set order, and match
+        # the ones of `set_tokenizer_from_counts`
+        for token in sorted(self.get_tokens(data)):
             self.add_token(token=token)
         self._reset_id_to_token()
         return self
 
-    def save_tokenizer(self, save_path: Union[str, Path], *args, **kwargs) -> None:
-        """Saves the tokenizer to a json file
+    def count_tokens(self, data: List[str]) -> Counter:
+        """Counts the tokens of the provided data, where the counts of several
+        parts of the data can be summed up and passed to
+        `set_tokenizer_from_counts`.
 
         Args:
-            save_path (Union[str, Path]): The path to save the tokenizer to.
+            data (List[str]): A list of text sentences.
+
+        Returns:
+            Counter: The number of occurrences of each token.
+        """
+        counts = Counter()
+        for sentence in data:
+            counts.update(self.preprocess_tokens(sentence))
+        counts.pop("", None)
+        return counts
+
+    def set_tokenizer_from_counts(
+        self, counts: Dict[str, int], min_freq: int = 1
+    ) -> ITokenizer:
+        """Sets the tokenizer from the token counts returned by `count_tokens`.
+
+        Args:
+            counts (Dict[str, int]): The number of occurrences of each token.
+
+            min_freq (int): The minimum number of occurrences of a token to be
+            added to the vocabulary. Default 1.
+
+        Returns:
+            ITokenizer: The trained tokenizer.
         """
-        data = {
+        for token in sorted(counts):
+            if counts[token] >= min_freq:
+                self.add_token(token=token)
+        self._reset_id_to_token()
+        return self
+
+    def _get_tokenizer_dict(self) -> dict:
+        return {
             TOKENIZER_TYPE_KEY: self._type,
             self._token_to_id_key: self._token_to_id,
             self._special_tokens_key: self.__get_special_tokens_dict(),
         }
-        save_json(save_path, data)
+
+    def save_tokenizer(self, save_path: Union[str, Path], *args, **kwargs) -> None:
+        """Saves the tokenizer to a json file
+
+        Args:
+            save_path (Union[str, Path]): The path to save the tokenizer to.
+        """
+        save_json(save_path, self._get_tokenizer_dict())
 
     def ids2tokens(self, ids: List[int]) -> List[str]:
         """Converts a list of integers to a list of strings
@@ -325,3 +374,226 @@ class WordTokenizer(BaseTokenizer):
 
     def preprocess_tokens(self, sentence: str) -> List[str]:
         return sentence.split(self.sep)
+
+
+class BPETokenizer(BaseTokenizer):
+    """Implements a byte pair encoding (BPE) subword tokenizer, where the
+    vocabulary starts from the characters of the training data, and the most
+    frequent pair of adjacent tokens is merged into a new token until the
+    vocabulary is full. The white spaces are kept as the prefix of the words,
+    such that joining the tokens restores the original sentence.
+
+    Args:
+        max_vocab_size (int): The size of the vocabulary to reach, including
+        the special tokens. Default 1000.
+
+        min_freq (int): The minimum number of occurrences of a pair to be
+        merged. Default 2.
+
+        cache_size (int): The maximum number of encoded words to cache. Default 100000.
+    """
+
+    _type = BPE_TOKENIZER_TYPE
+    _merges_key = "merges"
+    # the words with their leading white spaces, and the trailing white spaces
+    _word_pattern = re.compile(r"\s*\S+|\s+")
+
+    def __init__(
+        self, max_vocab_size: int = 1000, min_freq: int = 2, cache_size: int = 100000
+    ) -> None:
+        super().__init__()
+        self.max_vocab_size = max_vocab_size
+        self.min_freq = min_freq
+        self.cache_size = cache_size
+        self._merges = []
+        self._ranks = {}
+        self._cache = {}
+        # the cache is shared by the loader threads
+        self._lock = threading.Lock()
+
+    def _set_merges(self, merges: List[Tuple[str, str]]) -> None:
+        self._merges = [tuple(pair) for pair in merges]
+        self._ranks = {pair: rank for rank, pair in enumerate(self._merges)}
+        with self._lock:
+            self._cache = {}
+
+    def get_tokens(self, data: List[str]) -> List[str]:
+        return sorted(set("".join(data)))
+
+    def count_tokens(self, data: List[str]) -> Counter:
+        """Counts the words of the given sentences, with their leading white
+        spaces, which are the units the merges are learned on.
+
+        Args:
+            data (List[str]): A list of text sentences.
+
+        Returns:
+            Counter: The number of occurrences of each word.
+        """
+        counts = Counter()
+        for sentence in data:
+            counts.update(self._word_pattern.findall(sentence))
+        return counts
+
+    def _learn_merges(
+        self, word_counts: Dict[str, int], min_freq: int
+    ) -> List[Tuple[str, str]]:
+        words = [list(word) for word in word_counts]
+        freqs = list(word_counts.values())
+        pair_counts = Counter()
+        # the indices of the words where each pair occurs
+        pair_words = {}
+        for idx, (word, freq) in enumerate(zip(words, freqs)):
+            for pair in zip(word, word[1:]):
+                pair_counts[pair] += freq
+                pair_words.setdefault(pair, set()).add(idx)
+        heap = [(-count, pair) for pair, count in pair_counts.items()]
+        heapq.heapify(heap)
+        merges = []
+        n_merges = self.max_vocab_size - self.vocab_size
+        while heap and len(merges) < n_merges:
+            count, pair = heapq.heappop(heap)
+            count = -count
+            if count != pair_counts.get(pair, 0):
+                # a stale entry, the pair is pushed again with its current count
+                if pair_counts.get(pair, 0) > 0:
+                    heapq.heappush(heap, (-pair_counts[pair], pair))
+                continue
+            if count < min_freq:
+                break
+            merges.append(pair)
+            changed = self.__merge_pair(pair, words, freqs, pair_counts, pair_words)
+            for item in changed:
+                if pair_counts.get(item, 0) > 0:
+                    heapq.heappush(heap, (-pair_counts[item], item))
+        return merges
+
+    def __merge_pair(
+        self,
+        pair: Tuple[str, str],
+        words: List[List[str]],
+        freqs: List[int],
+        pair_counts: Counter,
+        pair_words: Dict[Tuple[str, str], Set[int]],
+    ) -> Set[Tuple[str, str]]:
+        # only the words that contain the pair are updated, where the counts
+        # of their old pairs are removed and the counts of the new ones added
+        changed = set()
+        for idx in pair_words.pop(pair):
+            word, freq = words[idx], freqs[idx]
+            for item in zip(word, word[1:]):
+                pair_counts[item] -= freq
+                changed.add(item)
+            word = self._merge(word, pair)
+            words[idx] = word
+            for item in zip(word, word[1:]):
+                pair_counts[item] += freq
+                pair_words.setdefault(item, set()).add(idx)
+                changed.add(item)
+        del pair_counts[pair]
+        changed.discard(pair)
+        return changed
+
+    @staticmethod
+    def _merge(word: List[str], pair: Tuple[str, str]) -> List[str]:
+        result = []
+        i = 0
+        while i < len(word):
+            if i < len(word) - 1 and (word[i], word[i + 1]) == pair:
+                result.append(word[i] + word[i + 1])
+                i += 2
+            else:
+                result.append(word[i])
+                i += 1
+        return result
+
+    def set_tokenizer(self, data: List[str], *args, **kwargs) -> ITokenizer:
+        """Trains the tokenizer on the provided data.
+
+        Args:
+            data (List[str]): A list of all text sentences.
+
+        Returns:
+            ITokenizer: The trained tokenizer.
+        """
+        return self.set_tokenizer_from_counts(self.count_tokens(data))
+
+    def set_tokenizer_from_counts(
+        self, word_counts: Dict[str, int], min_freq: int = 1
+    ) -> ITokenizer:
+        """Trains the tokenizer on the word counts returned by `count_tokens`,
+        which allows the counts to be collected without holding all of the
+        text sentences.
+
+        Args:
+            word_counts (Dict[str, int]): The number of occurrences of each word.
+
+            min_freq (int): The minimum number of occurrences of a pair to be
+            merged, on top of the `min_freq` of the tokenizer, where all the
+            characters are kept, such that the rare words are still encoded.
+            Default 1.
+
+        Returns:
+            ITokenizer: The trained tokenizer.
+        """
+        for token in self.get_tokens(word_counts):
+            self.add_token(token=token)
+        merges = self._learn_merges(word_counts, max(self.min_freq, min_freq))
+        for pair in merges:
+            self.add_token(token="".join(pair))
+        self._set_merges(merges)
+        self._reset_id_to_token()
+        return self
+
+    def _encode_word(self, word: str) -> List[str]:
+        tokens = list(word)
+        while len(tokens) > 1:
+            pairs = zip(tokens, tokens[1:])
+            pair = min(pairs, key=lambda pair: self._ranks.get(pair, float("inf")))
+            if pair not in self._ranks:
+                break
+            tokens = self._merge(tokens, pair)
+        return tokens
+
+    def preprocess_tokens(self, sentence: str) -> List[str]:
+        results = []
+        for word in self._word_pattern.findall(sentence):
+            with self._lock:
+                tokens = self._cache.get(word)
+            if tokens is None:
+                tokens = self._encode_word(word)
+                with self._lock:
+                    if word not in self._cache:
+                        if len(self._cache) >= self.cache_size:
+                            # dropping the oldest entry
+                            del self._cache[next(iter(self._cache))]
+                        self._cache[word] = tokens
+            results.extend(tokens)
+        return results
+
+    def load_tokenizer_from_dict(self, data: dict) -> ITokenizer:
+        """Loads a pre-trained tokenizer of type dict.
+
+        Args:
+            data (dict): The pre-trained tokenizer dictionary.
+
+        Returns:
+            ITokenizer: The loaded tokenizer.
+        """
+        super().load_tokenizer_from_dict(data)
+        self._set_merges(data[self._merges_key])
+        return self
+
+    def _get_tokenizer_dict(self) -> dict:
+        data = super()._get_tokenizer_dict()
+        data[self._merges_key] = [list(pair) for pair in self._merges]
+        return data
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
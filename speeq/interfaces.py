@@ -72,6 +72,17 @@ class ITokenizer(ABC):
     def get_tokens(self):
         pass
 
+    def count_tokens(self, *args, **kwargs):
+        # optional, used to build the vocabulary from a streamed manifest
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support counting the tokens!"
+        )
+
+    def set_tokenizer_from_counts(self, *args, **kwargs):
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support training from the counts!"
+        )
+
 
 class IDataset(ABC):
     @abstractmethod
@@ -83,6 +94,12 @@ class IDataset(ABC):
         pass
 
 
+class ISampler(ABC):
+    @abstractmethod
+    def get_batches(self):
+        pass
+
+
 class IDataLoader(ABC):
     @abstractmethod
     def __next__(self):
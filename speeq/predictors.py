@@ -1,7 +1,8 @@
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 
 import torch
+import torchaudio
 
 from .config import ModelConfig
 from .constants import (
@@ -11,11 +12,12 @@ from .constants import (
     PREV_HIDDEN_STATE_KEY,
     SPEECH_IDX_KEY,
     TERMINATION_STATE_KEY,
+    StateKeys,
 )
+from .data.frontends import get_bundled_front_end, load_front_end
 from .data.registry import load_tokenizer
 from .interfaces import IProcessor
 from .models.registry import get_model
-from .utils.utils import load_state_dict
 
 
 class _ASRBasePredictor:
@@ -23,31 +25,48 @@ class _ASRBasePredictor:
 
     def __init__(
         self,
-        speech_processor: IProcessor,
+        speech_processor: Optional[IProcessor],
         tokenizer_path: Union[str, Path],
         model_config: ModelConfig,
         device: str,
+        front_end_path: Union[str, Path] = "",
     ) -> None:
+        state = torch.load(model_config.model_path)
         self.speech_processor = speech_processor
+        self.front_end = None
+        if front_end_path:
+            self.front_end = load_front_end(front_end_path, device=device)
+        elif speech_processor is None:
+            self.front_end = get_bundled_front_end(state, device=device)
+            if self.front_end is None:
+                raise ValueError("The checkpoint has no bundled front end!")
         self.tokenizer = load_tokenizer(tokenizer_path=tokenizer_path)
         self.device = device
         self.model = get_model(
             model_config=model_config, n_classes=self.tokenizer.vocab_size
         ).to(self.device)
-        model, *_ = load_state_dict(model_config.model_path)
-        self.model.load_state_dict(model)
+        self.model.load_state_dict(state[StateKeys.model.value])
         self.model.eval()
         self.blank_id = self.tokenizer.special_tokens.blank_id
         self.sos = self.tokenizer.special_tokens.sos_id
         self.eos = self.tokenizer.special_tokens.eos_id
 
+    def _process_speech(self, file_path: Union[Path, str]) -> torch.Tensor:
+        if self.front_end is None:
+            return self.speech_processor.execute(file_path)
+        x, sr = torchaudio.load(file_path)
+        with torch.no_grad():
+            return self.front_end(x.to(self.device), sr)
+
 
 class CTCPredictor(_ASRBasePredictor):
     """Implements CTC based model predictor
 
     Args:
 
-        speech_processor (IProcessor): The speech/file pre-processing processor.
+        speech_processor (Optional[IProcessor]): The speech/file pre-processing
+        processor. If None, the front end bundled in the checkpoint by
+        `speeq.data.frontends.bundle_front_end` is used instead.
 
         tokenizer_path (Union[str, Path]): The trained tokenizer path.
 
@@ -55,21 +74,28 @@ class CTCPredictor(_ASRBasePredictor):
 
         device (str): The device to map the operations to.
 
+        front_end_path (Union[str, Path]): The path of a front end exported by
+        `speeq.data.frontends.export_front_end`, if provided, it is used to
+        compute the features instead of the speech processor. Default ''.
+
     """
 
     def __init__(
         self,
-        speech_processor: IProcessor,
+        speech_processor: Optional[IProcessor],
         tokenizer_path: Union[str, Path],
         model_config: ModelConfig,
         device: str,
+        front_end_path: Union[str, Path] = "",
         *args,
         **kwargs
     ) -> None:
-        super().__init__(speech_processor, tokenizer_path, model_config, device)
+        super().__init__(
+            speech_processor, tokenizer_path, model_config, device, front_end_path
+        )
 
     def predict(self, file_path: Union[Path, str]) -> str:
-        speech = self.speech_processor.execute(file_path)
+        speech = self._process_speech(file_path)
         speech = speech.to(self.device)
         mask = torch.ones(1, speech.shape[1], dtype=torch.bool)
         mask = mask.to(self.device)
@@ -94,7 +120,9 @@ class Seq2SeqPredictor(_ASRBasePredictor):
 
     Args:
 
-        speech_processor (IProcessor): The speech/file pre-processing processor.
+        speech_processor (Optional[IProcessor]): The speech/file pre-processing
+        processor. If None, the front end bundled in the checkpoint by
+        `speeq.data.frontends.bundle_front_end` is used instead.
 
         tokenizer_path (Union[str, Path]): The trained tokenizer path.
 
@@ -104,24 +132,31 @@ class Seq2SeqPredictor(_ASRBasePredictor):
 
         max_len (int): The maximum decoding length.
 
+        front_end_path (Union[str, Path]): The path of a front end exported by
+        `speeq.data.frontends.export_front_end`, if provided, it is used to
+        compute the features instead of the speech processor. Default ''.
+
     """
 
     def __init__(
         self,
-        speech_processor: IProcessor,
+        speech_processor: Optional[IProcessor],
         tokenizer_path: Union[str, Path],
         model_config: ModelConfig,
         device: str,
         max_len: int,
+        front_end_path: Union[str, Path] = "",
         *args,
         **kwargs
     ) -> None:
-        super().__init__(speech_processor, tokenizer_path, model_config, device)
+        super().__init__(
+            speech_processor, tokenizer_path, model_config, device, front_end_path
+        )
         self.max_len = max_len
         # TODO: Add beam search
 
     def predict(self, file_path: Union[Path, str]) -> str:
-        speech = self.speech_processor.execute(file_path)
+        speech = self._process_speech(file_path)
         speech = speech.to(self.device)
         mask = torch.ones(1, speech.shape[1], dtype=torch.bool)
         mask = mask.to(self.device)
@@ -146,7 +181,9 @@ class TransducerPredictor(_ASRBasePredictor):
 
     Args:
 
-        speech_processor (IProcessor): The speech/file pre-processing processor.
+        speech_processor (Optional[IProcessor]): The speech/file pre-processing
+        processor. If None, the front end bundled in the checkpoint by
+        `speeq.data.frontends.bundle_front_end` is used instead.
 
         tokenizer_path (Union[str, Path]): The trained tokenizer path.
 
@@ -154,20 +191,27 @@ class TransducerPredictor(_ASRBasePredictor):
 
         device (str): The device to map the operations to.
 
+        front_end_path (Union[str, Path]): The path of a front end exported by
+        `speeq.data.frontends.export_front_end`, if provided, it is used to
+        compute the features instead of the speech processor. Default ''.
+
     """
 
     def __init__(
         self,
-        speech_processor: IProcessor,
+        speech_processor: Optional[IProcessor],
         tokenizer_path: Union[str, Path],
         model_config: ModelConfig,
         device: str,
+        front_end_path: Union[str, Path] = "",
     ) -> None:
-        super().__init__(speech_processor, tokenizer_path, model_config, device)
+        super().__init__(
+            speech_processor, tokenizer_path, model_config, device, front_end_path
+        )
         # TODO: Add Beam search here
 
     def predict(self, file_path: Union[Path, str]) -> str:
-        speech = self.speech_processor.execute(file_path)
+        speech = self._process_speech(file_path)
         speech = speech.to(self.device)
         mask = torch.ones(1, speech.shape[1], dtype=torch.bool)
         mask = mask.to(self.device)
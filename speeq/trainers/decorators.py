@@ -5,6 +5,9 @@ from typing import Callable
 from speeq.constants import HistoryKeys
 from speeq.utils.utils import get_key_tag, save_state_dict
 
+# The checkpoint overwritten at every evaluation, to resume the training from.
+LAST_CKPT_NAME = "last_checkpoint"
+
 
 def step_log(key: str, category: str):
     """Logs the result value at each time
@@ -31,7 +34,9 @@ def step_log(key: str, category: str):
 
 def export_ckpt(key: str, category: str) -> Callable:
     """Saves a checkpoint at any steps that the results
-    are less than the minimum global loss.
+    are less than the minimum global loss, and overwrites the
+    `LAST_CKPT_NAME` checkpoint at every step, along with the state of
+    the training loader, to resume the training from.
     """
     tag = get_key_tag(key, category)
 
@@ -40,17 +45,23 @@ def export_ckpt(key: str, category: str) -> Callable:
         def wrapper(trainer, *args, **kwargs):
             results = func(trainer, *args, **kwargs)
             if trainer.is_master:
+                loader_state = None
+                if hasattr(trainer.train_loader, "state_dict"):
+                    # to resume the training from the next batch
+                    loader_state = trainer.train_loader.state_dict()
+                state = dict(
+                    outdir=trainer.outdir,
+                    model=trainer.model,
+                    optimizer=trainer.optimizer,
+                    step=trainer.counter,
+                    history=trainer.history,
+                    loader_state=loader_state,
+                )
                 loss = trainer.history[tag][-1]
                 if loss < trainer.history[HistoryKeys.min_loss.value]:
                     trainer.history[HistoryKeys.min_loss.value] = loss
-                    save_state_dict(
-                        model_name="checkpoint",
-                        outdir=trainer.outdir,
-                        model=trainer.model,
-                        optimizer=trainer.optimizer,
-                        step=trainer.counter,
-                        history=trainer.history,
-                    )
+                    save_state_dict(model_name="checkpoint", **state)
+                save_state_dict(model_name=LAST_CKPT_NAME, add_step=False, **state)
             return results
 
         return wrapper
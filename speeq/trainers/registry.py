@@ -29,7 +29,7 @@ Functions:
 """
 
 import os
-from typing import Union
+from typing import Optional, Tuple, Union
 
 from torch.optim import SGD, Adam, AdamW, Optimizer, RMSprop
 
@@ -38,7 +38,7 @@ from speeq.data.registry import get_asr_loaders, get_tokenizer
 from speeq.interfaces import IScheduler, ITrainer
 from speeq.models.registry import get_model
 from speeq.utils.loggers import get_logger
-from speeq.utils.utils import get_text_list, load_csv, set_state_dict
+from speeq.utils.utils import set_state_dict
 
 from .criterions import CrossEntropyLoss, CTCLoss, NLLLoss, RNNTLoss
 from .schedulers import NoamScheduler, SqueezeformerNoamScheduler
@@ -129,16 +129,15 @@ def _get_asr_trainer_args(
     trainer_config: TrainerConfig,
     data_config: ASRDataConfig,
     model_config: ModelConfig,
-) -> dict:
+) -> Tuple[dict, Optional[int]]:
     logger = get_logger(
         name=trainer_config.logger,
         log_dir=trainer_config.logdir,
         n_logs=trainer_config.n_logs,
         clear_screen=trainer_config.clear_screen,
     )
-    data = load_csv(data_config.training_path, sep=data_config.sep)
-    data = get_text_list(data=data, key=data_config.text_key)
-    tokenizer = get_tokenizer(data_config=data_config, data=data)
+    # the vocabulary is built by streaming the training manifest
+    tokenizer = get_tokenizer(data_config=data_config)
     model = get_model(model_config=model_config, n_classes=tokenizer.vocab_size)
     if world_size == 1:
         model = model.to(trainer_config.device)
@@ -149,15 +148,6 @@ def _get_asr_trainer_args(
         pad_id=tokenizer.special_tokens.pad_id,
         **trainer_config.criterion_args
     )
-    if os.path.exists(model_config.model_path):
-        ignore = trainer_config.ignore_optim_state
-        *_, history = set_state_dict(
-            model=model,
-            optimizer=optimizer if ignore is False else None,
-            state_path=model_config.model_path,
-        )
-    else:
-        history = {}
     train_loader, test_loader = get_asr_loaders(
         data_config=data_config,
         tokenizer=tokenizer,
@@ -165,6 +155,17 @@ def _get_asr_trainer_args(
         world_size=world_size,
         rank=rank,
     )
+    if os.path.exists(model_config.model_path):
+        ignore = trainer_config.ignore_optim_state
+        # the loader continues from the batch after the checkpoint's one
+        step, history = set_state_dict(
+            model=model,
+            optimizer=optimizer if ignore is False else None,
+            state_path=model_config.model_path,
+            loader=train_loader,
+        )
+    else:
+        step, history = None, {}
     args = {
         "optimizer": optimizer,
         "criterion": criterion,
@@ -182,7 +183,8 @@ def _get_asr_trainer_args(
     }
     if world_size == 1:
         args["device"] = trainer_config.device
-    return args
+    # the step of the restored checkpoint, if any
+    return args, step
 
 
 def _get_dist_args(trainer_config, rank: int, world_size: int) -> dict:
@@ -225,7 +227,7 @@ def get_asr_trainer(
         ITrainer: An object that encapsulates the ASR trainer functionality.
     """
     name = trainer_config.name
-    base_args = _get_asr_trainer_args(
+    base_args, step = _get_asr_trainer_args(
         rank=rank,
         world_size=world_size,
         trainer_config=trainer_config,
@@ -243,5 +245,9 @@ def get_asr_trainer(
         )
     )
     if world_size == 1:
-        return TRAINERS[name](**args)
-    return DIST_TRAINERS[name](**args)
+        trainer = TRAINERS[name](**args)
+    else:
+        trainer = DIST_TRAINERS[name](**args)
+    if step is not None:
+        trainer.resume(step)
+    return trainer
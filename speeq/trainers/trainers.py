@@ -37,7 +37,7 @@ from speeq.config import ASRDataConfig, ModelConfig, TrainerConfig
 from speeq.constants import HistoryKeys, LogCategories
 from speeq.interfaces import IDataLoader, IScheduler, ITrainer
 from speeq.utils.loggers import ILogger
-from speeq.utils.utils import get_key_tag, has_bnorm
+from speeq.utils.utils import get_key_tag
 
 from .decorators import export_ckpt, step_log
 
@@ -107,6 +107,7 @@ class BaseTrainer(ITrainer):
         self.grad_clip_norm_type = grad_clip_norm_type
         self.history = history
         self.counter = 1
+        self.start_epoch = 0
         self.grad_acc_steps = grad_acc_steps
         if HistoryKeys.min_loss.value not in self.history:
             self.history[HistoryKeys.min_loss.value] = inf
@@ -130,9 +131,21 @@ class BaseTrainer(ITrainer):
             self.optimizer.step()
             self.optimizer.zero_grad()
 
+    def resume(self, step: int) -> None:
+        """Continues the training from a checkpoint saved at the given step,
+        where the step counter, and thus the gradient accumulation and the
+        logging phases, continue from the next step, and the epochs already
+        consumed by the restored training loader are skipped.
+
+        Args:
+            step (int): The step the checkpoint was saved at.
+        """
+        self.counter = step + 1
+        self.start_epoch = getattr(self.train_loader, "n_completed_epochs", 0)
+
     def fit(self):
         """Fits the model on the training data."""
-        for _ in range(self.epochs):
+        for _ in range(self.start_epoch, self.epochs):
             self.train()
             self.logger.log(self.history)
 
@@ -173,19 +186,39 @@ class BaseTrainer(ITrainer):
         """
         self.model.train()
         total_loss = 0.0
-        for i, batch in enumerate(tqdm(self.train_loader)):
-            loss = self.train_step(batch)
-            total_loss += loss
-            if self.counter % self.log_steps_frequency == 0:
-                self.test()
-                self.model.train()
+        try:
+            for i, batch in enumerate(tqdm(self.train_loader)):
+                loss = self.train_step(batch)
+                total_loss += loss
+                if self.counter % self.log_steps_frequency == 0:
+                    self.test()
+                    self.model.train()
+                    self.inline_log(
+                        key=HistoryKeys.train_loss.value,
+                        category=LogCategories.steps.value,
+                        value=total_loss / (i + 1),
+                    )
+                self.counter += 1
+        finally:
+            # shutting down the loader's workers, if any
+            self.train_loader.close()
+        self._log_data_profile()
+        return total_loss / len(self.train_loader)
+
+    def _log_data_profile(self, log: bool = True) -> None:
+        # the mean time per call of each profiled data process over the epoch,
+        # available only if the loader's processors are created with profiling
+        get_profile_stats = getattr(self.train_loader, "get_profile_stats", None)
+        if get_profile_stats is None:
+            return
+        if log is True:
+            for name, stats in get_profile_stats().items():
                 self.inline_log(
-                    key=HistoryKeys.train_loss.value,
-                    category=LogCategories.steps.value,
-                    value=total_loss / (i + 1),
+                    key=f"{HistoryKeys.data_time.value}/{name}",
+                    category=LogCategories.epochs.value,
+                    value=stats["mean_time"],
                 )
-            self.counter += 1
-        return total_loss / len(self.train_loader)
+        self.train_loader.reset_profile()
 
     @export_ckpt(key=HistoryKeys.test_loss.value, category=LogCategories.steps.value)
     @step_log(key=HistoryKeys.test_loss.value, category=LogCategories.steps.value)
@@ -194,15 +227,25 @@ class BaseTrainer(ITrainer):
         """Performing a model test on the testing data
 
         Returns:
-            float: The average test loss.
+            float: The average test loss over all the examples.
         """
         self.model.eval()
+        total_loss, n_examples = self._eval_loss()
+        return total_loss / max(n_examples, 1)
+
+    def _eval_loss(self) -> Tuple[float, int]:
+        # the batch loss is the mean over its examples, which is weighted by
+        # the batch size, as the last batch may be smaller
         total_loss = 0.0
-        for batch in self.test_loader:
-            loss = self.forward_pass(batch)
-            total_loss += loss.item()
-        total_loss /= len(self.test_loader)
-        return total_loss
+        n_examples = 0
+        try:
+            for batch in self.test_loader:
+                loss = self.forward_pass(batch)
+                total_loss += loss.item() * len(batch[0])
+                n_examples += len(batch[0])
+        finally:
+            self.test_loader.close()
+        return total_loss, n_examples
 
     @property
     def is_master(self):
@@ -297,7 +340,6 @@ class BaseDistTrainer(BaseTrainer):
         self.dist_address = dist_address
         self.dist_backend = dist_backend
         self.init_dist()
-        self.has_bnorm = has_bnorm(self.model)
         self.model.to(f"cuda:{rank}")
         self.model = torch.nn.SyncBatchNorm.convert_sync_batchnorm(self.model)
         self.model = DistributedDataParallel(self.model, device_ids=[self.rank])
@@ -355,45 +397,84 @@ class BaseDistTrainer(BaseTrainer):
         """
         self.model.train()
         total_loss = 0.0
-        for i, batch in enumerate(tqdm(self.train_loader)):
-            loss = self.train_step(batch)
-            total_loss += loss
-            if self.counter % self.log_steps_frequency == 0:
-                total = self._all_reduce_loss(total_loss, i + 1)
-                if self.is_master or self.has_bnorm is True:
-                    """The extra condition to solve a dummy issue caused when
-                    we have DDP with batch norm, it works only if the
-                    evaluation is done on all nodes!, the link below
-                    is similar issue
-                    discuss.pytorch.org/t/validation-hangs-up-when-using-ddp-and-syncbatchnorm/104831
-                    """
-                    self.inline_log(
-                        key=HistoryKeys.train_loss.value,
-                        category=LogCategories.steps.value,
-                        value=total.item(),
-                    )
+        try:
+            for i, batch in enumerate(tqdm(self.train_loader)):
+                loss = self.train_step(batch)
+                total_loss += loss
+                if self.counter % self.log_steps_frequency == 0:
+                    total = self._all_reduce_loss(total_loss, i + 1)
+                    if self.is_master:
+                        self.inline_log(
+                            key=HistoryKeys.train_loss.value,
+                            category=LogCategories.steps.value,
+                            value=total.item(),
+                        )
+                    # the evaluation is sharded across all the ranks
                     self.test()
                     self.model.train()
-                if self.has_bnorm is False:
-                    barrier()
-            self.counter += 1
+                self.counter += 1
+        finally:
+            self.train_loader.close()
+        self._log_shard_imbalance()
+        self._log_data_profile(log=self.is_master)
         return self._all_reduce_loss(total_loss, len(self.train_loader)).item()
 
+    def _log_shard_imbalance(self) -> None:
+        # all ranks compute the same plan, so the master's view is global
+        sampler = getattr(self.train_loader, "sampler", None)
+        if self.is_master and hasattr(sampler, "imbalance"):
+            self.inline_log(
+                key=HistoryKeys.shard_imbalance.value,
+                category=LogCategories.epochs.value,
+                value=sampler.imbalance,
+            )
+            self.inline_log(
+                key=HistoryKeys.step_imbalance.value,
+                category=LogCategories.epochs.value,
+                value=sampler.step_imbalance,
+            )
+
     def fit(self):
         """Fits the model on the training data, and logs the results on the master
         node only.
         """
-        for _ in range(self.epochs):
+        for _ in range(self.start_epoch, self.epochs):
             self.train()
-            if self.is_master or self.has_bnorm is True:
-                """The extra condition to solve a dummy issue caused when
-                we have DDP with batch norm, it works only if the evaluation is done on all nodes!
-                the link below is similar issue
-                discuss.pytorch.org/t/validation-hangs-up-when-using-ddp-and-syncbatchnorm/104831
-                """
+            if self.is_master:
                 self.logger.log(self.history)
             barrier()
 
+    @export_ckpt(key=HistoryKeys.test_loss.value, category=LogCategories.steps.value)
+    @step_log(key=HistoryKeys.test_loss.value, category=LogCategories.steps.value)
+    @torch.no_grad()
+    def test(self) -> float:
+        """Performing a model test on the testing data, where each rank
+        evaluates its own shard of the testing data, and the losses are
+        aggregated across all the ranks.
+
+        Returns:
+            float: The average test loss over all the examples of all the ranks.
+        """
+        self.model.eval()
+        # the sums are reduced before dividing once, as the shards may differ
+        # in size, and some ranks may have no examples at all
+        total = torch.tensor(self._eval_loss(), dtype=torch.float64)
+        total = total.cuda(self.rank)
+        all_reduce(total, op=ReduceOp.SUM)
+        total_loss, n_examples = total.tolist()
+        return total_loss / max(n_examples, 1)
+
+    def _eval_loss(self) -> Tuple[float, int]:
+        # the wrapped module is evaluated directly, as the DDP forward
+        # broadcasts the buffers on every call, which deadlocks once the
+        # shards hold different numbers of batches
+        model = self.model
+        self.model = model.module
+        try:
+            return super()._eval_loss()
+        finally:
+            self.model = model
+
 
 class CTCTrainer(BaseTrainer):
     """A trainer module for CTC-based models.
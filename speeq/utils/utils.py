@@ -1,7 +1,7 @@
 import json
 import os
 import platform
-from csv import DictReader
+from csv import DictReader, DictWriter
 from pathlib import Path
 from typing import List, Optional, Union
 
@@ -52,6 +52,17 @@ def load_csv(file_path, encoding="utf-8", sep=","):
     return data
 
 
+def save_csv(file_path, data: List[dict], encoding="utf-8", sep=",") -> None:
+    # writing to a temporary file first, such that an interrupted write
+    # never leaves a truncated file behind
+    tmp_path = str(file_path) + ".tmp"
+    with open(tmp_path, "w", encoding=encoding, newline="") as f:
+        writer = DictWriter(f, data[0].keys(), delimiter=sep)
+        writer.writeheader()
+        writer.writerows(data)
+    os.replace(tmp_path, file_path)
+
+
 def get_pad_mask(seq_len: int, pad_len: int):
     if seq_len <= 0:
         raise ValueError("seq_len must be greater than 0!")
@@ -60,7 +71,11 @@ def get_pad_mask(seq_len: int, pad_len: int):
 
 
 def get_state_dict(
-    model: Module, optimizer: Optimizer, step: int, history: dict
+    model: Module,
+    optimizer: Optimizer,
+    step: int,
+    history: dict,
+    loader_state: Optional[dict] = None,
 ) -> dict:
     model = {
         key.replace("module.", ""): value for key, value in model.state_dict().items()
@@ -70,6 +85,7 @@ def get_state_dict(
         StateKeys.optimizer.value: optimizer.state_dict(),
         StateKeys.step.value: step,
         StateKeys.history.value: history,
+        StateKeys.loader.value: loader_state,
     }
 
 
@@ -80,11 +96,22 @@ def save_state_dict(
     optimizer: Optimizer,
     step: int,
     history: dict,
+    loader_state: Optional[dict] = None,
+    add_step: bool = True,
 ) -> None:
-    ckpt_path = "{}_{}.pt".format(model_name, step)
+    ckpt_path = "{}_{}.pt".format(model_name, step) if add_step else f"{model_name}.pt"
     ckpt_path = os.path.join(outdir, ckpt_path)
-    state = get_state_dict(model=model, optimizer=optimizer, step=step, history=history)
-    torch.save(state, ckpt_path)
+    state = get_state_dict(
+        model=model,
+        optimizer=optimizer,
+        step=step,
+        history=history,
+        loader_state=loader_state,
+    )
+    # a checkpoint that is overwritten must never be left half written
+    tmp_path = ckpt_path + ".tmp"
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, ckpt_path)
     print(f"checkpoint save to {ckpt_path}!")
 
 
@@ -94,18 +121,25 @@ def load_state_dict(state_path: Union[str, Path]) -> tuple:
     optimizer = state[StateKeys.optimizer.value]
     steps = state[StateKeys.step.value]
     history = state[StateKeys.history.value]
-    return model, optimizer, steps, history
+    # checkpoints saved before the loader state was added have no such key
+    loader_state = state.get(StateKeys.loader.value)
+    return model, optimizer, steps, history, loader_state
 
 
 def set_state_dict(
-    model: Module, state_path: Union[Path, str], optimizer: Optional[Optimizer] = None
+    model: Module,
+    state_path: Union[Path, str],
+    optimizer: Optional[Optimizer] = None,
+    loader: Optional[object] = None,
 ):
-    model_state, optimizer_state, steps, history = load_state_dict(
+    model_state, optimizer_state, steps, history, loader_state = load_state_dict(
         state_path=state_path
     )
     model.load_state_dict(model_state)
     if optimizer is not None:
         optimizer.load_state_dict(optimizer_state)
+    if loader is not None and loader_state is not None:
+        loader.load_state_dict(loader_state)
     return steps, history
 
 
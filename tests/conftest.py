@@ -183,7 +183,7 @@ def speech_text_dataset(dict_csv_data, tmp_path):
 
 @fixture
 def speech_text_loader(speech_text_dataset):
-    def func(batch_size, rank=0, world_size=1, use_mel_spec=False):
+    def func(batch_size, rank=0, world_size=1, use_mel_spec=False, **kwargs):
         dataset = speech_text_dataset(use_mel_spec=use_mel_spec)
         speech_padder = DynamicPadder(dim=-2 if use_mel_spec else -1, pad_val=0)
         text_padder = DynamicPadder(dim=-1, pad_val=0)
@@ -194,6 +194,7 @@ def speech_text_loader(speech_text_dataset):
             speech_padder=speech_padder,
             rank=rank,
             world_size=world_size,
+            **kwargs,
         )
 
     return func
@@ -1,7 +1,12 @@
+import os
+import pickle
+import random
+
 import pytest
 import torch
+import torchaudio
 
-from speeq.data import augmenters
+from speeq.data import augmenters, stores
 
 
 class BaseAudioTest:
@@ -117,3 +122,217 @@ class TestTimeMasking:
         if ratio == 0 or n == 0:
             result = augmenter.run(input)
             assert torch.allclose(input, result)
+
+
+@pytest.mark.parametrize(
+    ("augmenter", "feat_size"),
+    (
+        (augmenters.WhiteNoiseInjector(), None),
+        (augmenters.VolumeChanger(min_gain=0.1, max_gain=1), None),
+        (augmenters.ConsistentAttenuator(), None),
+        (augmenters.VariableAttenuator(), None),
+        (augmenters.Reverberation(min_len=5, max_len=10), None),
+        (augmenters.FrequencyMasking(n=2, max_length=3), 8),
+        (augmenters.TimeMasking(n=2, max_length=3), 8),
+    ),
+)
+def test_run_batch(augmenter, feat_size):
+    lengths = torch.LongTensor([20, 12, 5])
+    shape = (len(lengths), 20) if feat_size is None else (len(lengths), 20, feat_size)
+    input = torch.randn(*shape).abs() + 1
+    for item, length in zip(input, lengths):
+        item[length:] = 0
+    result, result_lengths = augmenter.run_batch(input, lengths)
+    assert result.shape == input.shape
+    assert torch.equal(result_lengths, lengths)
+    for item, length in zip(result, lengths):
+        assert not item[length:].any()
+    augmenter.ratio = 0
+    result, _ = augmenter.run_batch(input, lengths)
+    assert torch.equal(result, input)
+    augmenter.ratio = 1.0
+
+
+def test_run_batch_per_example_gain():
+    augmenter = augmenters.VolumeChanger(min_gain=0.1, max_gain=1)
+    input = torch.ones(8, 10)
+    result, _ = augmenter.run_batch(input, torch.full((8,), 10))
+    gains = result[:, 0]
+    assert torch.equal(result, gains[:, None].expand_as(result))
+    assert len(gains.unique()) > 1
+    assert ((gains >= 0.1) & (gains <= 1)).all()
+
+
+def test_time_masking_batch_within_lengths():
+    augmenter = augmenters.TimeMasking(n=4, max_length=5)
+    lengths = torch.LongTensor([30, 10, 3])
+    input = torch.ones(len(lengths), 30, 4)
+    for _ in range(20):
+        result, _ = augmenter.run_batch(input, lengths)
+        for item, length in zip(result, lengths):
+            # masking zeroes whole frames and never touches the padding
+            assert torch.equal(item.min(dim=-1).values, item.max(dim=-1).values)
+            assert item[length:].eq(1).all()
+
+
+class TestReverberation:
+    @pytest.mark.parametrize("ir_len", (7, 8, 100, 101))
+    @pytest.mark.parametrize("n_samples", (1, 2))
+    def test_fft_matches_direct(self, ir_len, n_samples):
+        x = torch.randn(n_samples, 500)
+        direct = augmenters.Reverberation(
+            min_len=ir_len, max_len=ir_len, fft_threshold=10**6
+        )
+        fft = augmenters.Reverberation(min_len=ir_len, max_len=ir_len, fft_threshold=1)
+        random.seed(0)
+        torch.manual_seed(0)
+        target = direct.func(x)
+        random.seed(0)
+        torch.manual_seed(0)
+        result = fft.func(x)
+        assert result.shape == x.shape
+        assert torch.allclose(result, target, atol=1e-4)
+
+    def test_rir_bank(self, tmp_path):
+        bank = stores.build_rir_bank(["tests/files/1.wav"], tmp_path, sample_rate=8000)
+        augmenter = augmenters.Reverberation(rir_bank_dir=tmp_path)
+        augmenter = pickle.loads(pickle.dumps(augmenter))
+        x = torch.zeros(1, 300)
+        x[0, 0] = 1
+        result = augmenter.func(x)
+        # the response to an impulse is the impulse response from its center
+        h = torch.from_numpy(bank.get("tests/files/1.wav")[0])
+        start = (h.shape[-1] - 1) // 2
+        assert torch.allclose(result[0], h[start : start + 300], atol=1e-5)
+
+    @pytest.mark.parametrize("fft_threshold", (1, 10**6))
+    def test_batch_matches_single(self, tmp_path, fft_threshold):
+        stores.build_rir_bank(["tests/files/1.wav"], tmp_path, sample_rate=8000)
+        augmenter = augmenters.Reverberation(
+            rir_bank_dir=tmp_path, fft_threshold=fft_threshold
+        )
+        lengths = torch.LongTensor([400, 250])
+        x = torch.randn(len(lengths), 400)
+        x[1, 250:] = 0
+        result = augmenter.func_batch(x, lengths)
+        for item, target, length in zip(result, x, lengths):
+            expected = augmenter.func(target[None, :length])[0]
+            assert torch.allclose(item[:length], expected, atol=1e-4)
+
+    @pytest.mark.parametrize("fft_threshold", (1, 10**6))
+    def test_keeps_length(self, fft_threshold):
+        augmenter = augmenters.Reverberation(
+            min_len=9, max_len=20, fft_threshold=fft_threshold
+        )
+        x = torch.randn(2, 300)
+        assert augmenter.func(x[:1]).shape == (1, 300)
+        result, lengths = augmenter.run_batch(x, torch.LongTensor([300, 200]))
+        assert result.shape == x.shape
+        assert lengths.tolist() == [300, 200]
+
+    def test_batch_short_responses_skip_fft(self, monkeypatch):
+        def fail(*args, **kwargs):
+            raise AssertionError("FFT used below the threshold")
+
+        monkeypatch.setattr(augmenters, "_fft_convolve", fail)
+        augmenter = augmenters.Reverberation(min_len=5, max_len=30, fft_threshold=64)
+        x = torch.randn(3, 100)
+        augmenter.func_batch(x, torch.LongTensor([100, 80, 50]))
+        augmenter.func(x[:1])
+
+
+@pytest.mark.parametrize(
+    "augmenter_cls", (augmenters.TimeMasking, augmenters.FrequencyMasking)
+)
+@pytest.mark.parametrize("inplace", (True, False))
+def test_masking_inplace(augmenter_cls, inplace):
+    augmenter = augmenter_cls(n=3, max_length=4, inplace=inplace)
+    input = torch.ones(1, 20, 8)
+    result = augmenter.func(input)
+    assert (result.data_ptr() == input.data_ptr()) is inplace
+    assert torch.equal(input, result if inplace else torch.ones(1, 20, 8))
+    lengths = torch.LongTensor([20])
+    input = torch.ones(1, 20, 8)
+    result, _ = augmenter.run_batch(input, lengths)
+    assert (result.data_ptr() == input.data_ptr()) is inplace
+
+
+def test_time_masking_max_ratio():
+    augmenter = augmenters.TimeMasking(n=1, max_length=100, max_ratio=0.1)
+    lengths = torch.LongTensor([50, 20])
+    input = torch.ones(len(lengths), 50, 2)
+    for _ in range(50):
+        result, _ = augmenter.run_batch(input, lengths)
+        n_masked = result[..., 0].eq(0).sum(dim=-1)
+        assert (n_masked <= (lengths * 0.1).long()).all()
+
+
+class TestSpeedPerturbation:
+    @pytest.mark.parametrize("factor", (0.9, 1.0, 1.1))
+    def test_func(self, factor):
+        augmenter = augmenters.SpeedPerturbation(sample_rate=8000, factors=[factor])
+        x = torch.randn(1, 8001)
+        result = augmenter.func(x)
+        assert result.shape == (1, augmenter._get_length(8001, factor))
+        if factor != 1:
+            resampler = augmenter._get_resampler(factor, 8000)
+            assert resampler is augmenter._get_resampler(factor, 8000)
+
+    def test_run_batch(self):
+        augmenter = augmenters.SpeedPerturbation(sample_rate=8000)
+        lengths = torch.LongTensor([4000, 3000, 1200, 800])
+        x = torch.randn(len(lengths), 4000)
+        for item, length in zip(x, lengths):
+            item[length:] = 0
+        result, new_lengths = augmenter.run_batch(x, lengths)
+        assert result.shape == (len(lengths), new_lengths.max().item())
+        for item, target, length, new_length in zip(result, x, lengths, new_lengths):
+            # the factor of each example is recovered from its new length
+            factor = [
+                factor
+                for factor in augmenter.factors
+                if augmenter._get_length(length.item(), factor) == new_length
+            ][0]
+            expected = augmenter._perturb(target[None, :length], factor)[0]
+            assert torch.allclose(item[:new_length], expected, atol=1e-4)
+            assert not item[new_length:].any()
+
+    def test_length_ratio(self):
+        augmenter = augmenters.SpeedPerturbation(sample_rate=8000, factors=[0.8, 1.2])
+        assert augmenter.length_ratio == 1.25
+
+
+class TestNoiseInjector:
+    @pytest.fixture
+    def noise_bank_dir(self, tmp_path):
+        # a stationary noise, as a short crop of a recording can be silent,
+        # where no gain reaches the target SNR
+        file_path = os.path.join(tmp_path, "noise.wav")
+        torchaudio.save(file_path, 0.1 * torch.randn(1, 8000), 8000)
+        bank_dir = os.path.join(tmp_path, "bank")
+        stores.build_noise_bank([file_path], bank_dir, sample_rate=8000)
+        return bank_dir
+
+    @pytest.mark.parametrize("n_samples", (100, 10**5))
+    @pytest.mark.parametrize("snr", (0.0, 10.0))
+    def test_func(self, noise_bank_dir, n_samples, snr):
+        augmenter = augmenters.NoiseInjector(noise_bank_dir, min_snr=snr, max_snr=snr)
+        augmenter = pickle.loads(pickle.dumps(augmenter))
+        x = torch.randn(1, n_samples)
+        noise = augmenter.func(x) - x
+        result_snr = 10 * torch.log10(x.pow(2).mean() / noise.pow(2).mean())
+        assert abs(result_snr.item() - snr) < 1e-2
+
+    def test_func_batch(self, noise_bank_dir):
+        augmenter = augmenters.NoiseInjector(noise_bank_dir, min_snr=5, max_snr=5)
+        lengths = torch.LongTensor([400, 250])
+        x = torch.randn(len(lengths), 400)
+        x[1, 250:] = 0
+        result, _ = augmenter.run_batch(x, lengths)
+        for item, target, length in zip(result, x, lengths):
+            noise = item[:length] - target[:length]
+            result_snr = 10 * torch.log10(
+                target[:length].pow(2).mean() / noise.pow(2).mean()
+            )
+            assert abs(result_snr.item() - 5) < 1e-2
+            assert not item[length:].any()
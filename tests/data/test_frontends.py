@@ -0,0 +1,98 @@
+import os
+
+import pytest
+import torch
+import torchaudio
+
+from speeq.data import augmenters, frontends, processes, processors
+
+
+def get_speech_processor(spec_processes, spec_augmenter=None, audio_augmenter=None):
+    return processors.SpeechProcessor(
+        audio_processor=processors.OrderedProcessor(
+            [processes.AudioLoader(sample_rate=8000)]
+        ),
+        audio_augmenter=audio_augmenter,
+        spec_processor=processors.OrderedProcessor(spec_processes),
+        spec_augmenter=spec_augmenter,
+    )
+
+
+@pytest.mark.parametrize(
+    "spec_processes",
+    (
+        [processes.FeatExtractor("melspec", {"sample_rate": 8000, "n_mels": 40})],
+        [
+            processes.FeatExtractor("mfcc", {"sample_rate": 8000, "n_mfcc": 13}),
+            processes.FeatStacker(feat_stack_factor=3),
+            processes.FrameContextualizer(contex_size=2),
+        ],
+    ),
+)
+@pytest.mark.parametrize("file_path", ("tests/files/1.wav", "tests/files/2.wav"))
+def test_front_end(spec_processes, file_path, tmp_path):
+    speech_processor = get_speech_processor(spec_processes)
+    front_end = frontends.get_front_end(speech_processor)
+    export_path = os.path.join(tmp_path, "front_end.pt")
+    frontends.export_front_end(front_end, export_path)
+    scripted = frontends.load_front_end(export_path)
+    x, sr = torchaudio.load(file_path)
+    target = speech_processor.execute(file_path)
+    for module in (front_end, scripted):
+        assert torch.allclose(module(x, sr), target, atol=1e-4)
+    resampled = processes.AudioLoader(sample_rate=8000).run(file_path)
+    assert torch.allclose(scripted(resampled, 8000), target, atol=1e-4)
+    with pytest.raises(Exception):
+        scripted(x, 11025)
+
+
+def test_front_end_skips_augmenters():
+    speech_processor = get_speech_processor(
+        [processes.FeatExtractor("melspec", {"sample_rate": 8000})],
+        spec_augmenter=processors.OrderedProcessor(
+            [augmenters.TimeMasking(n=2, max_length=3)]
+        ),
+    )
+    front_end = frontends.get_front_end(speech_processor)
+    assert len(front_end.layers) == 1
+
+
+def test_front_end_skips_audio_augmenter():
+    extractor = processes.FeatExtractor("melspec", {"sample_rate": 8000})
+    speech_processor = get_speech_processor(
+        [extractor],
+        audio_augmenter=processors.OrderedProcessor(
+            [augmenters.VolumeChanger(min_gain=0.5, max_gain=1)]
+        ),
+    )
+    front_end = frontends.get_front_end(speech_processor)
+    assert len(front_end.layers) == 1
+    x = processes.AudioLoader(sample_rate=8000).run("tests/files/1.wav")
+    assert torch.allclose(front_end(x, 8000), extractor.run(x), atol=1e-4)
+
+
+def test_bundle_front_end(tmp_path):
+    ckpt_path = os.path.join(tmp_path, "checkpoint.pt")
+    torch.save({"model": {}}, ckpt_path)
+    assert frontends.get_bundled_front_end(torch.load(ckpt_path)) is None
+    front_end = frontends.get_front_end(
+        get_speech_processor([processes.FeatExtractor("melspec", {"n_mels": 40})])
+    )
+    frontends.bundle_front_end(front_end, ckpt_path)
+    assert torch.load(ckpt_path)["model"] == {}
+    scripted = frontends.get_bundled_front_end(torch.load(ckpt_path))
+    x = torch.randn(1, 8000)
+    assert torch.allclose(scripted(x, 8000), front_end(x, 8000))
+
+
+def test_unsupported_process():
+    speech_processor = processors.SpeechProcessor(
+        audio_processor=processors.OrderedProcessor(
+            [
+                processes.AudioLoader(sample_rate=8000),
+                augmenters.VolumeChanger(min_gain=0.5, max_gain=1),
+            ]
+        ),
+    )
+    with pytest.raises(ValueError):
+        frontends.get_front_end(speech_processor)
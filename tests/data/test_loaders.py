@@ -1,8 +1,12 @@
 import os
 
 import pytest
+import torch
 
-from speeq.data import loaders
+from speeq.config import ASRDataConfig
+from speeq.constants import FileKeys
+from speeq.data import loaders, padders, processes, processors, registry, samplers
+from speeq.data.tokenizers import CharTokenizer
 from tests.helpers import create_csv_file
 
 
@@ -36,8 +40,111 @@ class TestSpeechTextDataset:
         with pytest.raises(IndexError):
             dataset[len(dataset)]
 
+    def test_get_text_lengths(self, speech_text_dataset, dict_csv_data):
+        dataset = speech_text_dataset()
+        lengths = dataset.get_text_lengths()
+        assert lengths == [len(item["text"]) for item in dict_csv_data]
+
+    @pytest.mark.parametrize("manifest_type", ["memory", "lazy", "columnar"])
+    def test_get_text_lengths_from_column(self, dict_csv_data, tmp_path, manifest_type):
+        file_path = os.path.join(tmp_path, "file.csv")
+        create_csv_file(
+            file_path,
+            data=[
+                {**item, FileKeys.n_tokens_key.value: i + 1}
+                for i, item in enumerate(dict_csv_data)
+            ],
+        )
+
+        class Tokenizer(CharTokenizer):
+            def tokenize(self, *args, **kwargs):
+                raise AssertionError("the lengths must not be tokenized")
+
+        dataset = loaders.SpeechTextDataset(
+            data_path=file_path,
+            tokenizer=Tokenizer(),
+            speech_processor=processors.OrderedProcessor([]),
+            text_processor=processors.OrderedProcessor([]),
+            sep=",",
+            manifest_type=manifest_type,
+        )
+        assert dataset.get_text_lengths() == [1, 2]
+
+    def test_max_duration(self, dict_csv_data, tmp_path):
+        file_path = os.path.join(tmp_path, "file.csv")
+        create_csv_file(file_path, data=dict_csv_data)
+        tokenizer = CharTokenizer()
+        tokenizer.set_tokenizer([item["text"] for item in dict_csv_data])
+        dataset = loaders.SpeechTextDataset(
+            data_path=file_path,
+            tokenizer=tokenizer,
+            speech_processor=processors.OrderedProcessor(
+                [processes.AudioLoader(sample_rate=8000)]
+            ),
+            text_processor=processors.OrderedProcessor([]),
+            sep=",",
+            max_duration=0.5,
+        )
+        for speech, speech_len, *_ in dataset:
+            assert speech.shape == (1, 4000)
+            assert speech_len == 4000
+
 
 class TestSpeechTextLoader:
+    @pytest.mark.parametrize(
+        "post_processes",
+        (
+            [],
+            [processes.FeatStacker(3)],
+            [processes.FrameContextualizer(2)],
+            [processes.FeatStacker(2), processes.FrameContextualizer(1)],
+        ),
+    )
+    def test_batch_processor(self, dict_csv_data, tmp_path, post_processes):
+        file_path = os.path.join(tmp_path, "file.csv")
+        create_csv_file(file_path, data=dict_csv_data)
+        tokenizer = CharTokenizer()
+        tokenizer.set_tokenizer([item["text"] for item in dict_csv_data])
+        extractor = processes.FeatExtractor(
+            "melspec", {"n_fft": 400, "hop_length": 160, "center": False}
+        )
+        dataset = loaders.SpeechTextDataset(
+            data_path=file_path,
+            tokenizer=tokenizer,
+            speech_processor=processors.OrderedProcessor(
+                [processes.AudioLoader(sample_rate=16000)]
+            ),
+            text_processor=processors.OrderedProcessor([]),
+            sep=",",
+        )
+        loader = loaders.SpeechTextLoader(
+            dataset=dataset,
+            batch_size=len(dict_csv_data),
+            text_padder=padders.DynamicPadder(dim=0, pad_val=0),
+            speech_padder=padders.DynamicPadder(dim=1, pad_val=0.0),
+            batch_processor=processors.OrderedProcessor([extractor, *post_processes]),
+        )
+        speech, speech_mask, *_ = next(iter(loader))
+        single_processor = processors.OrderedProcessor([extractor, *post_processes])
+        for feats, mask, (wav, *_) in zip(speech, speech_mask, dataset):
+            target = single_processor.execute(wav)[0]
+            assert mask.sum().item() == target.shape[0]
+            assert not mask[target.shape[0] :].any()
+            assert torch.allclose(feats[: target.shape[0]], target, atol=1e-4)
+
+    def test_unsupported_batch_process(self, speech_text_loader):
+        loader = speech_text_loader(batch_size=1)
+        with pytest.raises(ValueError):
+            loaders.SpeechTextLoader(
+                dataset=loader.data,
+                batch_size=1,
+                text_padder=loader.text_padder,
+                speech_padder=loader.speech_padder,
+                batch_processor=processors.OrderedProcessor(
+                    [processes.AudioLoader(sample_rate=16000)]
+                ),
+            )
+
     @pytest.mark.parametrize(
         ("batch_size", "rank", "world_size", "n_runs"),
         (
@@ -51,3 +158,203 @@ class TestSpeechTextLoader:
             batch_size=batch_size, rank=rank, world_size=world_size
         )
         assert len(loader) == n_runs
+
+    @pytest.mark.parametrize(
+        ("batch_size", "n_workers", "prefetch_size", "worker_type"),
+        (
+            (1, 1, 1, "thread"),
+            (1, 2, 2, "thread"),
+            (1, 2, 3, "process"),
+            (2, 2, 2, "process"),
+        ),
+    )
+    def test_workers(
+        self, speech_text_loader, batch_size, n_workers, prefetch_size, worker_type
+    ):
+        loader = speech_text_loader(batch_size=batch_size)
+        parallel_loader = speech_text_loader(
+            batch_size=batch_size,
+            n_workers=n_workers,
+            prefetch_size=prefetch_size,
+            worker_type=worker_type,
+        )
+        for _ in range(2):
+            batches = list(parallel_loader)
+            assert len(batches) == len(loader)
+            assert parallel_loader._pool is None
+            for batch, target in zip(batches, loader):
+                speech, speech_mask, text, text_mask = batch
+                assert speech.shape == target[0].shape
+                assert torch.equal(speech_mask, target[1])
+                assert torch.equal(text, target[2])
+                assert torch.equal(text_mask, target[3])
+
+    @pytest.mark.parametrize("worker_type", ("thread", "process"))
+    def test_profile(self, dict_csv_data, tmp_path, worker_type):
+        file_path = os.path.join(tmp_path, "file.csv")
+        create_csv_file(file_path, data=dict_csv_data)
+        tokenizer = CharTokenizer()
+        tokenizer.set_tokenizer([item["text"] for item in dict_csv_data])
+        dataset = loaders.SpeechTextDataset(
+            data_path=file_path,
+            tokenizer=tokenizer,
+            speech_processor=processors.OrderedProcessor(
+                [processes.AudioLoader(sample_rate=8000)], profile=True
+            ),
+            text_processor=processors.OrderedProcessor([]),
+            sep=",",
+        )
+        loader = loaders.SpeechTextLoader(
+            dataset=dataset,
+            batch_size=1,
+            text_padder=padders.DynamicPadder(dim=0, pad_val=0),
+            speech_padder=padders.DynamicPadder(dim=1, pad_val=0.0),
+            n_workers=2,
+            worker_type=worker_type,
+            batch_processor=processors.OrderedProcessor(
+                [processes.FeatExtractor("melspec", {"n_mels": 40})], profile=True
+            ),
+        )
+        for _ in range(2):
+            assert len(list(loader)) == len(loader)
+        stats = loader.get_profile_stats()
+        assert stats["AudioLoader"]["calls"] == 2 * len(dict_csv_data)
+        assert stats["FeatExtractor"]["calls"] == 2 * len(loader)
+        loader.reset_profile()
+        assert loader.get_profile_stats() == {}
+
+    @pytest.mark.parametrize(
+        ("batch_size", "world_size", "drop_last", "n_batches"),
+        (
+            (2, 2, True, 0),
+            (2, 2, False, 1),
+            (3, 1, True, 0),
+            (3, 1, False, 1),
+        ),
+    )
+    def test_drop_last(
+        self, speech_text_loader, batch_size, world_size, drop_last, n_batches
+    ):
+        loaders_ = [
+            speech_text_loader(
+                batch_size=batch_size,
+                rank=rank,
+                world_size=world_size,
+                drop_last=drop_last,
+            )
+            for rank in range(world_size)
+        ]
+        batches = [batch for loader in loaders_ for batch in loader]
+        assert all(len(loader) == n_batches for loader in loaders_)
+        if drop_last is False:
+            # all the examples are covered once
+            assert sum(len(batch[0]) for batch in batches) == 2
+
+    def test_invalid_worker_type(self, speech_text_loader):
+        with pytest.raises(KeyError):
+            speech_text_loader(batch_size=1, worker_type="foo")
+
+    def test_sampler(self, speech_text_loader):
+        sampler = samplers.BucketSampler(lengths=[1.0, 2.0], batch_size=1, n_buckets=1)
+        loader = speech_text_loader(batch_size=1, sampler=sampler)
+        assert len(loader) == 2
+        for epoch in range(2):
+            assert len(list(loader)) == 2
+            assert loader.epoch == epoch
+            assert loader.batches == sampler.get_batches(epoch=epoch)
+
+    def test_dynamic_batches(self, speech_text_loader):
+        sampler = samplers.DynamicBatchSampler(lengths=[1.0, 2.0], max_frames=4)
+        loader = speech_text_loader(batch_size=1, sampler=sampler)
+        assert len(loader) == 1
+        speech, speech_mask, text, text_mask = next(iter(loader))
+        assert speech.shape[0] == text.shape[0] == 2
+
+    @pytest.mark.parametrize("use_sampler", (False, True))
+    def test_resume(self, speech_text_loader, use_sampler):
+        def get_loader():
+            sampler = None
+            if use_sampler is True:
+                sampler = samplers.BucketSampler(
+                    lengths=[1.0, 2.0], batch_size=1, n_buckets=1, seed=5
+                )
+            return speech_text_loader(
+                batch_size=1, shuffle=True, seed=3, sampler=sampler
+            )
+
+        loader = get_loader()
+        list(loader)
+        iterator = iter(loader)
+        next(iterator)
+        state = loader.state_dict()
+        expected = [next(iterator)[2]]
+        resumed = get_loader()
+        resumed.load_state_dict(state)
+        assert resumed.n_completed_epochs == 1
+        result = [batch[2] for batch in resumed]
+        assert resumed.epoch == state["epoch"] == 1
+        assert len(result) == len(expected) == 1
+        assert torch.equal(result[0], expected[0])
+        # the following epoch starts from the beginning
+        assert len(list(resumed)) == len(resumed)
+        assert resumed.epoch == 2
+
+    def test_resume_completed_epoch(self, speech_text_loader):
+        loader = speech_text_loader(batch_size=1, shuffle=True, seed=3)
+        list(loader)
+        resumed = speech_text_loader(batch_size=1, shuffle=True, seed=3)
+        resumed.load_state_dict(loader.state_dict())
+        assert resumed.n_completed_epochs == 1
+        assert len(list(resumed)) == len(resumed)
+        assert resumed.epoch == 1
+
+
+class TestGetASRDatasets:
+    @pytest.mark.parametrize("manifest_type", ["lazy", "columnar"])
+    def test_test_data_without_durations(self, dict_csv_data, tmp_path, manifest_type):
+        train_path = os.path.join(tmp_path, "train.csv")
+        test_path = os.path.join(tmp_path, "test.csv")
+        create_csv_file(
+            train_path,
+            data=[
+                {**item, FileKeys.duration_key.value: i + 1}
+                for i, item in enumerate(dict_csv_data)
+            ],
+        )
+        create_csv_file(test_path, data=dict_csv_data)
+        tokenizer = CharTokenizer()
+        tokenizer.set_tokenizer([item["text"] for item in dict_csv_data])
+        speech_processor = processors.OrderedProcessor(
+            [processes.AudioLoader(sample_rate=8000)]
+        )
+        data_config = ASRDataConfig(
+            training_path=train_path,
+            testing_path=test_path,
+            train_speech_processor=speech_processor,
+            test_speech_processor=speech_processor,
+            text_processor=processors.OrderedProcessor([]),
+            tokenizer_path="",
+            n_buckets=2,
+            manifest_type=manifest_type,
+        )
+        train_dataset, test_dataset = registry.get_asr_datasets(
+            data_config=data_config, tokenizer=tokenizer
+        )
+        assert train_dataset.get_column(FileKeys.duration_key.value) == [1.0, 2.0]
+        assert len(test_dataset) == len(dict_csv_data)
+
+
+def test_get_sampler_max_tokens_without_max_frames():
+    data_config = ASRDataConfig(
+        training_path="",
+        testing_path="",
+        train_speech_processor=processors.OrderedProcessor([]),
+        test_speech_processor=processors.OrderedProcessor([]),
+        text_processor=processors.OrderedProcessor([]),
+        tokenizer_path="",
+        max_tokens=100,
+    )
+    with pytest.raises(ValueError):
+        registry.get_sampler(
+            data_config=data_config, dataset=None, batch_size=2, world_size=1, rank=0
+        )
@@ -0,0 +1,147 @@
+import csv
+import os
+import pickle
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from speeq.data import loaders, manifests
+
+ROWS = [
+    {"file_path": "a.wav", "text": "hello, world", "duration": "3.5"},
+    {"file_path": "b.wav", "text": 'say "hi"', "duration": "1.0"},
+    {"file_path": "c.wav", "text": "ŝpeech", "duration": "2.25"},
+    {"file_path": "d.wav", "text": "bye", "duration": "1.0"},
+]
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    file_path = os.path.join(tmp_path, "data.csv")
+    with open(file_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, ROWS[0].keys())
+        writer.writeheader()
+        writer.writerows(ROWS)
+    return file_path
+
+
+@pytest.mark.parametrize(
+    "manifest_cls", (manifests.LazyCSVManifest, manifests.ColumnarCSVManifest)
+)
+class TestManifests:
+    def test_rows(self, manifest_cls, csv_path):
+        manifest = manifest_cls(csv_path)
+        assert len(manifest) == len(ROWS)
+        assert list(manifest) == ROWS
+        assert manifest[-1] == ROWS[-1]
+        with pytest.raises(IndexError):
+            manifest[len(ROWS)]
+
+    @pytest.mark.parametrize(
+        ("reverse", "expected"),
+        (
+            (False, ["b.wav", "d.wav", "c.wav", "a.wav"]),
+            (True, ["a.wav", "c.wav", "b.wav", "d.wav"]),
+        ),
+    )
+    def test_sort(self, manifest_cls, csv_path, reverse, expected):
+        manifest = manifest_cls(csv_path, key_columns=["duration"])
+        manifest.sort("duration", reverse=reverse)
+        assert manifest.get_column("file_path") == expected
+        durations = [float(row["duration"]) for row in manifest]
+        assert manifest.get_column("duration") == durations
+
+    def test_index_reuse(self, manifest_cls, csv_path):
+        manifest = manifest_cls(csv_path, key_columns=["duration"])
+        index_dir = manifest.index_dir
+        assert os.path.exists(index_dir)
+        meta_path = os.path.join(index_dir, manifests.INDEX_META_FILE)
+        mtime = os.stat(meta_path).st_mtime_ns
+        manifest_cls(csv_path, key_columns=["duration"])
+        assert mtime == os.stat(meta_path).st_mtime_ns
+
+    def test_index_invalidation(self, manifest_cls, csv_path):
+        manifest_cls(csv_path)
+        with open(csv_path, "a", encoding="utf-8") as f:
+            f.write("e.wav,new,4.0\n")
+        manifest = manifest_cls(csv_path)
+        assert len(manifest) == len(ROWS) + 1
+        assert manifest[-1]["file_path"] == "e.wav"
+
+    def test_missing_key_column(self, manifest_cls, csv_path):
+        with pytest.raises(KeyError):
+            manifest_cls(csv_path, key_columns=["speed"])
+
+    def test_pickle(self, manifest_cls, csv_path):
+        manifest = manifest_cls(csv_path, key_columns=["duration"])
+        manifest.sort("duration")
+        manifest[0]
+        result = pickle.loads(pickle.dumps(manifest))
+        assert list(result) == list(manifest)
+
+    def test_concurrent_reads(self, manifest_cls, csv_path):
+        manifest = manifest_cls(csv_path)
+        indices = [random.randrange(len(ROWS)) for _ in range(20000)]
+
+        def read(worker_indices):
+            return [manifest[idx] == ROWS[idx] for idx in worker_indices]
+
+        with ThreadPoolExecutor(8) as executor:
+            results = executor.map(read, [indices[i::8] for i in range(8)])
+            assert all(all(result) for result in results)
+
+
+def test_columnar_multiline_values(tmp_path):
+    file_path = os.path.join(tmp_path, "data.csv")
+    rows = [{"text": "a\nb", "duration": "1"}, {"text": "c", "duration": "2"}]
+    with open(file_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, rows[0].keys())
+        writer.writeheader()
+        writer.writerows(rows)
+    assert list(manifests.ColumnarCSVManifest(file_path)) == rows
+
+
+def test_columnar_column_mismatch(tmp_path):
+    file_path = os.path.join(tmp_path, "data.csv")
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write("file_path,text,duration\na.wav,hi,1.0\nb.wav,2.0\n")
+    with pytest.raises(ValueError):
+        manifests.ColumnarCSVManifest(file_path)
+
+
+@pytest.mark.parametrize(
+    "manifest_cls", (manifests.LazyCSVManifest, manifests.ColumnarCSVManifest)
+)
+def test_index_files_are_atomic(manifest_cls, csv_path, monkeypatch):
+    saved = []
+    save = manifests.np.save
+
+    def func(file, x, *args, **kwargs):
+        saved.append(file.name)
+        save(file, x, *args, **kwargs)
+
+    monkeypatch.setattr(manifests.np, "save", func)
+    manifest = manifest_cls(csv_path, key_columns=["duration"])
+    assert len(saved) > 0
+    assert all(name.endswith(".tmp") for name in saved)
+    assert not any(name.endswith(".tmp") for name in os.listdir(manifest.index_dir))
+    assert list(manifest) == ROWS
+
+
+class TestCSVDataset:
+    @pytest.mark.parametrize("manifest_type", ("lazy", "columnar"))
+    def test_matches_memory(self, csv_path, manifest_type):
+        memory = loaders.CSVDataset(csv_path, sort_key="duration")
+        lazy = loaders.CSVDataset(
+            csv_path, sort_key="duration", manifest_type=manifest_type
+        )
+        assert len(memory) == len(lazy)
+        assert [memory[i] for i in range(len(memory))] == [
+            lazy[i] for i in range(len(lazy))
+        ]
+        assert memory.get_column("text") == lazy.get_column("text")
+
+    def test_invalid_manifest_type(self, csv_path):
+        with pytest.raises(KeyError):
+            loaders.CSVDataset(csv_path, manifest_type="remote")
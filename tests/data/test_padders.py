@@ -2,6 +2,7 @@ import pytest
 import torch
 
 from speeq.data import padders
+from speeq.utils.utils import get_pad_mask
 
 
 class TestDynamicPadder:
@@ -44,3 +45,41 @@ class TestStaticPadder:
         x, pad_len = padder.pad(x)
         assert x.shape == expected_shape
         assert pad_len == expected_pad_len
+
+
+def pad_and_stack(padder, batch, max_len):
+    padded = [padder.pad(x, max_len) for x in batch]
+    result = torch.vstack([x for x, _ in padded])
+    mask = torch.vstack(
+        [
+            get_pad_mask(seq_len=x.shape[padder.dim] - pad_len, pad_len=pad_len)
+            for x, pad_len in padded
+        ]
+    )
+    return result, mask
+
+
+@pytest.mark.parametrize(
+    ("dim", "pad_val", "left_pad", "seq_shapes"),
+    (
+        (0, -1, False, ((3,), (5,), (1,))),
+        (0, 2, True, ((3,), (5,), (1,))),
+        (1, 0.0, False, ((1, 4, 3), (1, 6, 3), (1, 2, 3))),
+        (1, 0.5, True, ((1, 4, 3), (1, 6, 3))),
+    ),
+)
+@pytest.mark.parametrize("static", (False, True))
+def test_pad_batch(dim, pad_val, left_pad, seq_shapes, static):
+    max_len = max(shape[dim] for shape in seq_shapes)
+    if static is True:
+        max_len += 2
+        padder = padders.StaticPadder(
+            dim=dim, pad_val=pad_val, left_pad=left_pad, max_len=max_len
+        )
+    else:
+        padder = padders.DynamicPadder(dim=dim, pad_val=pad_val, left_pad=left_pad)
+    batch = [torch.randn(*shape) for shape in seq_shapes]
+    expected, expected_mask = pad_and_stack(padder, batch, max_len)
+    result, mask = padder.pad_batch(batch, max_len=max_len)
+    assert torch.equal(result, expected)
+    assert torch.equal(mask, expected_mask)
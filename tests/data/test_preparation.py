@@ -0,0 +1,238 @@
+import os
+
+import pytest
+import torch
+import torchaudio
+
+from speeq.constants import FileKeys
+from speeq.data import preparation, processes
+from speeq.data.tokenizers import BPETokenizer, CharTokenizer, WordTokenizer
+from speeq.utils.utils import load_csv
+from tests.helpers import create_csv_file
+
+
+def test_get_audio_info():
+    info = preparation.get_audio_info("tests/files/1.wav")
+    x, sr = torchaudio.load("tests/files/1.wav")
+    assert info[FileKeys.sample_rate_key.value] == sr
+    assert info[FileKeys.n_samples_key.value] == x.shape[-1]
+    assert info[FileKeys.n_channels_key.value] == x.shape[0]
+    assert info[FileKeys.duration_key.value] == x.shape[-1] / sr
+
+
+@pytest.mark.parametrize(
+    ("length", "orig_sr", "new_sr"),
+    ((16001, 16000, 8000), (44101, 44100, 16000), (100, 8000, 8000)),
+)
+def test_get_resampled_length(length, orig_sr, new_sr):
+    x = torch.randn(1, length)
+    expected = processes.AudioLoader(new_sr)._get_resampler(orig_sr)(x).shape[-1]
+    assert preparation.get_resampled_length(length, orig_sr, new_sr) == expected
+
+
+@pytest.mark.parametrize("feat_ext_name", ("melspec", "mfcc"))
+@pytest.mark.parametrize("center", (True, False))
+@pytest.mark.parametrize("n_samples", (400, 1000, 16001))
+def test_get_n_frames(feat_ext_name, center, n_samples):
+    args = {"n_fft": 400, "hop_length": 160, "center": center, "n_mels": 20}
+    if feat_ext_name == "mfcc":
+        args = {"n_mfcc": 13, "melkwargs": args}
+    extractor = processes.FeatExtractor(feat_ext_name, args)
+    result = extractor.run(torch.randn(1, n_samples))
+    assert extractor.get_n_frames(n_samples) == result.shape[-2]
+
+
+def _rewrite_audio(file_path, n_samples, sample_rate=8000):
+    # the new content is dated after any output derived from the old one
+    torchaudio.save(file_path, 0.1 * torch.randn(1, n_samples), sample_rate)
+    mtime = os.stat(file_path).st_mtime + 10
+    os.utime(file_path, (mtime, mtime))
+
+
+class TestEnrichManifest:
+    def test(self, dict_csv_data, tmp_path, monkeypatch):
+        data_path = os.path.join(tmp_path, "data.csv")
+        save_path = os.path.join(tmp_path, "enriched.csv")
+        create_csv_file(data_path, dict_csv_data)
+        tokenizer = CharTokenizer()
+        tokenizer.set_tokenizer([row["text"] for row in dict_csv_data])
+        extractor = processes.FeatExtractor("melspec", {"hop_length": 160})
+        rows = preparation.enrich_manifest(
+            data_path,
+            save_path=save_path,
+            sample_rate=8000,
+            feat_extractor=extractor,
+            tokenizer=tokenizer,
+            n_workers=2,
+        )
+        assert load_csv(save_path) == [
+            {key: str(value) for key, value in row.items()} for row in rows
+        ]
+        for row, target in zip(rows, dict_csv_data):
+            x = processes.AudioLoader(8000).run(target["file_path"])
+            assert row[FileKeys.n_frames_key.value] == extractor.run(x).shape[-2]
+            assert row[FileKeys.n_tokens_key.value] == len(target["text"])
+            assert row["text"] == target["text"]
+
+        # adding a row, only the new file has to be probed
+        probed = []
+
+        def get_audio_info(file_path):
+            probed.append(file_path)
+            return {
+                FileKeys.duration_key.value: 1.0,
+                FileKeys.n_samples_key.value: 8000,
+                FileKeys.sample_rate_key.value: 8000,
+                FileKeys.n_channels_key.value: 1,
+            }
+
+        monkeypatch.setattr(preparation, "get_audio_info", get_audio_info)
+        create_csv_file(
+            data_path, dict_csv_data + [{"file_path": "new.wav", "text": "new"}]
+        )
+        new_rows = preparation.enrich_manifest(data_path, save_path=save_path)
+        assert probed == ["new.wav"]
+        assert len(new_rows) == len(rows) + 1
+        assert new_rows[-1][FileKeys.duration_key.value] == 1.0
+        assert FileKeys.n_frames_key.value not in new_rows[-1]
+
+    def test_modified_audio(self, tmp_path):
+        data_path = os.path.join(tmp_path, "data.csv")
+        file_path = os.path.join(tmp_path, "audio.wav")
+        torchaudio.save(file_path, 0.1 * torch.randn(1, 8000), 8000)
+        create_csv_file(data_path, [{"file_path": file_path, "text": "a"}])
+        preparation.enrich_manifest(data_path)
+        _rewrite_audio(file_path, 4000)
+        (row,) = preparation.enrich_manifest(data_path)
+        assert row[FileKeys.n_samples_key.value] == 4000
+        assert row[FileKeys.duration_key.value] == 0.5
+
+
+class TestResampleManifest:
+    @pytest.mark.parametrize("n_workers", (1, 2))
+    def test(self, dict_csv_data, tmp_path, n_workers):
+        data_path = os.path.join(tmp_path, "data.csv")
+        save_path = os.path.join(tmp_path, "resampled.csv")
+        out_dir = os.path.join(tmp_path, "audio")
+        create_csv_file(data_path, dict_csv_data)
+        preparation.enrich_manifest(data_path)
+        rows = preparation.resample_manifest(
+            data_path,
+            save_path=save_path,
+            out_dir=out_dir,
+            sample_rate=8000,
+            n_workers=n_workers,
+        )
+        assert load_csv(save_path) == [
+            {key: str(value) for key, value in row.items()} for row in rows
+        ]
+        for row, target in zip(rows, dict_csv_data):
+            x, sr = torchaudio.load(row["file_path"])
+            expected = processes.AudioLoader(8000).run(target["file_path"])
+            assert sr == 8000
+            assert x.shape == expected.shape
+            assert torch.allclose(x, expected, atol=1e-3)
+            assert row[FileKeys.n_samples_key.value] == x.shape[-1]
+            assert row[FileKeys.sample_rate_key.value] == 8000
+            assert row["text"] == target["text"]
+
+    def test_resume(self, dict_csv_data, tmp_path, monkeypatch):
+        data_path = os.path.join(tmp_path, "data.csv")
+        save_path = os.path.join(tmp_path, "resampled.csv")
+        out_dir = os.path.join(tmp_path, "audio")
+        create_csv_file(data_path, dict_csv_data)
+        rows = preparation.resample_manifest(
+            data_path, save_path=save_path, out_dir=out_dir, sample_rate=8000
+        )
+        mtimes = [os.stat(row["file_path"]).st_mtime_ns for row in rows]
+
+        def load(*args, **kwargs):
+            raise AssertionError("converted files must not be decoded again")
+
+        monkeypatch.setattr(torchaudio, "load", load)
+        new_rows = preparation.resample_manifest(
+            data_path, save_path=save_path, out_dir=out_dir, sample_rate=8000
+        )
+        assert new_rows == rows
+        assert mtimes == [os.stat(row["file_path"]).st_mtime_ns for row in new_rows]
+
+    def test_modified_audio(self, tmp_path):
+        data_path = os.path.join(tmp_path, "data.csv")
+        save_path = os.path.join(tmp_path, "resampled.csv")
+        out_dir = os.path.join(tmp_path, "audio")
+        file_path = os.path.join(tmp_path, "audio.wav")
+        torchaudio.save(file_path, 0.1 * torch.randn(1, 16000), 16000)
+        create_csv_file(data_path, [{"file_path": file_path, "text": "a"}])
+        preparation.enrich_manifest(data_path)
+        preparation.resample_manifest(
+            data_path, save_path=save_path, out_dir=out_dir, sample_rate=8000
+        )
+        _rewrite_audio(file_path, 16000, sample_rate=8000)
+        (row,) = preparation.resample_manifest(
+            data_path, save_path=save_path, out_dir=out_dir, sample_rate=8000
+        )
+        assert row[FileKeys.n_samples_key.value] == 16000
+        assert torchaudio.info(row["file_path"]).num_frames == 16000
+
+
+class TestBuildVocab:
+    texts = ["the cat sat", "the rat", "a cat and the hat", "zoo"]
+
+    @pytest.mark.parametrize(
+        ("tokenizer_class", "n_workers", "chunk_size"),
+        (
+            (CharTokenizer, 1, 1),
+            (CharTokenizer, 2, 1),
+            (WordTokenizer, 2, 3),
+            (BPETokenizer, 2, 2),
+        ),
+    )
+    def test_count_tokens(self, tmp_path, tokenizer_class, n_workers, chunk_size):
+        data_path = os.path.join(tmp_path, "data.csv")
+        create_csv_file(data_path, [{"text": text} for text in self.texts])
+        tokenizer = tokenizer_class()
+        counts = preparation.count_tokens(
+            data_path, tokenizer=tokenizer, n_workers=n_workers, chunk_size=chunk_size
+        )
+        assert counts == tokenizer.count_tokens(self.texts)
+
+    @pytest.mark.parametrize("tokenizer_class", (CharTokenizer, WordTokenizer))
+    def test_build_vocab(self, tmp_path, tokenizer_class):
+        data_path = os.path.join(tmp_path, "data.csv")
+        create_csv_file(data_path, [{"text": text} for text in self.texts])
+        tokenizer = preparation.build_vocab(
+            data_path, tokenizer=tokenizer_class().add_pad_token()
+        )
+        expected = tokenizer_class().add_pad_token().set_tokenizer(self.texts)
+        assert tokenizer._token_to_id == expected._token_to_id
+
+    def test_min_freq(self, tmp_path):
+        data_path = os.path.join(tmp_path, "data.csv")
+        create_csv_file(data_path, [{"text": text} for text in self.texts])
+        tokenizer = preparation.build_vocab(
+            data_path, tokenizer=WordTokenizer(), min_freq=2
+        )
+        assert set(tokenizer._token_to_id) == {"<OOV>", "the", "cat"}
+        assert tokenizer.tokenize("the zoo") == [
+            tokenizer._token_to_id["the"],
+            tokenizer.special_tokens.oov_id,
+        ]
+
+    def test_bpe_min_freq_keeps_characters(self, tmp_path):
+        data_path = os.path.join(tmp_path, "data.csv")
+        create_csv_file(data_path, [{"text": text} for text in self.texts])
+        tokenizer = preparation.build_vocab(
+            data_path, tokenizer=BPETokenizer(max_vocab_size=40), min_freq=3
+        )
+        # the characters of the rare words are kept, only the merges are dropped
+        assert set("".join(self.texts)) <= set(tokenizer._token_to_id)
+        expected = BPETokenizer(max_vocab_size=40, min_freq=3)
+        assert tokenizer._merges == expected.set_tokenizer(self.texts)._merges
+        assert "".join(tokenizer.ids2tokens(tokenizer.tokenize("zoo"))) == "zoo"
+
+    def test_multiline_text(self, tmp_path):
+        data_path = os.path.join(tmp_path, "data.csv")
+        texts = ["the cat\r\nsat", "the\nrat"]
+        create_csv_file(data_path, [{"text": text} for text in texts])
+        counts = preparation.count_tokens(data_path, tokenizer=CharTokenizer())
+        assert counts == CharTokenizer().count_tokens(texts)
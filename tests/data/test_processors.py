@@ -1,7 +1,9 @@
+import pickle
+
 import pytest
 import torch
 
-from speeq.data import processes
+from speeq.data import augmenters, processes, processors
 
 
 class TestAudioLoader:
@@ -17,6 +19,57 @@ class TestAudioLoader:
         result = loader.run(file_path=file_path)
         assert len(result.shape) == 2
 
+    def test_cache(self):
+        files = ["tests/files/1.wav", "tests/files/2.wav"]
+        loader = processes.AudioLoader(sample_rate=8000)
+        targets = [loader.run(file_path) for file_path in files]
+        size = max(x.element_size() * x.nelement() for x in targets)
+        # only one file fits in the cache at a time
+        cached_loader = processes.AudioLoader(sample_rate=8000, cache_size=size)
+        for file_path in [files[0], files[0], files[1], files[0]]:
+            result = cached_loader.run(file_path)
+            assert torch.equal(result, targets[files.index(file_path)])
+        result.zero_()
+        assert torch.equal(cached_loader.run(files[0]), targets[0])
+        stats = cached_loader.cache_stats
+        assert (stats["hits"], stats["misses"], stats["items"]) == (2, 3, 1)
+        assert stats["bytes"] <= size
+
+    def test_cache_pickle(self):
+        loader = processes.AudioLoader(sample_rate=8000, cache_size=2**20)
+        loader.run("tests/files/1.wav")
+        loader = pickle.loads(pickle.dumps(loader))
+        assert loader.cache_stats["items"] == 0
+        loader.run("tests/files/1.wav")
+        assert loader.cache_stats["misses"] == 1
+
+    def test_window(self):
+        file_path = "tests/files/1.wav"
+        loader = processes.AudioLoader(sample_rate=16000)
+        target = loader.run(file_path)
+        result = loader.run(processes.AudioWindow(file_path, 0.5, offset=0.25))
+        assert torch.equal(result, target[:, 4000:12000])
+        # a window past the end is moved back to fit in the file
+        result = loader.run(processes.AudioWindow(file_path, 0.5, offset=10**6))
+        assert torch.equal(result, target[:, -8000:])
+        # a window longer than the file loads the whole file
+        result = loader.run(processes.AudioWindow(file_path, 10**6))
+        assert torch.equal(result, target)
+
+    def test_max_duration(self):
+        file_path = "tests/files/1.wav"
+        target = processes.AudioLoader(sample_rate=16000).run(file_path)
+        loader = processes.AudioLoader(sample_rate=16000, max_duration=0.5)
+        for _ in range(5):
+            result = loader.run(file_path)
+            assert result.shape == (target.shape[0], 8000)
+            offsets = [
+                i
+                for i in range(target.shape[-1] - 8000 + 1)
+                if torch.equal(target[:, i : i + 8000], result)
+            ]
+            assert len(offsets) > 0
+
 
 class TestFeatExtractor:
     @pytest.mark.parametrize(
@@ -59,6 +112,32 @@ class TestFeatExtractor:
         result = extractor.run(input)
         assert result.shape == expected_shape
 
+    @pytest.mark.parametrize("feat_ext_name", ("melspec", "mfcc"))
+    @pytest.mark.parametrize("center", (True, False))
+    def test_run_batch(self, feat_ext_name, center):
+        args = {"n_fft": 400, "hop_length": 160, "center": center, "n_mels": 20}
+        if feat_ext_name == "mfcc":
+            args = {"n_mfcc": 13, "melkwargs": args}
+        extractor = processes.FeatExtractor(feat_ext_name, args)
+        lengths = torch.LongTensor([1600, 1000, 2001])
+        x = torch.zeros(len(lengths), lengths.max().item())
+        for item, length in zip(x, lengths):
+            item[:length] = torch.randn(length)
+        result, frame_lengths = extractor.run_batch(x, lengths)
+        for item, feats, length, n_frames in zip(x, result, lengths, frame_lengths):
+            target = extractor.run(item[None, :length])[0]
+            assert n_frames == target.shape[0]
+            if center is False:
+                # the frames within the signal do not depend on the padding
+                assert torch.allclose(feats[:n_frames], target, atol=1e-4)
+
+    def test_get_n_frames_keeps_lengths(self):
+        extractor = processes.FeatExtractor("melspec", {"pad": 10, "n_mels": 20})
+        lengths = torch.LongTensor([16000, 8000])
+        n_frames = extractor.get_n_frames(lengths)
+        assert torch.equal(lengths, torch.LongTensor([16000, 8000]))
+        assert n_frames.tolist() == [extractor.get_n_frames(16000), 41]
+
 
 class TestFeatStacker:
     @pytest.mark.parametrize(
@@ -97,3 +176,75 @@ class TestFrameContextualizer:
         x = torch.randn(*inp_shape)
         result = processor.run(x)
         assert result.shape == expected_shape
+
+
+def test_get_length_ratio():
+    speech_processor = processors.SpeechProcessor(
+        audio_processor=processors.OrderedProcessor(
+            [processes.AudioLoader(sample_rate=8000)]
+        ),
+        audio_augmenter=processors.StochasticProcessor(
+            [
+                augmenters.SpeedPerturbation(sample_rate=8000, factors=[0.5, 1.0]),
+                augmenters.VolumeChanger(min_gain=0.5, max_gain=1),
+            ]
+        ),
+    )
+    assert processors.get_length_ratio(speech_processor) == 2.0
+    assert processors.get_length_ratio(speech_processor.processors[0]) == 1.0
+    assert processors.get_length_ratio(None) == 1.0
+
+
+class TestProcessorProfile:
+    def test_disabled(self):
+        processor = processors.OrderedProcessor([processes.FeatStacker(2)])
+        processor.execute(torch.randn(1, 10, 4))
+        assert processor.profile is None
+        assert processor.report() == ""
+
+    def test_speech_processor(self):
+        speech_processor = processors.SpeechProcessor(
+            audio_processor=processors.OrderedProcessor(
+                [processes.AudioLoader(sample_rate=8000)]
+            ),
+            spec_processor=processors.OrderedProcessor(
+                [processes.FeatExtractor("melspec", {"n_mels": 40})]
+            ),
+            profile=True,
+        )
+        for _ in range(3):
+            result = speech_processor.execute("tests/files/1.wav")
+        stats = speech_processor.profile.get_stats()
+        assert list(stats) == [
+            "audio_processor/AudioLoader",
+            "spec_processor/FeatExtractor",
+        ]
+        assert stats["spec_processor/FeatExtractor"]["calls"] == 3
+        assert stats["spec_processor/FeatExtractor"]["mean_size"] == result.numel()
+        assert stats["audio_processor/AudioLoader"]["total_time"] > 0
+        assert "spec_processor/FeatExtractor" in speech_processor.report()
+
+    def test_merge(self):
+        processor = processors.OrderedProcessor(
+            [processes.FeatStacker(2)], profile=True
+        )
+        x = torch.randn(2, 10, 4)
+        processor.execute(x)
+        # a copy, such as the one of a worker process
+        worker_profile = pickle.loads(pickle.dumps(processor.profile))
+        worker_profile.record("FeatStacker", 1.0, x)
+        processor.profile.update(worker_profile.pop())
+        stats = processor.profile.get_stats()
+        assert stats["FeatStacker"]["calls"] == 3
+        assert stats["FeatStacker"]["mean_size"] == x.numel()
+        assert len(worker_profile) == 0
+
+
+def test_stochastic_processor_keeps_processes():
+    stacker = processes.FeatStacker(2)
+    contextualizer = processes.FrameContextualizer(1)
+    processor = processors.StochasticProcessor([stacker, contextualizer])
+    for _ in range(10):
+        result = processor.execute(torch.randn(1, 8, 4))
+        assert result.shape == (1, 4, 24)
+        assert processor.processes == [stacker, contextualizer]
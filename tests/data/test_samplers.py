@@ -0,0 +1,167 @@
+import random
+
+import pytest
+
+from speeq.data import samplers
+
+
+@pytest.fixture
+def lengths():
+    rng = random.Random(1)
+    return [rng.uniform(1, 30) for _ in range(100)]
+
+
+def test_get_padding_ratio():
+    lengths = [1, 2, 4, 4]
+    assert samplers.get_padding_ratio(lengths, [[2, 3]]) == 0
+    assert samplers.get_padding_ratio(lengths, [[0, 1], [2, 3]]) == 1 - 11 / 12
+    assert samplers.get_padding_ratio(lengths, []) == 0
+
+
+def test_get_shard_imbalance():
+    lengths = [1, 1, 2, 2]
+    assert samplers.get_shard_imbalance(lengths, [[[0]], [[1]]]) == (0, 0)
+    assert samplers.get_shard_imbalance(lengths, [[[0], [1]], [[2], [3]]]) == (
+        4 * 2 / 6 - 1,
+        2 * 2 / 3 - 1,
+    )
+    assert samplers.get_shard_imbalance(lengths, []) == (0, 0)
+
+
+@pytest.mark.parametrize("shuffle", (True, False))
+@pytest.mark.parametrize("world_size", (2, 3, 4))
+def test_balanced_shard(shuffle, world_size):
+    rng = random.Random(2)
+    # a skewed set of durations
+    lengths = [rng.lognormvariate(1, 0.6) for _ in range(300)]
+
+    def get_shards(shard_type):
+        results = []
+        for rank in range(world_size):
+            sampler = samplers.DynamicBatchSampler(
+                lengths=lengths,
+                max_frames=40,
+                n_buckets=5,
+                rank=rank,
+                world_size=world_size,
+                shuffle=shuffle,
+                shard_type=shard_type,
+            )
+            results.append(sampler.get_batches(epoch=0))
+        return sampler, results
+
+    stride_sampler, stride_shards = get_shards("stride")
+    sampler, shards = get_shards("balanced")
+    assert len(set(map(len, shards))) == 1
+    assert len(shards[0]) == len(stride_shards[0])
+    indices = [idx for shard in shards for batch in shard for idx in batch]
+    assert len(indices) == len(set(indices))
+    assert (sampler.imbalance, sampler.step_imbalance) == (
+        samplers.get_shard_imbalance(lengths, shards)
+    )
+    assert sampler.imbalance <= stride_sampler.imbalance
+    assert sampler.step_imbalance < stride_sampler.step_imbalance
+
+
+def test_invalid_shard_type(lengths):
+    with pytest.raises(KeyError):
+        samplers.BucketSampler(lengths=lengths, batch_size=4, shard_type="foo")
+
+
+class TestBucketSampler:
+    @pytest.mark.parametrize(
+        ("batch_size", "n_buckets", "world_size", "n_batches"),
+        (
+            (4, 1, 1, 25),
+            (4, 5, 1, 25),
+            (8, 10, 1, 12),
+            (4, 5, 2, 12),
+            (3, 5, 3, 11),
+        ),
+    )
+    def test_get_batches(self, lengths, batch_size, n_buckets, world_size, n_batches):
+        results = []
+        for rank in range(world_size):
+            sampler = samplers.BucketSampler(
+                lengths=lengths,
+                batch_size=batch_size,
+                n_buckets=n_buckets,
+                rank=rank,
+                world_size=world_size,
+            )
+            batches = sampler.get_batches(epoch=0)
+            assert len(batches) == n_batches
+            assert all(len(batch) == batch_size for batch in batches)
+            results.extend(idx for batch in batches for idx in batch)
+        # no example is shared across the batches or the ranks
+        assert len(results) == len(set(results))
+
+    def test_padding_ratio(self, lengths):
+        sampler = samplers.BucketSampler(lengths=lengths, batch_size=4, n_buckets=10)
+        sampler.get_batches(epoch=0)
+        indices = list(range(len(lengths)))
+        baseline = samplers.get_padding_ratio(
+            lengths, [indices[i : i + 4] for i in range(0, len(indices), 4)]
+        )
+        assert 0 <= sampler.padding_ratio < baseline
+
+    def test_epochs(self, lengths):
+        sampler = samplers.BucketSampler(lengths=lengths, batch_size=4, n_buckets=4)
+        assert sampler.get_batches(epoch=0) == sampler.get_batches(epoch=0)
+        assert sampler.get_batches(epoch=0) != sampler.get_batches(epoch=1)
+
+    def test_no_shuffle(self, lengths):
+        sampler = samplers.BucketSampler(
+            lengths=lengths, batch_size=4, n_buckets=4, shuffle=False
+        )
+        batches = sampler.get_batches(epoch=0)
+        assert batches == sampler.get_batches(epoch=1)
+        flatten = [lengths[idx] for batch in batches for idx in batch]
+        assert flatten == sorted(flatten)
+
+
+class TestDynamicBatchSampler:
+    @pytest.mark.parametrize(
+        ("max_frames", "n_buckets", "world_size"),
+        (
+            (30, 1, 1),
+            (60, 4, 1),
+            (120, 10, 1),
+            (60, 4, 2),
+            (120, 10, 3),
+        ),
+    )
+    def test_get_batches(self, lengths, max_frames, n_buckets, world_size):
+        results = []
+        n_batches = set()
+        for rank in range(world_size):
+            sampler = samplers.DynamicBatchSampler(
+                lengths=lengths,
+                max_frames=max_frames,
+                n_buckets=n_buckets,
+                rank=rank,
+                world_size=world_size,
+            )
+            batches = sampler.get_batches(epoch=0)
+            n_batches.add(len(batches))
+            for batch in batches:
+                padded = max(lengths[idx] for idx in batch) * len(batch)
+                assert padded <= max_frames
+            results.extend(idx for batch in batches for idx in batch)
+        assert len(n_batches) == 1
+        assert len(results) == len(set(results))
+        if world_size == 1:
+            assert sorted(results) == list(range(len(lengths)))
+
+    def test_max_tokens(self, lengths):
+        text_lengths = [int(length) * 3 for length in lengths]
+        sampler = samplers.DynamicBatchSampler(
+            lengths=lengths, max_frames=200, text_lengths=text_lengths, max_tokens=120
+        )
+        for batch in sampler.get_batches(epoch=0):
+            assert max(text_lengths[idx] for idx in batch) * len(batch) <= 120
+
+    def test_oversized_example(self):
+        sampler = samplers.DynamicBatchSampler(lengths=[1, 50, 2], max_frames=10)
+        batches = sampler.get_batches(epoch=0)
+        assert sorted(map(sorted, batches)) == [[0, 2], [1]]
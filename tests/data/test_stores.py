@@ -0,0 +1,160 @@
+import os
+
+import numpy as np
+import pytest
+import torch
+
+from speeq.data import augmenters, loaders, processes, stores
+from speeq.data.processors import OrderedProcessor, SpeechProcessor
+
+FILES = ["tests/files/1.wav", "tests/files/2.wav"]
+MELSPEC_ARGS = {"sample_rate": 16000, "n_fft": 400, "hop_length": 200, "n_mels": 40}
+
+
+def get_speech_processor(n_mels=40, spec_augmenter=None):
+    return SpeechProcessor(
+        audio_processor=OrderedProcessor([processes.AudioLoader(sample_rate=16000)]),
+        spec_processor=OrderedProcessor(
+            [
+                processes.FeatExtractor(
+                    feat_ext_name="melspec",
+                    feat_ext_args=dict(MELSPEC_ARGS, n_mels=n_mels),
+                )
+            ]
+        ),
+        spec_augmenter=spec_augmenter,
+    )
+
+
+class TestShardedStore:
+    @pytest.mark.parametrize(
+        ("dtype", "shard_size", "n_shards"),
+        (
+            ("float32", 2**20, 1),
+            ("float16", 2**20, 1),
+            ("int16", 16, 3),
+        ),
+    )
+    def test_read_write(self, tmp_path, dtype, shard_size, n_shards):
+        arrays = {
+            "a": np.arange(10).reshape(2, 5),
+            "b": np.arange(4),
+            "c": np.ones((3, 2)),
+        }
+        with stores.ShardedStoreWriter(
+            tmp_path, dtype=dtype, shard_size=shard_size, meta={"x": 1}
+        ) as writer:
+            for key, value in arrays.items():
+                writer.add(key, value, params=[key])
+        store = stores.ShardedStore(tmp_path)
+        assert len(store) == 3
+        assert store.meta == {"x": 1}
+        assert len(os.listdir(tmp_path)) == n_shards + 1
+        for key, value in arrays.items():
+            assert key in store
+            result, params = store.get(key)
+            assert params == [key]
+            assert result.dtype == np.dtype(dtype)
+            assert np.array_equal(result, value)
+
+    def test_not_found(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            stores.ShardedStore(tmp_path)
+
+
+class TestFeatureCache:
+    @pytest.mark.parametrize(
+        ("dtype", "atol"), (("float32", 0), ("float16", 1e-1), ("int8", 1e-1))
+    )
+    def test_build(self, tmp_path, dtype, atol):
+        speech_processor = get_speech_processor()
+        cache = stores.build_feature_cache(
+            FILES, speech_processor, cache_dir=tmp_path, dtype=dtype
+        )
+        for file_path in FILES:
+            assert file_path in cache
+            target = speech_processor.execute(file_path)
+            result = cache.get(file_path)
+            assert result.dtype == torch.float32
+            assert result.shape == target.shape
+            scale = target.abs().max() if dtype == "int8" else 1
+            assert torch.allclose(result, target, atol=atol * scale, rtol=1e-2)
+
+    def test_stale_cache(self, tmp_path):
+        stores.build_feature_cache(FILES, get_speech_processor(), cache_dir=tmp_path)
+        # augmenters are not part of the cached processors
+        spec_augmenter = OrderedProcessor([augmenters.TimeMasking(n=1, max_length=2)])
+        stores.FeatureCache(
+            tmp_path, get_speech_processor(spec_augmenter=spec_augmenter)
+        )
+        with pytest.raises(ValueError):
+            stores.FeatureCache(tmp_path, get_speech_processor(n_mels=80))
+
+    def test_invalid_dtype(self, tmp_path):
+        with pytest.raises(KeyError):
+            stores.build_feature_cache(
+                FILES, get_speech_processor(), cache_dir=tmp_path, dtype="int4"
+            )
+
+    def test_dataset(self, tmp_path, speech_text_dataset):
+        speech_processor = get_speech_processor(
+            spec_augmenter=OrderedProcessor([augmenters.TimeMasking(n=1, max_length=2)])
+        )
+        cache = stores.build_feature_cache(FILES, speech_processor, cache_dir=tmp_path)
+        dataset = speech_text_dataset()
+        dataset.speech_processor = speech_processor
+        dataset.feature_cache = cache
+        speech, speech_len, *_ = dataset[0]
+        target = cache.get(FILES[0])
+        assert speech.shape == target.shape
+        assert speech_len == target.shape[-2]
+
+
+def test_build_rir_bank(tmp_path):
+    bank = stores.build_rir_bank(FILES, tmp_path, sample_rate=8000)
+    assert len(bank) == len(FILES)
+    for file_path in FILES:
+        h, _ = bank.get(file_path)
+        target = processes.AudioLoader(sample_rate=8000).run(file_path)[0]
+        assert h.shape == target.shape
+        assert np.isclose(np.linalg.norm(h), 1.0, atol=1e-5)
+
+
+def test_build_noise_bank(tmp_path):
+    bank = stores.build_noise_bank(FILES, tmp_path, sample_rate=8000)
+    assert bank.dtype == np.int16
+    for file_path in FILES:
+        x, _ = bank.get(file_path)
+        target = processes.AudioLoader(sample_rate=8000).run(file_path)[0]
+        assert x.shape == target.shape
+        result = torch.from_numpy(x).float() / stores.INT16_SCALE
+        assert torch.allclose(result, target, atol=1e-4)
+
+
+class TestWaveformStore:
+    def test_build(self, tmp_path):
+        store = stores.build_waveform_store(FILES, tmp_path, sample_rate=8000)
+        assert len(store) == len(FILES)
+        for file_path in FILES:
+            target = processes.AudioLoader(sample_rate=8000).run(file_path)
+            result = store.get(file_path)
+            assert result.shape == target.shape
+            assert torch.allclose(result, target, atol=1e-4)
+
+    def test_loader(self, tmp_path):
+        stores.build_waveform_store(FILES[:1], tmp_path, sample_rate=8000)
+        loader = stores.StoredAudioLoader(sample_rate=8000, store_dir=tmp_path)
+        for file_path in FILES:
+            # the files outside the store are decoded from the disk
+            target = processes.AudioLoader(sample_rate=8000).run(file_path)
+            assert torch.allclose(loader.run(file_path), target, atol=1e-4)
+        target = loader.run(FILES[0])
+        window = processes.AudioWindow(FILES[0], 0.5, offset=0.25)
+        assert torch.equal(loader.run(window), target[:, 2000:6000])
+        loader.max_duration = 0.5
+        assert loader.run(FILES[0]).shape == (1, 4000)
+
+    def test_sample_rate_mismatch(self, tmp_path):
+        stores.build_waveform_store(FILES, tmp_path, sample_rate=8000)
+        with pytest.raises(ValueError):
+            stores.StoredAudioLoader(sample_rate=16000, store_dir=tmp_path)
@@ -1,9 +1,13 @@
 import json
 import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
 from speeq.data import tokenizers
+from speeq.data.registry import load_tokenizer
+from speeq.interfaces import ITokenizer
 
 
 class TestCharTokenizer:
@@ -208,3 +212,112 @@ class TestWordTokenizer:
                 sentence=sentence, add_eos=add_eos, add_sos=add_sos
             )
             assert result == expected
+
+
+class TestBPETokenizer:
+    data = [
+        "the cat sat on the mat",
+        "the rat sat on the hat",
+        "that cat and that rat",
+    ]
+
+    @staticmethod
+    def _get_reference_merges(word_counts, n_merges, min_freq):
+        # recounting all the pairs after each merge
+        words = {word: list(word) for word in word_counts}
+        merges = []
+        for _ in range(n_merges):
+            counts = {}
+            for word, tokens in words.items():
+                for pair in zip(tokens, tokens[1:]):
+                    counts[pair] = counts.get(pair, 0) + word_counts[word]
+            if len(counts) == 0:
+                break
+            pair = min(counts, key=lambda pair: (-counts[pair], pair))
+            if counts[pair] < min_freq:
+                break
+            merges.append(pair)
+            for word, tokens in words.items():
+                words[word] = tokenizers.BPETokenizer._merge(tokens, pair)
+        return merges
+
+    @pytest.mark.parametrize(("max_vocab_size", "min_freq"), ((30, 2), (60, 1)))
+    def test_set_tokenizer(self, max_vocab_size, min_freq):
+        tokenizer = tokenizers.BPETokenizer(
+            max_vocab_size=max_vocab_size, min_freq=min_freq
+        )
+        tokenizer.set_tokenizer(self.data)
+        n_chars = len(set("".join(self.data)))
+        expected = self._get_reference_merges(
+            tokenizer.count_tokens(self.data),
+            n_merges=max_vocab_size - n_chars - 1,
+            min_freq=min_freq,
+        )
+        assert tokenizer._merges == expected
+        assert tokenizer.vocab_size <= max_vocab_size
+
+    @pytest.mark.parametrize(
+        "sentence", ("the cat sat on the mat", "  that hat ", "a", "", "the dog")
+    )
+    def test_tokenize(self, sentence):
+        tokenizer = tokenizers.BPETokenizer(max_vocab_size=40)
+        tokenizer.set_tokenizer(self.data)
+        result = tokenizer.tokenize(sentence)
+        assert len(result) <= len(sentence)
+        tokens = tokenizer.ids2tokens(result)
+        if "dog" in sentence:
+            assert tokenizer.special_tokens.oov_token in tokens
+        else:
+            assert "".join(tokens) == sentence
+
+    def test_cache(self):
+        tokenizer = tokenizers.BPETokenizer(max_vocab_size=40, cache_size=2)
+        tokenizer.set_tokenizer(self.data)
+        expected = tokenizer.tokenize(self.data[0])
+        assert len(tokenizer._cache) == 2
+        assert tokenizer.tokenize(self.data[0]) == expected
+
+    def test_concurrent_cache(self):
+        tokenizer = tokenizers.BPETokenizer(max_vocab_size=40, cache_size=2)
+        tokenizer.set_tokenizer(self.data)
+        expected = [tokenizer.tokenize(sentence) for sentence in self.data]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(
+                executor.map(tokenizer.tokenize, 200 * self.data, chunksize=1)
+            )
+        assert results == 200 * expected
+        assert len(tokenizer._cache) <= 2
+
+    def test_pickle(self):
+        tokenizer = tokenizers.BPETokenizer(max_vocab_size=40)
+        tokenizer.set_tokenizer(self.data)
+        loaded = pickle.loads(pickle.dumps(tokenizer))
+        for sentence in self.data:
+            assert loaded.tokenize(sentence) == tokenizer.tokenize(sentence)
+
+    def test_load_tokenizer(self, tmp_path):
+        file_path = os.path.join(tmp_path, "file.json")
+        tokenizer = tokenizers.BPETokenizer(max_vocab_size=40)
+        tokenizer.add_pad_token().add_sos_token()
+        tokenizer.set_tokenizer(self.data)
+        tokenizer.save_tokenizer(file_path)
+        loaded = load_tokenizer(file_path)
+        assert isinstance(loaded, tokenizers.BPETokenizer)
+        assert loaded._token_to_id == tokenizer._token_to_id
+        assert loaded._merges == tokenizer._merges
+        assert loaded.special_tokens.sos_id == tokenizer.special_tokens.sos_id
+        for sentence in self.data:
+            assert loaded.tokenize(sentence) == tokenizer.tokenize(sentence)
+
+
+def test_tokenizer_without_counting():
+    class Tokenizer(ITokenizer):
+        ids2tokens = tokenize = set_tokenizer = save_tokenizer = None
+        load_tokenizer = add_token = preprocess_tokens = batch_tokenizer = None
+        vocab_size = get_tokens = None
+
+    tokenizer = Tokenizer()
+    with pytest.raises(NotImplementedError):
+        tokenizer.count_tokens(["a"])
+    with pytest.raises(NotImplementedError):
+        tokenizer.set_tokenizer_from_counts({"a": 1})
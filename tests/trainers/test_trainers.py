@@ -0,0 +1,97 @@
+import os
+from unittest import mock
+
+import pytest
+import torch
+
+from speeq.trainers import decorators, trainers
+from speeq.utils.utils import load_state_dict
+
+
+class _Trainer(trainers.BaseTrainer):
+    @property
+    def is_master(self):
+        return True
+
+
+@pytest.fixture
+def trainer(tmp_path):
+    model = torch.nn.Linear(2, 2)
+    train_loader = mock.MagicMock()
+    train_loader.n_completed_epochs = 2
+    train_loader.state_dict.return_value = {"epoch": 2, "counter": 3, "seed": 0}
+    return _Trainer(
+        optimizer=torch.optim.SGD(model.parameters(), lr=0.1),
+        criterion=None,
+        model=model,
+        train_loader=train_loader,
+        test_loader=None,
+        epochs=5,
+        log_steps_frequency=10,
+        logger=mock.MagicMock(),
+        outdir=str(tmp_path),
+        grad_acc_steps=4,
+        history={},
+    )
+
+
+def test_resume(trainer):
+    trainer.resume(step=6)
+    assert trainer.counter == 7
+    assert trainer.start_epoch == 2
+    with mock.patch.object(trainer, "train") as train:
+        trainer.fit()
+    assert train.call_count == 3
+
+
+def test_export_ckpt_saves_last(trainer, tmp_path):
+    losses = iter([1.0, 2.0])
+
+    @decorators.export_ckpt(key="loss", category="steps")
+    def test(trainer):
+        trainer.history.setdefault("loss_key_steps", []).append(next(losses))
+
+    trainer.counter = 5
+    test(trainer)
+    trainer.counter = 9
+    test(trainer)
+    # only the first result improved the loss
+    assert sorted(os.listdir(tmp_path)) == [
+        "checkpoint_5.pt",
+        f"{decorators.LAST_CKPT_NAME}.pt",
+    ]
+    *_, step, _, loader_state = load_state_dict(
+        os.path.join(tmp_path, f"{decorators.LAST_CKPT_NAME}.pt")
+    )
+    assert step == 9
+    assert loader_state == {"epoch": 2, "counter": 3, "seed": 0}
+
+
+def test_test_weights_examples(trainer):
+    # a full batch of two examples and a last partial batch of one
+    trainer.test_loader = mock.MagicMock()
+    trainer.test_loader.__iter__.return_value = [
+        (torch.zeros(2, 4),),
+        (torch.zeros(1, 4),),
+    ]
+    losses = iter([torch.tensor(1.0), torch.tensor(4.0)])
+    trainer.forward_pass = lambda batch: next(losses)
+    assert trainer.test() == pytest.approx(2.0)
+
+
+def test_dist_eval_skips_ddp_forward():
+    trainer = trainers.BaseDistTrainer.__new__(trainers.BaseDistTrainer)
+    wrapper = mock.MagicMock()
+    trainer.model = wrapper
+    trainer.test_loader = mock.MagicMock()
+    trainer.test_loader.__iter__.return_value = [(torch.zeros(2, 4),)]
+    models = []
+
+    def forward_pass(batch):
+        models.append(trainer.model)
+        return torch.tensor(1.0)
+
+    trainer.forward_pass = forward_pass
+    assert trainer._eval_loss() == (2.0, 2)
+    assert models == [wrapper.module]
+    assert trainer.model is wrapper